@@ -0,0 +1,133 @@
+"""Rolling summarization of long conversation sessions."""
+
+from typing import Any
+
+from loguru import logger
+
+from nanobot.agent.tokens import TokenCounter
+from nanobot.providers.base import LLMProvider
+from nanobot.session.manager import Session
+
+# Per-message cap when rendering a transcript for the summarizer
+_MAX_MESSAGE_CHARS = 2000
+
+
+class SessionCompactor:
+    """
+    Summarizes old turns of a session into a persisted summary block.
+
+    Once the not-yet-summarized part of a session exceeds a token threshold,
+    everything except the newest keep_tokens worth of messages is folded into
+    session.metadata["summary"], and session.metadata["summarized_upto"]
+    records how many messages the summary covers (an index into the full
+    history, see Session.offset). Messages themselves are kept on disk;
+    get_history skips the summarized prefix.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        model: str | None = None,
+        counter: TokenCounter | None = None,
+        threshold_tokens: int = 24000,
+        keep_tokens: int = 8000,
+    ):
+        self.provider = provider
+        self.model = model
+        self.counter = counter or TokenCounter()
+        self.threshold_tokens = threshold_tokens
+        self.keep_tokens = keep_tokens
+
+    def needs_compaction(self, session: Session) -> bool:
+        """Check if the unsummarized messages exceed the threshold."""
+        start = max(0, session.metadata.get("summarized_upto", 0) - session.offset)
+        total = 0
+        for msg in session.messages[start:]:
+            total += self.counter.count_message(msg)
+            if total > self.threshold_tokens:
+                return True
+        return False
+
+    async def compact(self, session: Session) -> bool:
+        """
+        Fold older messages into the session summary.
+
+        Only reads the (append-only) message prefix it summarizes, so it can
+        run while new turns are appended to the same session.
+
+        Args:
+            session: Session to compact.
+
+        Returns:
+            True if the summary was updated.
+        """
+        # Messages older than the loaded window can't be summarized; start at the window
+        summarized_upto = session.metadata.get("summarized_upto", 0)
+        offset = session.offset
+        start = max(0, summarized_upto - offset)
+        end = self._split_point(session.messages, start)
+        if end <= start:
+            return False
+
+        previous = session.metadata.get("summary", "")
+        response = await self.provider.chat(
+            messages=self._build_prompt(previous, session.messages[start:end]),
+            model=self.model,
+            max_tokens=1024,
+            temperature=0.3,
+        )
+        if response.finish_reason == "error" or not response.content:
+            logger.warning(f"Compaction of session {session.key} failed: {response.content}")
+            return False
+
+        # The session may have been cleared or reloaded while we were waiting on the model
+        if (
+            session.metadata.get("summarized_upto", 0) != summarized_upto
+            or session.offset != offset
+            or len(session.messages) < end
+        ):
+            return False
+
+        session.metadata["summary"] = response.content.strip()
+        session.metadata["summarized_upto"] = offset + end
+        logger.info(f"Compacted session {session.key}: messages {offset + start}-{offset + end} summarized")
+        return True
+
+    def _split_point(self, messages: list[dict[str, Any]], start: int) -> int:
+        """Find the index after which the newest keep_tokens of messages remain verbatim."""
+        kept = 0
+        end = len(messages)
+        while end > start:
+            cost = self.counter.count_message(messages[end - 1])
+            if kept + cost > self.keep_tokens:
+                break
+            kept += cost
+            end -= 1
+
+        # Don't leave an assistant reply without the user message it answers
+        while end > start and messages[end - 1].get("role") == "user":
+            end -= 1
+        return end
+
+    def _build_prompt(self, previous: str, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Build the summarization request."""
+        lines = []
+        for m in messages:
+            content = m.get("content") or ""
+            if len(content) > _MAX_MESSAGE_CHARS:
+                content = content[:_MAX_MESSAGE_CHARS] + " ...(truncated)"
+            lines.append(f"{m.get('role', 'user')}: {content}")
+        transcript = "\n\n".join(lines)
+
+        request = f"Existing summary:\n{previous}\n\n" if previous else ""
+        request += f"New conversation turns:\n{transcript}"
+
+        return [
+            {"role": "system", "content": (
+                "You maintain a running summary of a conversation between a user and an AI assistant. "
+                "Merge the new turns into the existing summary. Keep facts, decisions, user preferences, "
+                "open tasks and anything the assistant promised to do; drop small talk. "
+                "Reply with the updated summary only, in under 400 words."
+            )},
+            {"role": "user", "content": request},
+        ]
@@ -2,6 +2,7 @@
 
 import base64
 import mimetypes
+import os
 import platform
 from pathlib import Path
 from typing import Any
@@ -24,31 +25,108 @@ class ContextBuilder:
         self.workspace = workspace
         self.memory = MemoryStore(workspace)
         self.skills = SkillsLoader(workspace)
+        # Workspace-derived prompt sections, keyed on the stat signature of their inputs
+        self._prompt_cache: tuple[tuple, list[str]] | None = None
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def build_system_prompt(self, skill_names: list[str] | None = None) -> str:
         """
-        Build the system prompt from bootstrap files, memory, and skills.
+        Build the stable part of the system prompt.
         
+        Identity, bootstrap files, long-term memory, and skills only change
+        when the workspace does, so this prefix stays byte-identical between
+        turns and can be served from provider-side prompt caches. It is also
+        cached locally until one of its input files changes.
+
         Args:
             skill_names: Optional list of skills to include.
         
         Returns:
-            Complete system prompt.
+            Stable system prompt.
         """
-        parts = []
+        signature = self._input_signature()
+        if self._prompt_cache and self._prompt_cache[0] == signature:
+            self.cache_hits += 1
+            sections = self._prompt_cache[1]
+        else:
+            self.cache_misses += 1
+            sections = [self._get_identity(), *self._build_workspace_sections()]
+            self._prompt_cache = (signature, sections)
         
-        # Core identity
-        parts.append(self._get_identity())
+        return "\n\n---\n\n".join(sections)
+
+    def build_volatile_context(self, channel: str | None = None, chat_id: str | None = None) -> str:
+        """
+        Build the per-turn part of the system prompt.
+
+        Args:
+            channel: Current channel (telegram, feishu, etc.).
+            chat_id: Current chat/user ID.
+
+        Returns:
+            Current time, today's notes, and session info.
+        """
+        from datetime import datetime
+        now = datetime.now().strftime("%Y-%m-%d %H:%M (%A)")
+        parts = [f"## Current Time\n{now}"]
+
+        today = self.memory.read_today()
+        if today:
+            parts.append(f"## Today's Notes\n{today}")
+
+        if channel and chat_id:
+            parts.append(f"## Current Session\nChannel: {channel}\nChat ID: {chat_id}")
+
+        return "\n\n".join(parts)
+
+    def cache_stats(self) -> dict[str, int]:
+        """Get system prompt cache hit/miss counters."""
+        return {"hits": self.cache_hits, "misses": self.cache_misses}
+
+    def _input_signature(self) -> tuple:
+        """
+        Stat every file the cached prompt sections are built from.
+
+        Returns:
+            Tuple of (path, mtime_ns, size) entries plus the environment that
+            skill requirement checks depend on.
+        """
+        paths = [self.workspace / name for name in self.BOOTSTRAP_FILES]
+        paths.append(self.memory.memory_file)
+
+        # Skill directories: the listing itself and each SKILL.md
+        for root in (self.skills.workspace_skills, self.skills.builtin_skills):
+            if not root or not root.is_dir():
+                continue
+            paths.append(root)
+            with os.scandir(root) as entries:
+                paths += sorted(Path(e.path) / "SKILL.md" for e in entries if e.is_dir())
+
+        entries = []
+        for path in paths:
+            try:
+                st = path.stat()
+                entries.append((str(path), st.st_mtime_ns, st.st_size))
+            except OSError:
+                entries.append((str(path), None, None))
+
+        # Requirement checks look at PATH (shutil.which) and env vars
+        return (tuple(entries), frozenset(os.environ.items()))
+
+    def _build_workspace_sections(self) -> list[str]:
+        """Build the prompt sections read from bootstrap files, memory, and skills."""
+        parts = []
         
         # Bootstrap files
         bootstrap = self._load_bootstrap_files()
         if bootstrap:
             parts.append(bootstrap)
         
-        # Memory context
-        memory = self.memory.get_memory_context()
-        if memory:
-            parts.append(f"# Memory\n\n{memory}")
+        # Long-term memory (today's notes go in the volatile context)
+        long_term = self.memory.read_long_term()
+        if long_term:
+            parts.append(f"# Memory\n\n## Long-term Memory\n{long_term}")
         
         # Skills - progressive loading
         # 1. Always-loaded skills: include full content
@@ -68,12 +146,10 @@ Skills with available="false" need dependencies installed first - you can try in
 
 {skills_summary}""")
         
-        return "\n\n---\n\n".join(parts)
+        return parts
     
     def _get_identity(self) -> str:
         """Get the core identity section."""
-        from datetime import datetime
-        now = datetime.now().strftime("%Y-%m-%d %H:%M (%A)")
         workspace_path = str(self.workspace.expanduser().resolve())
         system = platform.system()
         runtime = f"{'macOS' if system == 'Darwin' else system} {platform.machine()}, Python {platform.python_version()}"
@@ -87,9 +163,6 @@ You are nanobot, a helpful AI assistant. You have access to tools that allow you
 - Send messages to users on chat channels
 - Spawn subagents for complex background tasks
 
-## Current Time
-{now}
-
 ## Runtime
 {runtime}
 
@@ -126,6 +199,7 @@ When remembering something, write to {workspace_path}/memory/MEMORY.md"""
         media: list[str] | None = None,
         channel: str | None = None,
         chat_id: str | None = None,
+        summary: str | None = None,
     ) -> list[dict[str, Any]]:
         """
         Build the complete message list for an LLM call.
@@ -137,17 +211,20 @@ When remembering something, write to {workspace_path}/memory/MEMORY.md"""
             media: Optional list of local file paths for images/media.
             channel: Current channel (telegram, feishu, etc.).
             chat_id: Current chat/user ID.
+            summary: Optional summary of older turns no longer in history.
 
         Returns:
             List of messages including system prompt.
         """
         messages = []
 
-        # System prompt
-        system_prompt = self.build_system_prompt(skill_names)
-        if channel and chat_id:
-            system_prompt += f"\n\n## Current Session\nChannel: {channel}\nChat ID: {chat_id}"
-        messages.append({"role": "system", "content": system_prompt})
+        # System prompt: stable prefix first, per-turn details last, as separate
+        # blocks so providers can cache the prefix (see LiteLLMProvider)
+        blocks = [{"type": "text", "text": self.build_system_prompt(skill_names)}]
+        if summary:
+            blocks.append({"type": "text", "text": f"# Earlier Conversation (summary)\n\n{summary}"})
+        blocks.append({"type": "text", "text": self.build_volatile_context(channel, chat_id)})
+        messages.append({"role": "system", "content": blocks})
 
         # History
         messages.extend(history)
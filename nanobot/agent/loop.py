@@ -2,15 +2,23 @@
 
 import asyncio
 import json
+import time
+import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from loguru import logger
 
-from nanobot.bus.events import InboundMessage, OutboundMessage
-from nanobot.bus.queue import MessageBus
-from nanobot.providers.base import LLMProvider
+from nanobot.bus.debounce import MessageDebouncer
+from nanobot.bus.events import InboundMessage, OutboundMessage, Priority
+from nanobot.bus.priority import PrioritySemaphore
+from nanobot.bus.queue import BusClosedError, MessageBus
+from nanobot.providers.base import LLMProvider, LLMResponse, llm_priority
+from nanobot.agent.compaction import SessionCompactor
 from nanobot.agent.context import ContextBuilder
+from nanobot.agent.tokens import TokenCounter
+from nanobot.agent.tools.base import ToolContext
 from nanobot.agent.tools.registry import ToolRegistry
 from nanobot.agent.tools.filesystem import ReadFileTool, WriteFileTool, EditFileTool, ListDirTool
 from nanobot.agent.tools.shell import ExecTool
@@ -19,7 +27,42 @@ from nanobot.agent.tools.message import MessageTool
 from nanobot.agent.tools.spawn import SpawnTool
 from nanobot.agent.tools.cron import CronTool
 from nanobot.agent.subagent import SubagentManager
-from nanobot.session.manager import SessionManager
+from nanobot.session.manager import Session, SessionManager
+from nanobot.utils.writer import CoalescingWriter
+
+if TYPE_CHECKING:
+    from nanobot.config.schema import SessionConfig
+
+
+class _StreamPublisher:
+    """Publishes partial response text for one turn as throttled stream updates."""
+
+    def __init__(self, bus: MessageBus, channel: str, chat_id: str, interval_s: float = 1.0):
+        self.bus = bus
+        self.channel = channel
+        self.chat_id = chat_id
+        self.interval_s = interval_s
+        self.stream_id = uuid.uuid4().hex[:12]
+        self.started = False
+        self._last_sent = 0.0
+
+    async def update(self, parts: list[str]) -> None:
+        """Publish the text so far (first update immediately, then at most once per interval)."""
+        now = time.monotonic()
+        if self.started and now - self._last_sent < self.interval_s:
+            return
+        text = "".join(parts)
+        if not text.strip():
+            return
+        self.started = True
+        self._last_sent = now
+        await self.bus.publish_outbound(OutboundMessage(
+            channel=self.channel,
+            chat_id=self.chat_id,
+            content=text,
+            stream_id=self.stream_id,
+            partial=True,
+        ))
 
 
 class AgentLoop:
@@ -45,8 +88,19 @@ class AgentLoop:
         exec_config: "ExecToolConfig | None" = None,
         cron_service: "CronService | None" = None,
         restrict_to_workspace: bool = False,
+        max_concurrency: int = 4,
+        max_pending_turns: int = 0,
+        stream_responses: bool = False,
+        max_history_messages: int = 50,
+        history_tokens: int | None = None,
+        token_counter: TokenCounter | None = None,
+        compact_threshold_tokens: int = 0,
+        compact_keep_tokens: int = 8000,
+        session_config: "SessionConfig | None" = None,
+        debounce_s: float = 0.0,
+        debounce_max_wait_s: float = 5.0,
     ):
-        from nanobot.config.schema import ExecToolConfig
+        from nanobot.config.schema import ExecToolConfig, SessionConfig
         from nanobot.cron.service import CronService
         self.bus = bus
         self.provider = provider
@@ -57,9 +111,32 @@ class AgentLoop:
         self.exec_config = exec_config or ExecToolConfig()
         self.cron_service = cron_service
         self.restrict_to_workspace = restrict_to_workspace
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending_turns = max_pending_turns if max_pending_turns > 0 else 2 * self.max_concurrency
+        self.stream_responses = stream_responses
+        self.max_history_messages = max_history_messages
+        self.history_tokens = history_tokens
+        self.token_counter = token_counter or TokenCounter()
+        self.compactor = SessionCompactor(
+            provider=provider,
+            model=self.model,
+            counter=self.token_counter,
+            threshold_tokens=compact_threshold_tokens,
+            keep_tokens=compact_keep_tokens,
+        ) if compact_threshold_tokens > 0 else None
         
         self.context = ContextBuilder(workspace)
-        self.sessions = SessionManager(workspace)
+        session_config = session_config or SessionConfig()
+        self.writer = CoalescingWriter()
+        self.sessions = SessionManager(
+            workspace,
+            rewrite_every=session_config.rewrite_every,
+            max_cached=session_config.max_cached,
+            max_cache_bytes=session_config.max_cache_bytes,
+            backend=session_config.backend,
+            load_window=session_config.load_window,
+            writer=self.writer,
+        )
         self.tools = ToolRegistry()
         self.subagents = SubagentManager(
             provider=provider,
@@ -72,6 +149,25 @@ class AgentLoop:
         )
         
         self._running = False
+        self._run_task: asyncio.Task | None = None
+        # Turns for different sessions run concurrently (up to max_concurrency);
+        # turns within one session are serialized in arrival order. Free slots
+        # go to the most urgent waiting turn (interactive before background).
+        self._turn_slots = PrioritySemaphore(self.max_concurrency, aging_s=bus.aging_s)
+        self._session_locks: dict[str, asyncio.Lock] = {}
+        self._session_waiters: dict[str, int] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        # Messages taken off the bus whose turn has not finished yet. run() stops
+        # consuming at max_pending_turns, so the rest wait on the bus, where its
+        # size limits, overflow policy and priority lanes apply.
+        self._pending_turns = asyncio.Semaphore(self.max_pending_turns)
+        self._compacting: set[str] = set()
+        # Rapid consecutive user messages in one chat are merged into one turn
+        self.debouncer = MessageDebouncer(
+            self._start_turn,
+            window_s=debounce_s,
+            max_wait_s=debounce_max_wait_s,
+        ) if debounce_s > 0 else None
         self._register_default_tools()
     
     def _register_default_tools(self) -> None:
@@ -107,45 +203,206 @@ class AgentLoop:
             self.tools.register(CronTool(self.cron_service))
     
     async def run(self) -> None:
-        """Run the agent loop, processing messages from the bus."""
+        """
+        Run the agent loop, dispatching messages from the bus.
+
+        Returns when the bus is closed or stop() is called.
+        """
         self._running = True
-        logger.info("Agent loop started")
+        self._run_task = asyncio.current_task()
+        logger.info(
+            f"Agent loop started (max {self.max_concurrency} concurrent turns, "
+            f"{self.max_pending_turns} pending)"
+        )
         
-        while self._running:
-            try:
-                # Wait for next message
-                msg = await asyncio.wait_for(
-                    self.bus.consume_inbound(),
-                    timeout=1.0
-                )
-                
-                # Process it
+        try:
+            while True:
+                await self._pending_turns.acquire()
                 try:
-                    response = await self._process_message(msg)
+                    msg = await self.bus.consume_inbound()
+                except BaseException:
+                    self._pending_turns.release()
+                    raise
+                if self.debouncer and msg.priority == Priority.INTERACTIVE:
+                    # Only the held message keeps its slot; merged ones ride along with it
+                    if not self.debouncer.submit(self._get_session_key(msg), msg):
+                        self._pending_turns.release()
+                else:
+                    self._start_turn(msg)
+        except BusClosedError:
+            pass
+        except asyncio.CancelledError:
+            # stop() cancels the pending wait on the queue; anything else propagates
+            if self._running or self._run_task is None:
+                raise
+            self._run_task.uncancel()
+        finally:
+            if self.debouncer:
+                self.debouncer.flush()
+            self._running = False
+            self._run_task = None
+
+    def _start_turn(self, msg: InboundMessage, merged: list[InboundMessage] | None = None) -> None:
+        """Process a message in the background so other sessions aren't blocked."""
+        task = asyncio.create_task(self._dispatch(msg, merged or []))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, msg: InboundMessage, merged: list[InboundMessage]) -> None:
+        """
+        Process one inbound message, serialized within its session.
+
+        The message (and any messages debounced into it) is acknowledged on
+        the bus once the turn is over, whether or not it succeeded.
+        """
+        session_key = self._get_session_key(msg)
+        channel, chat_id = self._reply_target(msg)
+        streamer = _StreamPublisher(self.bus, channel, chat_id) if self.stream_responses else None
+        try:
+            async with self._session_turn(session_key, msg.priority):
+                try:
+                    response = await self._process_message(msg, streamer=streamer)
                     if response:
                         await self.bus.publish_outbound(response)
                 except Exception as e:
                     logger.error(f"Error processing message: {e}")
-                    # Send error response
+                    # Send error response (replacing any partial text already shown)
                     await self.bus.publish_outbound(OutboundMessage(
-                        channel=msg.channel,
-                        chat_id=msg.chat_id,
-                        content=f"Sorry, I encountered an error: {str(e)}"
+                        channel=channel,
+                        chat_id=chat_id,
+                        content=f"Sorry, I encountered an error: {str(e)}",
+                        stream_id=streamer.stream_id if streamer and streamer.started else None,
                     ))
-            except asyncio.TimeoutError:
-                continue
+        finally:
+            for handled in [msg, *merged]:
+                self.bus.ack(handled)
+            self._pending_turns.release()
+        self._schedule_compaction(session_key)
+
+    def _schedule_compaction(self, session_key: str) -> None:
+        """Summarize old turns of a session in the background once it grows past the threshold."""
+        if not self.compactor or session_key in self._compacting:
+            return
+
+        async def compact() -> None:
+            # Background work: waits behind interactive turns for rate limit budget
+            llm_priority.set(Priority.SYSTEM)
+            try:
+                session = await self.sessions.get_or_create_async(session_key)
+                if self.compactor.needs_compaction(session) and await self.compactor.compact(session):
+                    self.sessions.save(session)
+            except Exception as e:
+                logger.warning(f"Compaction of session {session_key} failed: {e}")
+            finally:
+                self._compacting.discard(session_key)
+
+        self._compacting.add(session_key)
+        task = asyncio.create_task(compact())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _reply_target(msg: InboundMessage) -> tuple[str, str]:
+        """Channel and chat a message's replies go to."""
+        if msg.channel != "system":
+            return msg.channel, msg.chat_id
+        # Parse origin from chat_id (format: "channel:chat_id")
+        if ":" in msg.chat_id:
+            origin_channel, origin_chat_id = msg.chat_id.split(":", 1)
+            return origin_channel, origin_chat_id
+        # Fallback
+        return "cli", msg.chat_id
+
+    @staticmethod
+    def _get_session_key(msg: InboundMessage) -> str:
+        """Get the session a message belongs to (system messages route to their origin)."""
+        if msg.channel == "system" and ":" in msg.chat_id:
+            return msg.chat_id
+        return msg.session_key
+
+    def _get_history(self, session: Session) -> list[dict[str, Any]]:
+        """Get the newest session history that fits the configured token budget."""
+        return session.get_history(
+            max_messages=self.max_history_messages,
+            max_tokens=self.history_tokens,
+            counter=self.token_counter,
+        )
+
+    @asynccontextmanager
+    async def _session_turn(self, session_key: str, priority: Priority = Priority.INTERACTIVE):
+        """
+        Acquire the right to run a turn for a session.
+
+        Waits for earlier turns of the same session (FIFO), then for a free
+        slot under the global concurrency cap, ahead of less urgent turns.
+        """
+        lock = self._session_locks.get(session_key)
+        if lock is None:
+            lock = self._session_locks[session_key] = asyncio.Lock()
+        self._session_waiters[session_key] = self._session_waiters.get(session_key, 0) + 1
+        try:
+            async with lock:
+                async with self._turn_slots.slot(priority):
+                    token = llm_priority.set(priority)
+                    try:
+                        yield
+                    finally:
+                        llm_priority.reset(token)
+        finally:
+            self._session_waiters[session_key] -= 1
+            if not self._session_waiters[session_key]:
+                del self._session_waiters[session_key]
+                self._session_locks.pop(session_key, None)
     
     def stop(self) -> None:
-        """Stop the agent loop."""
+        """Stop the agent loop, waking run() if it is waiting for a message."""
         self._running = False
+        if self._run_task is not None and self._run_task is not asyncio.current_task():
+            self._run_task.cancel()
         logger.info("Agent loop stopping")
     
-    async def _process_message(self, msg: InboundMessage) -> OutboundMessage | None:
+    async def drain(self) -> None:
+        """Wait for running and queued turns (and background compaction) to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def scheduler_stats(self) -> dict[str, Any]:
+        """
+        Per-priority latency histograms of the turn scheduler.
+
+        Returns:
+            Dict with the inbound queue wait ("queue") and the wait for a
+            free turn slot ("turn_slot"), each keyed by priority name.
+        """
+        return {
+            "queue": self.bus.queue_stats()["latency"],
+            "turn_slot": {
+                Priority(p).name.lower(): hist.snapshot()
+                for p, hist in sorted(self._turn_slots.wait_latency.items())
+            },
+        }
+
+    async def close(self) -> None:
+        """Wait for queued session writes, close the session store and the provider's connections."""
+        for name, hist in self.scheduler_stats()["turn_slot"].items():
+            logger.info(f"{name} turns: {hist['count']} run, slot wait p50 {hist['p50']:g}s p95 {hist['p95']:g}s")
+        await self.writer.flush()
+        self.sessions.close()
+        await self.provider.aclose()
+
+    async def _process_message(
+        self,
+        msg: InboundMessage,
+        session_key: str | None = None,
+        streamer: "_StreamPublisher | None" = None,
+    ) -> OutboundMessage | None:
         """
         Process a single inbound message.
         
         Args:
             msg: The inbound message to process.
+            session_key: Session to use instead of the message's own key.
+            streamer: If given, partial response text is published while generating.
         
         Returns:
             The response message, or None if no response needed.
@@ -153,80 +410,32 @@ class AgentLoop:
         # Handle system messages (subagent announces)
         # The chat_id contains the original "channel:chat_id" to route back to
         if msg.channel == "system":
-            return await self._process_system_message(msg)
+            return await self._process_system_message(msg, streamer=streamer)
         
         preview = msg.content[:80] + "..." if len(msg.content) > 80 else msg.content
         logger.info(f"Processing message from {msg.channel}:{msg.sender_id}: {preview}")
         
         # Get or create session
-        session = self.sessions.get_or_create(msg.session_key)
-        
-        # Update tool contexts
-        message_tool = self.tools.get("message")
-        if isinstance(message_tool, MessageTool):
-            message_tool.set_context(msg.channel, msg.chat_id)
-        
-        spawn_tool = self.tools.get("spawn")
-        if isinstance(spawn_tool, SpawnTool):
-            spawn_tool.set_context(msg.channel, msg.chat_id)
+        session = await self.sessions.get_or_create_async(session_key or msg.session_key)
         
-        cron_tool = self.tools.get("cron")
-        if isinstance(cron_tool, CronTool):
-            cron_tool.set_context(msg.channel, msg.chat_id)
+        # Per-turn tool context (tools are shared between concurrent turns)
+        tool_context = ToolContext(
+            channel=msg.channel, chat_id=msg.chat_id, session_key=session.key
+        )
         
-        # Build initial messages (use get_history for LLM-formatted messages)
-        messages = self.context.build_messages(
-            history=session.get_history(),
+        # Build initial messages (use get_history for LLM-formatted messages);
+        # prompt assembly reads workspace files, so it runs in a worker thread
+        messages = await asyncio.to_thread(
+            self.context.build_messages,
+            history=self._get_history(session),
+            summary=session.metadata.get("summary"),
             current_message=msg.content,
             media=msg.media if msg.media else None,
             channel=msg.channel,
             chat_id=msg.chat_id,
         )
         
-        # Agent loop
-        iteration = 0
-        final_content = None
-        
-        while iteration < self.max_iterations:
-            iteration += 1
-            
-            # Call LLM
-            response = await self.provider.chat(
-                messages=messages,
-                tools=self.tools.get_definitions(),
-                model=self.model
-            )
-            
-            # Handle tool calls
-            if response.has_tool_calls:
-                # Add assistant message with tool calls
-                tool_call_dicts = [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.name,
-                            "arguments": json.dumps(tc.arguments)  # Must be JSON string
-                        }
-                    }
-                    for tc in response.tool_calls
-                ]
-                messages = self.context.add_assistant_message(
-                    messages, response.content, tool_call_dicts
-                )
-                
-                # Execute tools
-                for tool_call in response.tool_calls:
-                    args_str = json.dumps(tool_call.arguments, ensure_ascii=False)
-                    logger.info(f"Tool call: {tool_call.name}({args_str[:200]})")
-                    result = await self.tools.execute(tool_call.name, tool_call.arguments)
-                    messages = self.context.add_tool_result(
-                        messages, tool_call.id, tool_call.name, result
-                    )
-            else:
-                # No tool calls, we're done
-                final_content = response.content
-                break
+        final_content = await self._run_agent_loop(messages, tool_context, streamer)
         
         if final_content is None:
             final_content = "I've completed processing but have no response to give."
@@ -243,10 +452,15 @@ class AgentLoop:
         return OutboundMessage(
             channel=msg.channel,
             chat_id=msg.chat_id,
-            content=final_content
+            content=final_content,
+            stream_id=streamer.stream_id if streamer and streamer.started else None,
         )
     
-    async def _process_system_message(self, msg: InboundMessage) -> OutboundMessage | None:
+    async def _process_system_message(
+        self,
+        msg: InboundMessage,
+        streamer: "_StreamPublisher | None" = None,
+    ) -> OutboundMessage | None:
         """
         Process a system message (e.g., subagent announce).
         
@@ -255,80 +469,28 @@ class AgentLoop:
         """
         logger.info(f"Processing system message from {msg.sender_id}")
         
-        # Parse origin from chat_id (format: "channel:chat_id")
-        if ":" in msg.chat_id:
-            parts = msg.chat_id.split(":", 1)
-            origin_channel = parts[0]
-            origin_chat_id = parts[1]
-        else:
-            # Fallback
-            origin_channel = "cli"
-            origin_chat_id = msg.chat_id
+        origin_channel, origin_chat_id = self._reply_target(msg)
         
         # Use the origin session for context
         session_key = f"{origin_channel}:{origin_chat_id}"
-        session = self.sessions.get_or_create(session_key)
-        
-        # Update tool contexts
-        message_tool = self.tools.get("message")
-        if isinstance(message_tool, MessageTool):
-            message_tool.set_context(origin_channel, origin_chat_id)
+        session = await self.sessions.get_or_create_async(session_key)
         
-        spawn_tool = self.tools.get("spawn")
-        if isinstance(spawn_tool, SpawnTool):
-            spawn_tool.set_context(origin_channel, origin_chat_id)
-        
-        cron_tool = self.tools.get("cron")
-        if isinstance(cron_tool, CronTool):
-            cron_tool.set_context(origin_channel, origin_chat_id)
+        # Per-turn tool context (tools are shared between concurrent turns)
+        tool_context = ToolContext(
+            channel=origin_channel, chat_id=origin_chat_id, session_key=session.key
+        )
         
         # Build messages with the announce content
-        messages = self.context.build_messages(
-            history=session.get_history(),
+        messages = await asyncio.to_thread(
+            self.context.build_messages,
+            history=self._get_history(session),
+            summary=session.metadata.get("summary"),
             current_message=msg.content,
             channel=origin_channel,
             chat_id=origin_chat_id,
         )
         
-        # Agent loop (limited for announce handling)
-        iteration = 0
-        final_content = None
-        
-        while iteration < self.max_iterations:
-            iteration += 1
-            
-            response = await self.provider.chat(
-                messages=messages,
-                tools=self.tools.get_definitions(),
-                model=self.model
-            )
-            
-            if response.has_tool_calls:
-                tool_call_dicts = [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.name,
-                            "arguments": json.dumps(tc.arguments)
-                        }
-                    }
-                    for tc in response.tool_calls
-                ]
-                messages = self.context.add_assistant_message(
-                    messages, response.content, tool_call_dicts
-                )
-                
-                for tool_call in response.tool_calls:
-                    args_str = json.dumps(tool_call.arguments, ensure_ascii=False)
-                    logger.info(f"Tool call: {tool_call.name}({args_str[:200]})")
-                    result = await self.tools.execute(tool_call.name, tool_call.arguments)
-                    messages = self.context.add_tool_result(
-                        messages, tool_call.id, tool_call.name, result
-                    )
-            else:
-                final_content = response.content
-                break
+        final_content = await self._run_agent_loop(messages, tool_context, streamer)
         
         if final_content is None:
             final_content = "Background task completed."
@@ -341,15 +503,104 @@ class AgentLoop:
         return OutboundMessage(
             channel=origin_channel,
             chat_id=origin_chat_id,
-            content=final_content
+            content=final_content,
+            stream_id=streamer.stream_id if streamer and streamer.started else None,
         )
     
+    async def _run_agent_loop(
+        self,
+        messages: list[dict[str, Any]],
+        tool_context: ToolContext,
+        streamer: "_StreamPublisher | None" = None,
+    ) -> str | None:
+        """
+        Run LLM calls and tool executions until the model gives a final answer.
+
+        Args:
+            messages: Initial message list (extended in place).
+            tool_context: Context passed to tools.
+            streamer: If given, partial text is published while generating.
+
+        Returns:
+            The final response text, or None if max_iterations was reached.
+        """
+        iteration = 0
+
+        while iteration < self.max_iterations:
+            iteration += 1
+
+            # Call LLM
+            response = await self._call_llm(messages, streamer)
+
+            # No tool calls, we're done
+            if not response.has_tool_calls:
+                return response.content
+
+            # Add assistant message with tool calls
+            tool_call_dicts = [
+                {
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {
+                        "name": tc.name,
+                        "arguments": json.dumps(tc.arguments)  # Must be JSON string
+                    }
+                }
+                for tc in response.tool_calls
+            ]
+            messages = self.context.add_assistant_message(
+                messages, response.content, tool_call_dicts
+            )
+
+            # Execute tools (independent calls run concurrently)
+            for tool_call in response.tool_calls:
+                args_str = json.dumps(tool_call.arguments, ensure_ascii=False)
+                logger.info(f"Tool call: {tool_call.name}({args_str[:200]})")
+            results = await self.tools.execute_batch(
+                [(tc.name, tc.arguments) for tc in response.tool_calls],
+                context=tool_context,
+            )
+            for tool_call, result in zip(response.tool_calls, results):
+                messages = self.context.add_tool_result(
+                    messages, tool_call.id, tool_call.name, result
+                )
+
+        return None
+
+    async def _call_llm(
+        self,
+        messages: list[dict[str, Any]],
+        streamer: "_StreamPublisher | None" = None,
+    ) -> LLMResponse:
+        """Call the LLM, streaming partial text to the streamer if given."""
+        if streamer is None:
+            return await self.provider.chat(
+                messages=messages,
+                tools=self.tools.get_definitions(),
+                model=self.model
+            )
+
+        parts: list[str] = []
+        response: LLMResponse | None = None
+        async for chunk in self.provider.stream_chat(
+            messages=messages,
+            tools=self.tools.get_definitions(),
+            model=self.model
+        ):
+            if chunk.delta:
+                parts.append(chunk.delta)
+                await streamer.update(parts)
+            if chunk.response:
+                response = chunk.response
+        return response or LLMResponse(content="".join(parts) or None)
+
     async def process_direct(
         self,
         content: str,
         session_key: str = "cli:direct",
         channel: str = "cli",
         chat_id: str = "direct",
+        priority: Priority = Priority.INTERACTIVE,
     ) -> str:
         """
         Process a message directly (for CLI or cron usage).
@@ -359,6 +610,7 @@ class AgentLoop:
             session_key: Session identifier.
             channel: Source channel (for context).
             chat_id: Source chat ID (for context).
+            priority: Scheduling class of the turn (e.g. Priority.CRON).
         
         Returns:
             The agent's response.
@@ -367,8 +619,11 @@ class AgentLoop:
             channel=channel,
             sender_id="user",
             chat_id=chat_id,
-            content=content
+            content=content,
+            priority=priority,
         )
         
-        response = await self._process_message(msg)
+        async with self._session_turn(session_key, priority):
+            response = await self._process_message(msg, session_key=session_key)
+        self._schedule_compaction(session_key)
         return response.content if response else ""
@@ -0,0 +1,74 @@
+"""Token counting for context budgeting."""
+
+from collections import OrderedDict
+from typing import Any, Callable
+
+from loguru import logger
+
+# Per-message framing overhead (role, separators) added by chat templates
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast tokenizer-free estimate (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def load_tokenizer(name: str = "estimate") -> Callable[[str], int]:
+    """
+    Get a token counting function by name.
+
+    Args:
+        name: "estimate" for the char-based estimate, or "tiktoken" /
+            "tiktoken:<encoding>" to use tiktoken if it is installed.
+
+    Returns:
+        Function mapping text to a token count.
+    """
+    if name.startswith("tiktoken"):
+        encoding_name = name.partition(":")[2] or "cl100k_base"
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(encoding_name)
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({e}), falling back to estimated token counts")
+    return estimate_tokens
+
+
+class TokenCounter:
+    """
+    Counts tokens in chat messages, caching counts per message content.
+
+    History is re-sent on every turn, so the same contents are counted over
+    and over; the LRU cache makes repeat counts a dict lookup.
+    """
+
+    def __init__(self, tokenizer: Callable[[str], int] | None = None, cache_size: int = 4096):
+        self.tokenizer = tokenizer or estimate_tokens
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    def count_text(self, text: str) -> int:
+        """Count tokens in a string."""
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+
+        count = self.tokenizer(text)
+        self._cache[text] = count
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return count
+
+    def count_message(self, message: dict[str, Any]) -> int:
+        """Count tokens in a chat message (text content blocks only)."""
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens = self.count_text(content)
+        elif isinstance(content, list):
+            tokens = sum(self.count_text(b["text"]) for b in content if isinstance(b, dict) and b.get("text"))
+        else:
+            tokens = 0
+        return tokens + MESSAGE_OVERHEAD
@@ -1,6 +1,6 @@
 """Agent tools module."""
 
-from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.base import Tool, ToolContext
 from nanobot.agent.tools.registry import ToolRegistry
 
-__all__ = ["Tool", "ToolRegistry"]
+__all__ = ["Tool", "ToolContext", "ToolRegistry"]
@@ -1,9 +1,23 @@
 """Base class for agent tools."""
 
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from typing import Any
 
 
+@dataclass(frozen=True)
+class ToolContext:
+    """
+    Per-invocation context for a tool call.
+
+    Describes the turn a tool is running in, so a single tool instance can
+    serve any number of concurrent turns.
+    """
+    channel: str = ""
+    chat_id: str = ""
+    session_key: str = ""
+
+
 class Tool(ABC):
     """
     Abstract base class for agent tools.
@@ -21,6 +35,16 @@ class Tool(ABC):
         "object": dict,
     }
     
+    # If True, the registry passes the current ToolContext as `context=` to execute()
+    needs_context: bool = False
+
+    # Tools with side effects set this to False: within one batch of tool calls
+    # they run on their own, in order, after the calls requested before them.
+    parallel_safe: bool = True
+
+    # Max concurrent executions of this tool across all turns sharing a registry
+    max_concurrency: int = 8
+
     @property
     @abstractmethod
     def name(self) -> str:
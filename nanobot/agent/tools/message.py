@@ -2,13 +2,16 @@
 
 from typing import Any, Callable, Awaitable
 
-from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.base import Tool, ToolContext
 from nanobot.bus.events import OutboundMessage
 
 
 class MessageTool(Tool):
     """Tool to send messages to users on chat channels."""
     
+    needs_context = True
+    parallel_safe = False
+
     def __init__(
         self, 
         send_callback: Callable[[OutboundMessage], Awaitable[None]] | None = None,
@@ -19,11 +22,6 @@ class MessageTool(Tool):
         self._default_channel = default_channel
         self._default_chat_id = default_chat_id
     
-    def set_context(self, channel: str, chat_id: str) -> None:
-        """Set the current message context."""
-        self._default_channel = channel
-        self._default_chat_id = chat_id
-    
     def set_send_callback(self, callback: Callable[[OutboundMessage], Awaitable[None]]) -> None:
         """Set the callback for sending messages."""
         self._send_callback = callback
@@ -62,10 +60,12 @@ class MessageTool(Tool):
         content: str, 
         channel: str | None = None, 
         chat_id: str | None = None,
+        context: ToolContext | None = None,
         **kwargs: Any
     ) -> str:
-        channel = channel or self._default_channel
-        chat_id = chat_id or self._default_chat_id
+        context = context or ToolContext()
+        channel = channel or context.channel or self._default_channel
+        chat_id = chat_id or context.chat_id or self._default_chat_id
         
         if not channel or not chat_id:
             return "Error: No target channel/chat specified"
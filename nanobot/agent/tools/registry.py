@@ -1,8 +1,9 @@
 """Tool registry for dynamic tool management."""
 
+import asyncio
 from typing import Any
 
-from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.base import Tool, ToolContext
 
 
 class ToolRegistry:
@@ -14,14 +15,17 @@ class ToolRegistry:
     
     def __init__(self):
         self._tools: dict[str, Tool] = {}
+        self._limits: dict[str, asyncio.Semaphore] = {}
     
     def register(self, tool: Tool) -> None:
         """Register a tool."""
         self._tools[tool.name] = tool
+        self._limits[tool.name] = asyncio.Semaphore(max(1, tool.max_concurrency))
     
     def unregister(self, name: str) -> None:
         """Unregister a tool by name."""
         self._tools.pop(name, None)
+        self._limits.pop(name, None)
     
     def get(self, name: str) -> Tool | None:
         """Get a tool by name."""
@@ -35,13 +39,19 @@ class ToolRegistry:
         """Get all tool definitions in OpenAI format."""
         return [tool.to_schema() for tool in self._tools.values()]
     
-    async def execute(self, name: str, params: dict[str, Any]) -> str:
+    async def execute(
+        self,
+        name: str,
+        params: dict[str, Any],
+        context: ToolContext | None = None,
+    ) -> str:
         """
         Execute a tool by name with given parameters.
         
         Args:
             name: Tool name.
             params: Tool parameters.
+            context: Context of the current turn (channel, chat_id).
         
         Returns:
             Tool execution result as string.
@@ -57,10 +67,56 @@ class ToolRegistry:
             errors = tool.validate_params(params)
             if errors:
                 return f"Error: Invalid parameters for tool '{name}': " + "; ".join(errors)
-            return await tool.execute(**params)
+            async with self._limits[name]:
+                if tool.needs_context:
+                    # The turn context is not the model's to set
+                    params = {k: v for k, v in params.items() if k != "context"}
+                    return await tool.execute(**params, context=context or ToolContext())
+                return await tool.execute(**params)
         except Exception as e:
             return f"Error executing {name}: {str(e)}"
     
+    async def execute_batch(
+        self,
+        calls: list[tuple[str, dict[str, Any]]],
+        context: ToolContext | None = None,
+    ) -> list[str]:
+        """
+        Execute the tool calls of one LLM response.
+
+        Consecutive parallel-safe calls run concurrently. A call to a tool
+        that is not parallel-safe waits for everything before it and runs
+        alone, so side effects keep the order the model asked for.
+
+        Args:
+            calls: (tool name, parameters) pairs in request order.
+            context: Context of the current turn.
+
+        Returns:
+            Results in the same order as `calls`.
+        """
+        results: list[str] = [""] * len(calls)
+        pending: list[int] = []
+
+        async def run_pending() -> None:
+            outputs = await asyncio.gather(
+                *(self.execute(*calls[i], context=context) for i in pending)
+            )
+            for i, output in zip(pending, outputs):
+                results[i] = output
+            pending.clear()
+
+        for i, (name, params) in enumerate(calls):
+            tool = self._tools.get(name)
+            if tool is None or tool.parallel_safe:
+                pending.append(i)
+                continue
+            await run_pending()
+            results[i] = await self.execute(name, params, context=context)
+        await run_pending()
+
+        return results
+
     @property
     def tool_names(self) -> list[str]:
         """Get list of registered tool names."""
@@ -2,7 +2,7 @@
 
 from typing import Any, TYPE_CHECKING
 
-from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.base import Tool, ToolContext
 
 if TYPE_CHECKING:
     from nanobot.agent.subagent import SubagentManager
@@ -16,15 +16,10 @@ class SpawnTool(Tool):
     to the main agent when complete.
     """
     
+    needs_context = True
+
     def __init__(self, manager: "SubagentManager"):
         self._manager = manager
-        self._origin_channel = "cli"
-        self._origin_chat_id = "direct"
-    
-    def set_context(self, channel: str, chat_id: str) -> None:
-        """Set the origin context for subagent announcements."""
-        self._origin_channel = channel
-        self._origin_chat_id = chat_id
     
     @property
     def name(self) -> str:
@@ -55,11 +50,18 @@ class SpawnTool(Tool):
             "required": ["task"],
         }
     
-    async def execute(self, task: str, label: str | None = None, **kwargs: Any) -> str:
+    async def execute(
+        self,
+        task: str,
+        label: str | None = None,
+        context: ToolContext | None = None,
+        **kwargs: Any,
+    ) -> str:
         """Spawn a subagent to execute the given task."""
+        context = context or ToolContext()
         return await self._manager.spawn(
             task=task,
             label=label,
-            origin_channel=self._origin_channel,
-            origin_chat_id=self._origin_chat_id,
+            origin_channel=context.channel or "cli",
+            origin_chat_id=context.chat_id or "direct",
         )
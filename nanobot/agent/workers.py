@@ -0,0 +1,503 @@
+"""Agent turns in worker processes, sharded by session."""
+
+import asyncio
+import itertools
+import multiprocessing as mp
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Any, Callable
+
+from loguru import logger
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.events import InboundMessage, OutboundMessage, Priority
+from nanobot.bus.queue import BusClosedError, MessageBus
+from nanobot.providers.ratelimit import RateLimiter
+from nanobot.utils.http import get_http_pool
+
+# A worker that ran at least this long before dying is restarted immediately
+_HEALTHY_UPTIME_S = 60.0
+_MAX_RESTART_DELAY_S = 30.0
+
+
+def shard_for(session_key: str, workers: int) -> int:
+    """Pick the worker that owns a session (stable across restarts)."""
+    return zlib.crc32(session_key.encode("utf-8")) % workers
+
+
+# ----------------------------------------------------------------------
+# Worker process
+# ----------------------------------------------------------------------
+
+class _RemoteRateLimiter(RateLimiter):
+    """
+    Rate limiter of a worker process whose budgets live in the front process.
+
+    acquire() asks the pool's RateLimiter over the result pipe and waits for
+    the grant; reconcile() is forwarded as is. All workers thus draw on one
+    set of budgets, as a single-process gateway does.
+    """
+
+    def __init__(self, results: Connection):
+        super().__init__()
+        self.results = results
+        self._grants: dict[int, asyncio.Future[None]] = {}
+        self._grant_ids = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    async def acquire(self, key: str, tokens: int, priority: int = 0) -> None:
+        grant_id = next(self._grant_ids)
+        granted = asyncio.get_running_loop().create_future()
+        self._grants[grant_id] = granted
+        try:
+            self.results.send(("acquire", grant_id, (key, tokens, int(priority))))
+            await granted
+        finally:
+            self._grants.pop(grant_id, None)
+
+    def grant(self, grant_id: int) -> None:
+        granted = self._grants.get(grant_id)
+        if granted is not None and not granted.done():
+            granted.set_result(None)
+
+    def reconcile(self, key: str, estimated: int, actual: int | None) -> None:
+        self.results.send(("reconcile", None, (key, estimated, actual)))
+
+
+class _WorkerBus(MessageBus):
+    """
+    Worker-local bus that reports finished turns back to the front process.
+
+    `rate_limiter` is set when the pool shares its LLM budgets; agent
+    factories pass it to their providers instead of building their own.
+    """
+
+    def __init__(self, results: Connection, shared_limits: bool = False):
+        super().__init__()
+        self.results = results
+        self.requests: dict[int, int] = {}  # id(msg) -> request id
+        self.rate_limiter = _RemoteRateLimiter(results) if shared_limits else None
+
+    def ack(self, msg: InboundMessage | OutboundMessage) -> None:
+        req_id = self.requests.pop(id(msg), None)
+        if req_id is not None:
+            self.results.send(("done", req_id, None))
+
+
+def _worker_main(
+    index: int,
+    inbox: Any,
+    results: Connection,
+    agent_factory: Callable[[MessageBus], AgentLoop],
+    shared_limits: bool = False,
+) -> None:
+    """Entry point of a worker process."""
+    try:
+        asyncio.run(_run_worker(index, inbox, results, agent_factory, shared_limits))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        results.close()
+
+
+async def _run_worker(
+    index: int,
+    inbox: Any,
+    results: Connection,
+    agent_factory: Callable[[MessageBus], AgentLoop],
+    shared_limits: bool = False,
+) -> None:
+    loop = asyncio.get_running_loop()
+    bus = _WorkerBus(results, shared_limits)
+    agent = agent_factory(bus)
+    requests: asyncio.Queue[tuple] = asyncio.Queue()
+
+    def read_inbox() -> None:
+        # Keeps reading after "stop": draining turns may still wait for rate limit grants
+        while True:
+            item = inbox.get()
+            if item[0] == "grant":
+                loop.call_soon_threadsafe(bus.rate_limiter.grant, item[1])
+            else:
+                loop.call_soon_threadsafe(requests.put_nowait, item)
+
+    async def forward_outbound() -> None:
+        async for msg in bus.outbound():
+            results.send(("out", msg, None))
+
+    async def direct(req_id: int, kwargs: dict[str, Any]) -> None:
+        try:
+            result = await agent.process_direct(**kwargs)
+        except Exception as e:
+            logger.error(f"Worker {index}: direct turn failed: {e}")
+            result = f"Error: {e}"
+        results.send(("done", req_id, result))
+
+    threading.Thread(target=read_inbox, name=f"worker-{index}-inbox", daemon=True).start()
+    runner = asyncio.create_task(agent.run())
+    forwarder = asyncio.create_task(forward_outbound())
+    directs: set[asyncio.Task[None]] = set()
+    logger.info(f"Agent worker {index} started")
+
+    while True:
+        kind, req_id, payload = await requests.get()
+        if kind == "turn":
+            bus.requests[id(payload)] = req_id
+            await bus.publish_inbound(payload)
+        elif kind == "direct":
+            task = asyncio.create_task(direct(req_id, payload))
+            directs.add(task)
+            task.add_done_callback(directs.discard)
+        elif kind == "stop":
+            break
+
+    # Graceful drain: finish queued and running turns, then flush sessions
+    bus.close_inbound()
+    await runner
+    await agent.drain()
+    await asyncio.gather(*directs, return_exceptions=True)
+    await agent.close()
+    await get_http_pool().aclose()
+    bus.close()
+    await forwarder
+    logger.info(f"Agent worker {index} stopped")
+
+
+# ----------------------------------------------------------------------
+# Front process
+# ----------------------------------------------------------------------
+
+@dataclass
+class _Request:
+    kind: str  # "turn" or "direct"
+    payload: Any  # InboundMessage, or process_direct kwargs
+    deliveries: int = 0
+    future: asyncio.Future[str] | None = None
+
+
+@dataclass
+class _Worker:
+    index: int
+    process: Any = None
+    inbox: Any = None
+    drained: asyncio.Event | None = None  # Set once every result of the current process was handled
+    started_at: float = 0.0
+    restart_delay_s: float = 0.0
+
+
+class WorkerPool:
+    """
+    Runs agent turns in worker processes, sharded by session key.
+
+    Channels, cron and heartbeat stay in the front process; each inbound
+    message goes to worker crc32(session_key) % N, so a session always runs
+    in the same process and its turns stay ordered. Each worker runs its own
+    AgentLoop (built by `agent_factory`, which must be a picklable module-
+    level function), takes requests from its own multiprocessing queue and
+    sends results back over its own pipe, so a crashing worker cannot wedge
+    the channels of the others.
+
+    With a `rate_limiter`, workers do not limit LLM calls on their own: each
+    call asks this limiter over the worker's pipe (see _RemoteRateLimiter),
+    so the configured budgets hold for the gateway as a whole.
+
+    Requests a worker has not finished are tracked; if the worker dies it is
+    restarted and they are redelivered once. close() drains: workers finish
+    queued turns and flush their sessions before exiting. Turns still
+    unfinished when a worker is killed at close are not acknowledged, so a
+    durable bus replays them after a restart.
+
+    At most `max_pending_turns` bus messages are handed to workers and not
+    yet finished; further messages wait on the bus, where its limits and
+    priority lanes apply (see AgentLoop).
+
+    The pool mirrors the AgentLoop interface used by the gateway (run, stop,
+    drain, close, process_direct).
+    """
+
+    def __init__(
+        self,
+        bus: MessageBus,
+        agent_factory: Callable[[MessageBus], AgentLoop],
+        workers: int = 2,
+        drain_timeout_s: float = 30.0,
+        max_deliveries: int = 2,
+        max_pending_turns: int = 0,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.bus = bus
+        self.rate_limiter = rate_limiter if rate_limiter is not None and rate_limiter.enabled else None
+        self.agent_factory = agent_factory
+        self.drain_timeout_s = drain_timeout_s
+        self.max_deliveries = max_deliveries
+        self.restarts = 0
+        self._ctx = mp.get_context("spawn")
+        self._workers = [_Worker(i) for i in range(max(1, workers))]
+        self.max_pending_turns = max_pending_turns if max_pending_turns > 0 else 8 * len(self._workers)
+        self._pending_turns = asyncio.Semaphore(self.max_pending_turns)
+        self._pending: list[dict[int, _Request]] = [{} for _ in self._workers]
+        self._req_ids = itertools.count(1)
+        self._results: asyncio.Queue[tuple] = asyncio.Queue()
+        self._watchers: list[asyncio.Task[None]] = []
+        self._grants: set[asyncio.Task[None]] = set()
+        self._pump_task: asyncio.Task[None] | None = None
+        self._run_task: asyncio.Task | None = None
+        self._started = False
+        self._stopping = False
+        self._drain_deadline: float | None = None
+
+    @property
+    def size(self) -> int:
+        """Number of worker processes."""
+        return len(self._workers)
+
+    async def start(self) -> None:
+        """Spawn the workers (run() calls this if needed)."""
+        if self._started:
+            return
+        self._started = True
+        self._pump_task = asyncio.create_task(self._pump())
+        for worker in self._workers:
+            self._spawn(worker)
+            self._watchers.append(asyncio.create_task(self._watch(worker)))
+        logger.info(f"Started {self.size} agent worker processes")
+
+    async def run(self) -> None:
+        """Dispatch inbound messages to the workers until stop() or the bus closes."""
+        await self.start()
+        self._run_task = asyncio.current_task()
+        try:
+            while True:
+                await self._pending_turns.acquire()
+                try:
+                    msg = await self.bus.consume_inbound()
+                except BaseException:
+                    self._pending_turns.release()
+                    raise
+                self._submit(AgentLoop._get_session_key(msg), _Request("turn", msg))
+        except BusClosedError:
+            pass
+        except asyncio.CancelledError:
+            if not self._stopping or self._run_task is None:
+                raise
+            self._run_task.uncancel()
+        finally:
+            self._run_task = None
+
+    async def process_direct(
+        self,
+        content: str,
+        session_key: str = "cli:direct",
+        channel: str = "cli",
+        chat_id: str = "direct",
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> str:
+        """Run a turn on the worker owning the session (see AgentLoop.process_direct)."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        kwargs = {
+            "content": content,
+            "session_key": session_key,
+            "channel": channel,
+            "chat_id": chat_id,
+            "priority": priority,
+        }
+        self._submit(session_key, _Request("direct", kwargs, future=future))
+        return await future
+
+    def stop(self) -> None:
+        """Stop taking new messages from the bus (close() drains the workers)."""
+        self._stopping = True
+        if self._run_task is not None and self._run_task is not asyncio.current_task():
+            self._run_task.cancel()
+
+    async def drain(self) -> None:
+        """Let workers finish queued turns and exit (see close() for the time limit)."""
+        self._stopping = True
+        if not self._started:
+            return
+        self._stop_workers()
+        await asyncio.wait(self._watchers)
+
+    async def close(self) -> None:
+        """Let workers finish queued turns and exit; kill any that don't within drain_timeout_s."""
+        self._stopping = True
+        if not self._started:
+            return
+        self._stop_workers()
+
+        remaining = max(0.0, self._drain_deadline - time.monotonic())
+        _, pending = await asyncio.wait(self._watchers, timeout=remaining)
+        for worker in self._workers:
+            if worker.process.is_alive():
+                logger.warning(f"Agent worker {worker.index} did not drain in time, terminating")
+                worker.process.terminate()
+        if pending:
+            await asyncio.wait(pending, timeout=5)
+
+        for worker in self._workers:
+            await worker.drained.wait()
+        self._results.put_nowait(("closed", None, None, None))
+        await self._pump_task
+        for task in self._grants:
+            task.cancel()
+        await asyncio.gather(*self._grants, return_exceptions=True)
+        for requests in self._pending:
+            for request in requests.values():
+                if request.kind == "turn":
+                    # Left unacknowledged so a durable bus replays it on the next start
+                    self._pending_turns.release()
+                else:
+                    self._fail(request, "agent worker pool closed")
+            requests.clear()
+
+    def _stop_workers(self) -> None:
+        """Ask every worker to drain and exit (once); starts the drain_timeout_s clock."""
+        if self._drain_deadline is not None:
+            return
+        self._drain_deadline = time.monotonic() + self.drain_timeout_s
+        for worker in self._workers:
+            if worker.process.is_alive():
+                worker.inbox.put(("stop", None, None))
+
+    def _submit(self, session_key: str, request: _Request) -> None:
+        index = shard_for(session_key, self.size)
+        req_id = next(self._req_ids)
+        self._pending[index][req_id] = request
+        self._deliver(self._workers[index], req_id, request)
+
+    def _deliver(self, worker: _Worker, req_id: int, request: _Request) -> None:
+        if not worker.process.is_alive():
+            # Dead or waiting to be restarted: stays pending and _watch delivers it to the new process
+            return
+        request.deliveries += 1
+        worker.inbox.put((request.kind, req_id, request.payload))
+
+    def _spawn(self, worker: _Worker) -> None:
+        loop = asyncio.get_running_loop()
+        receiver, sender = self._ctx.Pipe(duplex=False)
+        worker.inbox = self._ctx.Queue()
+        worker.drained = asyncio.Event()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, worker.inbox, sender, self.agent_factory, self.rate_limiter is not None),
+            name=f"nanobot-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        # Only the child may hold the write end, so reads hit EOF when it exits
+        sender.close()
+
+        def read_results() -> None:
+            with receiver:
+                while True:
+                    try:
+                        kind, a, b = receiver.recv()
+                    except (EOFError, OSError):
+                        break
+                    except Exception as e:
+                        # A torn message from a dying worker; the pipe is unusable after it
+                        logger.warning(f"Bad result from agent worker {worker.index}: {e}")
+                        break
+                    loop.call_soon_threadsafe(self._results.put_nowait, (kind, worker.index, a, b))
+            loop.call_soon_threadsafe(self._results.put_nowait, ("eof", worker.index, worker.drained, None))
+
+        threading.Thread(target=read_results, name=f"worker-{worker.index}-results", daemon=True).start()
+
+    async def _watch(self, worker: _Worker) -> None:
+        """Restart a worker when it dies, redelivering its unfinished requests."""
+        while True:
+            process = worker.process
+            await self._exited(worker)
+            # Handle everything the old process managed to send before redelivering
+            await worker.drained.wait()
+            if self._stopping:
+                return
+
+            self.restarts += 1
+            uptime = time.monotonic() - worker.started_at
+            worker.restart_delay_s = 0.0 if uptime > _HEALTHY_UPTIME_S else min(
+                _MAX_RESTART_DELAY_S, max(1.0, worker.restart_delay_s * 2)
+            )
+            logger.error(
+                f"Agent worker {worker.index} exited with code {process.exitcode}; "
+                f"restarting in {worker.restart_delay_s:g}s"
+            )
+            await asyncio.sleep(worker.restart_delay_s)
+            if self._stopping:
+                return
+            self._spawn(worker)
+
+            requests = self._pending[worker.index]
+            for req_id in sorted(requests):
+                request = requests[req_id]
+                if request.deliveries >= self.max_deliveries:
+                    logger.error(f"Dropping request {req_id} after {request.deliveries} failed deliveries")
+                    del requests[req_id]
+                    self._fail(request, "agent worker crashed while handling this request")
+                else:
+                    self._deliver(worker, req_id, request)
+
+    @staticmethod
+    async def _exited(worker: _Worker) -> None:
+        """Wait for a worker process to exit (on its own thread, not the default executor)."""
+        loop = asyncio.get_running_loop()
+        exited = loop.create_future()
+        process = worker.process
+
+        def join() -> None:
+            process.join()
+            try:
+                loop.call_soon_threadsafe(lambda: exited.done() or exited.set_result(None))
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        threading.Thread(target=join, name=f"worker-{worker.index}-join", daemon=True).start()
+        await exited
+
+    async def _pump(self) -> None:
+        """Apply results from the workers in the order they were sent."""
+        while True:
+            kind, index, a, b = await self._results.get()
+            if kind == "closed":
+                return
+            if kind == "eof":
+                a.set()
+            elif kind == "out":
+                await self.bus.publish_outbound(a)
+            elif kind == "acquire":
+                task = asyncio.create_task(self._grant(self._workers[index], a, *b))
+                self._grants.add(task)
+                task.add_done_callback(self._grants.discard)
+            elif kind == "reconcile":
+                self.rate_limiter.reconcile(*b)
+            elif kind == "done":
+                request = self._pending[index].pop(a, None)
+                if request is None:
+                    continue
+                if request.kind == "turn":
+                    self.bus.ack(request.payload)
+                    self._pending_turns.release()
+                elif request.future and not request.future.done():
+                    request.future.set_result(b or "")
+
+    async def _grant(self, worker: _Worker, grant_id: int, key: str, tokens: int, priority: int) -> None:
+        """Wait for budget on behalf of a worker's LLM call, then let it go ahead."""
+        process = worker.process
+        await self.rate_limiter.acquire(key, tokens, priority)
+        if worker.process is process and process.is_alive():
+            worker.inbox.put(("grant", grant_id, None))
+
+    def _fail(self, request: _Request, reason: str) -> None:
+        if request.kind == "turn":
+            self.bus.ack(request.payload)
+            self._pending_turns.release()
+        elif request.future and not request.future.done():
+            request.future.set_exception(RuntimeError(reason))
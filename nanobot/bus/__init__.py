@@ -1,6 +1,6 @@
 """Message bus module for decoupled channel-agent communication."""
 
-from nanobot.bus.events import InboundMessage, OutboundMessage
-from nanobot.bus.queue import MessageBus
+from nanobot.bus.events import InboundMessage, OutboundMessage, Priority
+from nanobot.bus.queue import BusClosedError, MessageBus
 
-__all__ = ["MessageBus", "InboundMessage", "OutboundMessage"]
+__all__ = ["MessageBus", "BusClosedError", "InboundMessage", "OutboundMessage", "Priority"]
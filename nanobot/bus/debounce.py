@@ -0,0 +1,94 @@
+"""Debouncing of rapid consecutive messages from the same chat."""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from nanobot.bus.events import InboundMessage
+
+
+@dataclass
+class _Pending:
+    msg: InboundMessage
+    first_at: float
+    timer: asyncio.TimerHandle
+    merged: list[InboundMessage] = field(default_factory=list)
+
+
+class MessageDebouncer:
+    """
+    Merges messages for the same key that arrive in quick succession.
+
+    A message is held for `window_s`; every further message for the same key
+    within the window is merged into it (content joined with newlines, media
+    and metadata combined) and restarts the window, up to `max_wait_s` after
+    the first message. The merged message is then passed to `on_ready`
+    along with the messages folded into it (e.g. to acknowledge them).
+    """
+
+    def __init__(
+        self,
+        on_ready: Callable[[InboundMessage, list[InboundMessage]], None],
+        window_s: float = 1.5,
+        max_wait_s: float = 5.0,
+    ):
+        self.on_ready = on_ready
+        self.window_s = window_s
+        self.max_wait_s = max(max_wait_s, window_s)
+        self._pending: dict[str, _Pending] = {}
+        self.received = 0
+        self.merged = 0
+
+    def submit(self, key: str, msg: InboundMessage) -> bool:
+        """
+        Hold a message, merging it with a pending one for the same key.
+
+        Args:
+            key: Grouping key (usually the session key).
+            msg: The incoming message.
+
+        Returns:
+            True if the message is held on its own, False if it was merged
+            into a message already held for the key.
+        """
+        self.received += 1
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        pending = self._pending.get(key)
+        if pending is None:
+            timer = loop.call_later(self.window_s, self._release, key)
+            self._pending[key] = _Pending(msg, now, timer)
+            return True
+
+        self._merge(pending.msg, msg)
+        pending.merged.append(msg)
+        self.merged += 1
+        pending.timer.cancel()
+        delay = min(self.window_s, pending.first_at + self.max_wait_s - now)
+        pending.timer = loop.call_later(max(0.0, delay), self._release, key)
+        return False
+
+    def flush(self) -> None:
+        """Release all held messages immediately."""
+        for key in list(self._pending):
+            self._pending[key].timer.cancel()
+            self._release(key)
+
+    @property
+    def pending(self) -> int:
+        """Number of keys with a held message."""
+        return len(self._pending)
+
+    def _release(self, key: str) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self.on_ready(pending.msg, pending.merged)
+
+    @staticmethod
+    def _merge(target: InboundMessage, msg: InboundMessage) -> None:
+        """Fold msg into target, keeping target's timestamp."""
+        if msg.content:
+            target.content = f"{target.content}\n{msg.content}" if target.content else msg.content
+        target.media.extend(msg.media)
+        target.metadata.update(msg.metadata)
@@ -0,0 +1,268 @@
+"""Message bus backed by an on-disk write-ahead log."""
+
+import asyncio
+import json
+import os
+import threading
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from nanobot.bus.events import InboundMessage, OutboundMessage, Priority
+from nanobot.bus.queue import MessageBus
+
+
+def _encode(queue: str, msg: InboundMessage | OutboundMessage) -> dict[str, Any]:
+    data = asdict(msg)
+    if isinstance(msg, InboundMessage):
+        data["timestamp"] = msg.timestamp.isoformat()
+        data["priority"] = int(msg.priority)
+    return {"queue": queue, "msg": data}
+
+
+def _decode(record: dict[str, Any]) -> InboundMessage | OutboundMessage:
+    data = dict(record["msg"])
+    if record["queue"] == "inbound":
+        data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+        data["priority"] = Priority(data.get("priority", 0))
+        return InboundMessage(**data)
+    return OutboundMessage(**data)
+
+
+class DurableMessageBus(MessageBus):
+    """
+    MessageBus that survives a crash of the gateway process.
+
+    Every message entering a queue is appended to a write-ahead log before
+    publish returns, and an ack record is appended once the message has been
+    handled (see MessageBus.ack). On startup, messages without an ack are
+    queued again, so delivery is at-least-once.
+
+    Writes are group-committed: records staged within `commit_interval_s`
+    are written and fsynced together by one background task, so concurrent
+    publishers share a single fsync. When the log grows past
+    `segment_bytes` it is checkpointed into a new segment holding only the
+    unacknowledged messages, and the old segment is deleted.
+
+    Streaming updates (OutboundMessage.partial) are not persisted.
+    """
+
+    def __init__(
+        self,
+        wal_dir: Path,
+        segment_bytes: int = 4 * 1024 * 1024,
+        commit_interval_s: float = 0.005,
+        fsync: bool = True,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.wal_dir = wal_dir
+        self.segment_bytes = segment_bytes
+        self.commit_interval_s = commit_interval_s
+        self.fsync = fsync
+        self.commits = 0
+        self.records = 0
+
+        # WAL id -> encoded put record, for messages not yet acknowledged
+        self._live: dict[int, str] = {}
+        # id(msg) -> (WAL id, msg) for queued or in-flight messages
+        self._ids: dict[int, tuple[int, InboundMessage | OutboundMessage]] = {}
+        self._next_id = 1
+        self._batch: list[str] = []
+        self._batch_done: asyncio.Future[None] | None = None
+        self._committer: asyncio.Task[None] | None = None
+        self._io_lock = threading.Lock()
+
+        self.wal_dir.mkdir(parents=True, exist_ok=True)
+        self._segment = self._replay()
+        self._file = open(self._segment, "a", encoding="utf-8")
+
+    # ------------------------------------------------------------------
+    # Publishing and acknowledgement
+    # ------------------------------------------------------------------
+
+    async def publish_inbound(self, msg: InboundMessage) -> None:
+        """Publish a message from a channel; returns once it is on disk."""
+        staged = self.records
+        await super().publish_inbound(msg)
+        if self.records != staged:
+            await self._wait_committed()
+
+    async def publish_outbound(self, msg: OutboundMessage) -> None:
+        """Publish a response to channels; returns once it is on disk."""
+        staged = self.records
+        await super().publish_outbound(msg)
+        if self.records != staged:
+            await self._wait_committed()
+
+    def _enqueued(self, queue: str, msg: InboundMessage | OutboundMessage) -> None:
+        if isinstance(msg, OutboundMessage) and msg.partial:
+            return
+        entry = self._ids.get(id(msg))
+        if entry is None:
+            wal_id = self._next_id
+            self._next_id += 1
+            self._ids[id(msg)] = (wal_id, msg)
+        else:
+            # A queued message changed (coalesced); the newer put record wins on replay
+            wal_id = entry[0]
+        line = json.dumps({"op": "put", "id": wal_id, **_encode(queue, msg)}, ensure_ascii=False)
+        self._live[wal_id] = line
+        self._stage(line)
+
+    def ack(self, msg: InboundMessage | OutboundMessage) -> None:
+        """Record that a message was handled so it is not replayed."""
+        entry = self._ids.pop(id(msg), None)
+        if entry is None:
+            return
+        wal_id = entry[0]
+        self._live.pop(wal_id, None)
+        self._stage(json.dumps({"op": "ack", "id": wal_id}))
+
+    # ------------------------------------------------------------------
+    # Group commit
+    # ------------------------------------------------------------------
+
+    def _stage(self, line: str) -> None:
+        """Queue a record for the next group commit (written inline without a loop)."""
+        self.records += 1
+        if self._file.closed:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write([line])
+            return
+
+        self._batch.append(line)
+        if self._batch_done is None:
+            self._batch_done = loop.create_future()
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.create_task(self._commit_loop())
+
+    async def _wait_committed(self) -> None:
+        if self._batch_done is not None:
+            await asyncio.shield(self._batch_done)
+
+    async def _commit_loop(self) -> None:
+        """Write staged records in batches until none are left."""
+        await asyncio.sleep(self.commit_interval_s)
+        while self._batch:
+            lines, done = self._batch, self._batch_done
+            self._batch, self._batch_done = [], None
+            try:
+                await asyncio.to_thread(self._write, lines)
+                if not self._file.closed and self._file.tell() > self.segment_bytes:
+                    await asyncio.to_thread(self._checkpoint, list(self._live.values()))
+            except Exception as e:
+                logger.error(f"Bus WAL write failed: {e}")
+                if done and not done.done():
+                    done.set_exception(e)
+                continue
+            if done and not done.done():
+                done.set_result(None)
+
+    def _write(self, lines: list[str]) -> None:
+        """Append records to the active segment and make them durable."""
+        with self._io_lock:
+            if self._file.closed:
+                return
+            self._file.write("".join(line + "\n" for line in lines))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.commits += 1
+
+    def _checkpoint(self, live: list[str]) -> None:
+        """Start a new segment containing only unacknowledged messages."""
+        with self._io_lock:
+            old = self._segment
+            new = self._segment_path(self._segment_number(old) + 1)
+            with open(new, "w", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in live))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            self._file = open(new, "a", encoding="utf-8")
+            self._segment = new
+            old.unlink(missing_ok=True)
+        logger.debug(f"Bus WAL checkpointed: {len(live)} pending messages carried to {new.name}")
+
+    async def flush(self) -> None:
+        """Wait until every staged record is on disk."""
+        while self._committer is not None and not self._committer.done():
+            await asyncio.shield(self._committer)
+
+    def close(self) -> None:
+        """Close the bus; staged records are written and the log is closed."""
+        super().close()
+        if self._batch:
+            lines, done = self._batch, self._batch_done
+            self._batch, self._batch_done = [], None
+            self._write(lines)
+            if done and not done.done():
+                done.set_result(None)
+        with self._io_lock:
+            self._file.close()
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, number: int) -> Path:
+        return self.wal_dir / f"wal-{number:08d}.log"
+
+    @staticmethod
+    def _segment_number(path: Path) -> int:
+        return int(path.stem.split("-")[1])
+
+    def _replay(self) -> Path:
+        """Requeue unacknowledged messages from existing segments; return the active segment."""
+        segments = sorted(self.wal_dir.glob("wal-*.log"), key=self._segment_number)
+        records: dict[int, dict[str, Any]] = {}
+        for segment in segments:
+            with open(segment, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write at crash time
+                    wal_id = record.get("id", 0)
+                    self._next_id = max(self._next_id, wal_id + 1)
+                    if record.get("op") == "put":
+                        records[wal_id] = record
+                    else:
+                        records.pop(wal_id, None)
+
+        for wal_id in sorted(records):
+            record = records[wal_id]
+            try:
+                msg = _decode(record)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping unreadable bus WAL record {wal_id}: {e}")
+                continue
+            self._ids[id(msg)] = (wal_id, msg)
+            self._live[wal_id] = json.dumps(record, ensure_ascii=False)
+            if record["queue"] == "inbound":
+                self._channel_depth[msg.channel] += 1
+                self._sender_depth[(msg.channel, msg.sender_id)] += 1
+                self._inbound.put(msg)
+            else:
+                self._outbound.put(msg)
+
+        if records:
+            logger.info(f"Recovered {len(self._live)} unacknowledged messages from the bus WAL")
+
+        # Start from a compact segment holding just the recovered messages
+        number = self._segment_number(segments[-1]) + 1 if segments else 1
+        active = self._segment_path(number)
+        with open(active, "w", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in self._live.values()))
+            f.flush()
+            os.fsync(f.fileno())
+        for segment in segments:
+            segment.unlink(missing_ok=True)
+        return active
@@ -2,9 +2,19 @@
 
 from dataclasses import dataclass, field
 from datetime import datetime
+from enum import IntEnum
 from typing import Any
 
 
+class Priority(IntEnum):
+    """Scheduling class of an agent turn (lower runs first)."""
+
+    INTERACTIVE = 0  # A person waiting for a reply
+    SYSTEM = 1  # Subagent result announcements
+    CRON = 2  # Scheduled jobs
+    HEARTBEAT = 3  # Periodic background check-ins
+
+
 @dataclass
 class InboundMessage:
     """Message received from a chat channel."""
@@ -16,6 +26,7 @@ class InboundMessage:
     timestamp: datetime = field(default_factory=datetime.now)
     media: list[str] = field(default_factory=list)  # Media URLs
     metadata: dict[str, Any] = field(default_factory=dict)  # Channel-specific data
+    priority: Priority = Priority.INTERACTIVE
     
     @property
     def session_key(self) -> str:
@@ -33,5 +44,7 @@ class OutboundMessage:
     reply_to: str | None = None
     media: list[str] = field(default_factory=list)
     metadata: dict[str, Any] = field(default_factory=dict)
+    stream_id: str | None = None  # Messages with the same stream_id update one chat message
+    partial: bool = False  # True for in-progress stream updates (content is the text so far)
 
 
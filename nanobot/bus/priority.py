@@ -0,0 +1,94 @@
+"""Priority scheduling helpers shared by the bus and the agent loop."""
+
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from nanobot.utils.metrics import LatencyHistogram
+
+
+def effective_priority(priority: int, waited_s: float, aging_s: float) -> float:
+    """
+    Priority of a waiting item after aging (lower runs first).
+
+    Every aging_s seconds of waiting promotes an item by one class, so
+    background work cannot be starved by a steady stream of urgent work.
+    """
+    if aging_s <= 0:
+        return priority
+    return priority - waited_s / aging_s
+
+
+class PrioritySemaphore:
+    """
+    Semaphore that hands free slots to the most urgent waiter.
+
+    Waiters are ordered by effective_priority() and then by arrival, so with
+    aging enabled a long-waiting background waiter eventually goes first.
+    Time spent waiting for a slot is recorded per priority.
+    """
+
+    def __init__(self, value: int, aging_s: float = 0.0):
+        self.aging_s = aging_s
+        self.wait_latency: dict[int, LatencyHistogram] = {}
+        self._value = value
+        self._waiters: list[tuple[int, int, float, asyncio.Future[None]]] = []
+        self._seq = itertools.count()
+
+    def locked(self) -> bool:
+        """Check if no slot is free."""
+        return self._value <= 0
+
+    async def acquire(self, priority: int = 0) -> None:
+        """Wait for a slot."""
+        started = time.monotonic()
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            self._observe(priority, 0.0)
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), started, fut)
+        self._waiters.append(entry)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted a slot just as we were cancelled: pass it on
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+            raise
+        self._observe(priority, time.monotonic() - started)
+
+    def release(self) -> None:
+        """Return a slot and wake the most urgent waiter."""
+        self._value += 1
+        now = time.monotonic()
+        while self._value > 0 and self._waiters:
+            entry = min(
+                self._waiters,
+                key=lambda w: (effective_priority(w[0], now - w[2], self.aging_s), w[1]),
+            )
+            self._waiters.remove(entry)
+            if entry[3].done():
+                continue
+            self._value -= 1
+            entry[3].set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _observe(self, priority: int, seconds: float) -> None:
+        hist = self.wait_latency.get(priority)
+        if hist is None:
+            hist = self.wait_latency[priority] = LatencyHistogram()
+        hist.observe(seconds)
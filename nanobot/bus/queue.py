@@ -1,81 +1,466 @@
 """Async message queue for decoupled channel-agent communication."""
 
 import asyncio
-from typing import Callable, Awaitable
+import heapq
+import itertools
+import time
+from collections import Counter, deque
+from typing import Any, AsyncIterator, Callable, Awaitable, Iterator
 
 from loguru import logger
 
-from nanobot.bus.events import InboundMessage, OutboundMessage
+from nanobot.bus.events import InboundMessage, OutboundMessage, Priority
+from nanobot.bus.priority import effective_priority
+from nanobot.utils.metrics import LatencyHistogram
+
+
+class BusClosedError(Exception):
+    """Raised when consuming from a closed and drained message bus."""
+
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "reject", "coalesce")
+
+DEFAULT_BUSY_MESSAGE = "I'm busy with other messages right now, please try again in a moment."
+
+
+class BusQueue:
+    """
+    FIFO queue with optional priority lanes, a size limit and close semantics.
+
+    Unlike asyncio.Queue it lets the bus inspect and remove queued items
+    (for drop-oldest and coalescing) and leaves the admission decision to
+    the caller: producers wait with wait_for_space() and then put().
+
+    With a `lane` function, get() returns the head of the most urgent lane
+    (lowest number), where every `aging_s` seconds of waiting promotes a
+    lane head by one class. Queue wait is recorded per lane.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        lane: Callable[[Any], int] | None = None,
+        aging_s: float = 0.0,
+    ):
+        self.maxsize = maxsize
+        self.aging_s = aging_s
+        self.high_water = 0
+        self.latency: dict[int, LatencyHistogram] = {}
+        self._lane = lane or (lambda item: 0)
+        # lane -> (seq, enqueued_at, item) in arrival order
+        self._lanes: dict[int, deque[tuple[int, float, Any]]] = {}
+        self._seq = itertools.count()
+        self._size = 0
+        self._getters: list[asyncio.Future[None]] = []
+        self._putters: list[asyncio.Future[None]] = []
+        self._closed = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over queued items in arrival order, across lanes."""
+        for _, _, item in heapq.merge(*self._lanes.values()):
+            yield item
+
+    @property
+    def closed(self) -> bool:
+        """Whether close() has been called."""
+        return self._closed
+
+    def full(self) -> bool:
+        """Check if the queue has reached its size limit."""
+        return 0 < self.maxsize <= self._size
+
+    def depth_by_lane(self) -> dict[int, int]:
+        """Number of queued items per lane."""
+        return {lane: len(q) for lane, q in sorted(self._lanes.items()) if q}
+
+    def put(self, item: Any) -> None:
+        """Append an item regardless of the size limit."""
+        lane = self._lane(item)
+        queue = self._lanes.get(lane)
+        if queue is None:
+            queue = self._lanes[lane] = deque()
+        queue.append((next(self._seq), time.monotonic(), item))
+        self._size += 1
+        self.high_water = max(self.high_water, self._size)
+        self._wake(self._getters)
+
+    def remove(self, item: Any) -> None:
+        """Remove a queued item."""
+        queue = self._lanes.get(self._lane(item), ())
+        for entry in queue:
+            if entry[2] is item:
+                queue.remove(entry)
+                self._size -= 1
+                self._wake(self._putters)
+                return
+        raise ValueError("item not queued")
+
+    async def get(self) -> Any:
+        """
+        Remove and return the next item, waiting until one is available.
+
+        Raises:
+            BusClosedError: If the queue is closed and empty.
+        """
+        while not self._size:
+            if self._closed:
+                raise BusClosedError()
+            await self._wait(self._getters)
+
+        now = time.monotonic()
+        lane = min(
+            (lane for lane, q in self._lanes.items() if q),
+            key=lambda p: (effective_priority(p, now - self._lanes[p][0][1], self.aging_s), self._lanes[p][0][0]),
+        )
+        _, enqueued_at, item = self._lanes[lane].popleft()
+        self._size -= 1
+
+        hist = self.latency.get(lane)
+        if hist is None:
+            hist = self.latency[lane] = LatencyHistogram()
+        hist.observe(now - enqueued_at)
+
+        self._wake(self._putters)
+        return item
+
+    async def wait_for_space(self, blocked: Callable[[], bool]) -> None:
+        """Wait until `blocked()` is false or the queue is closed."""
+        while blocked() and not self._closed:
+            await self._wait(self._putters)
+
+    def close(self) -> None:
+        """Close the queue, waking all waiting producers and consumers."""
+        self._closed = True
+        self._wake(self._getters)
+        self._wake(self._putters)
+
+    async def _wait(self, waiters: list[asyncio.Future[None]]) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        waiters.append(fut)
+        try:
+            await fut
+        finally:
+            if fut in waiters:
+                waiters.remove(fut)
+
+    @staticmethod
+    def _wake(waiters: list[asyncio.Future[None]]) -> None:
+        # Waiters re-check their condition, so waking all of them is safe
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+        waiters.clear()
 
 
 class MessageBus:
     """
     Async message bus that decouples chat channels from the agent core.
-    
+
     Channels push messages to the inbound queue, and the agent processes
     them and pushes responses to the outbound queue.
+
+    Consumers block on the queues directly (no polling); close() wakes them
+    up once the messages already queued have been delivered.
+
+    Inbound messages are scheduled by InboundMessage.priority: interactive
+    messages go first, then subagent results, cron and heartbeat turns.
+    Every `aging_s` seconds a queued message waits promotes it by one class
+    so background lanes are never starved.
+
+    The inbound queue can be bounded overall, per channel and per sender.
+    When a limit is hit the overflow policy decides what happens:
+
+    - "block": the producer waits until there is room.
+    - "drop_oldest": the oldest queued message in the same scope is dropped.
+    - "reject": the message is dropped and the sender gets a "busy" reply.
+    - "coalesce": the message is merged into the sender's last queued
+      message if that is the newest one queued for the chat, else rejected.
+
+    Internal "system" messages (subagent results) are never limited. A full
+    outbound queue blocks the agent, except for streaming updates, which are
+    dropped since the final message supersedes them.
     """
-    
-    def __init__(self):
-        self.inbound: asyncio.Queue[InboundMessage] = asyncio.Queue()
-        self.outbound: asyncio.Queue[OutboundMessage] = asyncio.Queue()
+
+    def __init__(
+        self,
+        inbound_maxsize: int = 0,
+        outbound_maxsize: int = 0,
+        per_channel_limit: int = 0,
+        per_sender_limit: int = 0,
+        overflow: str = "block",
+        busy_message: str = DEFAULT_BUSY_MESSAGE,
+        aging_s: float = 5.0,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow} (expected one of {', '.join(OVERFLOW_POLICIES)})")
+        self.aging_s = aging_s
+        self._inbound = BusQueue(inbound_maxsize, lane=lambda m: int(m.priority), aging_s=aging_s)
+        self._outbound = BusQueue(outbound_maxsize)
+        self.per_channel_limit = per_channel_limit
+        self.per_sender_limit = per_sender_limit
+        self.overflow = overflow
+        self.busy_message = busy_message
         self._outbound_subscribers: dict[str, list[Callable[[OutboundMessage], Awaitable[None]]]] = {}
-        self._running = False
-    
+        self._closed = False
+
+        self._channel_depth: Counter[str] = Counter()
+        self._sender_depth: Counter[tuple[str, str]] = Counter()
+        self.blocked = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.coalesced = 0
+
+    @property
+    def closed(self) -> bool:
+        """Whether close() has been called."""
+        return self._closed
+
     async def publish_inbound(self, msg: InboundMessage) -> None:
-        """Publish a message from a channel to the agent."""
-        await self.inbound.put(msg)
-    
+        """Publish a message from a channel to the agent, applying the overflow policy."""
+        while True:
+            if self._inbound.closed:
+                logger.warning(f"Bus closed, dropping inbound message from {msg.channel}")
+                return
+
+            scope = self._overflow_scope(msg)
+            if scope is None:
+                break
+
+            if self.overflow == "block":
+                self.blocked += 1
+                await self._inbound.wait_for_space(lambda: self._overflow_scope(msg) is not None)
+                continue
+
+            if self.overflow == "drop_oldest":
+                victim = next(
+                    (m for m in self._inbound if m.channel != "system" and self._in_scope(m, msg, scope)),
+                    None,
+                )
+                if victim is not None:
+                    self._inbound.remove(victim)
+                    self._untrack(victim)
+                    self.ack(victim)
+                    self.dropped += 1
+                    logger.warning(f"Inbound {scope} queue full, dropped oldest message from {victim.channel}:{victim.sender_id}")
+                    continue
+
+            if self.overflow == "coalesce" and self._coalesce(msg):
+                return
+
+            self.rejected += 1
+            logger.warning(f"Inbound {scope} queue full, rejecting message from {msg.channel}:{msg.sender_id}")
+            self._reply_busy(msg)
+            return
+
+        self._channel_depth[msg.channel] += 1
+        self._sender_depth[(msg.channel, msg.sender_id)] += 1
+        self._enqueued("inbound", msg)
+        self._inbound.put(msg)
+
     async def consume_inbound(self) -> InboundMessage:
-        """Consume the next inbound message (blocks until available)."""
-        return await self.inbound.get()
-    
+        """
+        Consume the next inbound message (blocks until available).
+
+        Raises:
+            BusClosedError: If the bus was closed and no messages are left.
+        """
+        msg = await self._inbound.get()
+        self._untrack(msg)
+        return msg
+
     async def publish_outbound(self, msg: OutboundMessage) -> None:
         """Publish a response from the agent to channels."""
-        await self.outbound.put(msg)
-    
+        if self._outbound.full():
+            if msg.partial:
+                self.dropped += 1
+                return
+            self.blocked += 1
+            await self._outbound.wait_for_space(self._outbound.full)
+        if self._closed:
+            logger.warning(f"Bus closed, dropping outbound message to {msg.channel}")
+            return
+        self._enqueued("outbound", msg)
+        self._outbound.put(msg)
+
     async def consume_outbound(self) -> OutboundMessage:
-        """Consume the next outbound message (blocks until available)."""
-        return await self.outbound.get()
-    
+        """
+        Consume the next outbound message (blocks until available).
+
+        Raises:
+            BusClosedError: If the bus was closed and no messages are left.
+        """
+        return await self._outbound.get()
+
+    async def inbound(self) -> AsyncIterator[InboundMessage]:
+        """Iterate over inbound messages until the bus is closed."""
+        while True:
+            try:
+                yield await self.consume_inbound()
+            except BusClosedError:
+                return
+
+    async def outbound(self) -> AsyncIterator[OutboundMessage]:
+        """Iterate over outbound messages until the bus is closed."""
+        while True:
+            try:
+                yield await self.consume_outbound()
+            except BusClosedError:
+                return
+
+    def _overflow_scope(self, msg: InboundMessage) -> str | None:
+        """Return which limit the message would exceed ("sender", "channel", "queue"), if any."""
+        if msg.channel == "system":
+            # Subagent results are few and must not be lost
+            return None
+        if self.per_sender_limit and self._sender_depth[(msg.channel, msg.sender_id)] >= self.per_sender_limit:
+            return "sender"
+        if self.per_channel_limit and self._channel_depth[msg.channel] >= self.per_channel_limit:
+            return "channel"
+        if self._inbound.full():
+            return "queue"
+        return None
+
+    @staticmethod
+    def _in_scope(queued: InboundMessage, msg: InboundMessage, scope: str) -> bool:
+        if scope == "sender":
+            return queued.channel == msg.channel and queued.sender_id == msg.sender_id
+        if scope == "channel":
+            return queued.channel == msg.channel
+        return True
+
+    def _untrack(self, msg: InboundMessage) -> None:
+        """Update the per-channel and per-sender depths for a message leaving the queue."""
+        for counter, key in ((self._channel_depth, msg.channel), (self._sender_depth, (msg.channel, msg.sender_id))):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+
+    def _coalesce(self, msg: InboundMessage) -> bool:
+        """Merge msg into the newest queued message for its chat if it is from the same sender."""
+        last = None
+        for queued in self._inbound:
+            if queued.session_key == msg.session_key:
+                last = queued
+        if last is None or last.sender_id != msg.sender_id:
+            return False
+        last.content = f"{last.content}\n{msg.content}" if last.content else msg.content
+        last.media.extend(msg.media)
+        self._enqueued("inbound", last)
+        self.coalesced += 1
+        logger.debug(f"Coalesced message from {msg.channel}:{msg.sender_id} into queued message")
+        return True
+
+    def _reply_busy(self, msg: InboundMessage) -> None:
+        """Tell a rejected sender to retry, unless the outbound queue is full too."""
+        if not self.busy_message or self._outbound.full():
+            return
+        reply = OutboundMessage(
+            channel=msg.channel,
+            chat_id=msg.chat_id,
+            content=self.busy_message,
+        )
+        self._enqueued("outbound", reply)
+        self._outbound.put(reply)
+
+    def _enqueued(self, queue: str, msg: InboundMessage | OutboundMessage) -> None:
+        """Hook called when a message enters a queue or a queued message changes."""
+
+    def ack(self, msg: InboundMessage | OutboundMessage) -> None:
+        """
+        Mark a consumed message as fully handled.
+
+        Consumers call this once a message's turn has finished (inbound) or it
+        was delivered (outbound). It is a no-op here; durable buses use it to
+        stop replaying the message after a restart.
+        """
+
     def subscribe_outbound(
-        self, 
-        channel: str, 
+        self,
+        channel: str,
         callback: Callable[[OutboundMessage], Awaitable[None]]
     ) -> None:
         """Subscribe to outbound messages for a specific channel."""
         if channel not in self._outbound_subscribers:
             self._outbound_subscribers[channel] = []
         self._outbound_subscribers[channel].append(callback)
-    
+
     async def dispatch_outbound(self) -> None:
         """
         Dispatch outbound messages to subscribed channels.
-        Run this as a background task.
+        Run this as a background task; it returns once the bus is closed.
         """
-        self._running = True
-        while self._running:
-            try:
-                msg = await asyncio.wait_for(self.outbound.get(), timeout=1.0)
-                subscribers = self._outbound_subscribers.get(msg.channel, [])
-                for callback in subscribers:
-                    try:
-                        await callback(msg)
-                    except Exception as e:
-                        logger.error(f"Error dispatching to {msg.channel}: {e}")
-            except asyncio.TimeoutError:
-                continue
-    
+        async for msg in self.outbound():
+            subscribers = self._outbound_subscribers.get(msg.channel, [])
+            for callback in subscribers:
+                try:
+                    await callback(msg)
+                except Exception as e:
+                    logger.error(f"Error dispatching to {msg.channel}: {e}")
+            self.ack(msg)
+
+    def close(self) -> None:
+        """
+        Close the bus.
+
+        New messages are dropped; consumers receive what is already queued
+        and then stop (iterators end, consume_* raise BusClosedError).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._inbound.close()
+        self._outbound.close()
+
+    def close_inbound(self) -> None:
+        """
+        Stop accepting inbound messages.
+
+        Inbound consumers receive what is already queued and then stop; the
+        outbound side keeps working so in-flight turns can still reply.
+        """
+        self._inbound.close()
+
     def stop(self) -> None:
-        """Stop the dispatcher loop."""
-        self._running = False
-    
+        """Stop the dispatcher loop (closes the bus)."""
+        self.close()
+
     @property
     def inbound_size(self) -> int:
         """Number of pending inbound messages."""
-        return self.inbound.qsize()
-    
+        return len(self._inbound)
+
     @property
     def outbound_size(self) -> int:
         """Number of pending outbound messages."""
-        return self.outbound.qsize()
+        return len(self._outbound)
+
+    def queue_stats(self) -> dict[str, Any]:
+        """
+        Queue depth gauges and overflow counters.
+
+        Returns:
+            Dict with current and peak depths, inbound depths per channel and
+            priority, how many messages were blocked, dropped, rejected or
+            coalesced, and inbound queue-wait histograms per priority.
+        """
+        return {
+            "inbound": len(self._inbound),
+            "outbound": len(self._outbound),
+            "inbound_high_water": self._inbound.high_water,
+            "outbound_high_water": self._outbound.high_water,
+            "inbound_by_channel": dict(self._channel_depth),
+            "inbound_by_priority": {
+                Priority(lane).name.lower(): n for lane, n in self._inbound.depth_by_lane().items()
+            },
+            "blocked": self.blocked,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "coalesced": self.coalesced,
+            "latency": {
+                Priority(lane).name.lower(): hist.snapshot()
+                for lane, hist in sorted(self._inbound.latency.items())
+            },
+        }
@@ -19,6 +19,11 @@ class BaseChannel(ABC):
     
     name: str = "base"
     
+    # Channels that can edit a sent message set this to True. They receive
+    # partial stream updates (msg.partial) and must update the chat message
+    # previously sent for the same msg.stream_id instead of sending a new one.
+    supports_streaming: bool = False
+
     def __init__(self, config: Any, bus: MessageBus):
         """
         Initialize the channel.
@@ -53,6 +58,9 @@ class BaseChannel(ABC):
         """
         Send a message through this channel.
         
+        Partial stream updates are only delivered to channels with
+        supports_streaming = True; others receive just the final message.
+
         Args:
             msg: The message to send.
         """
@@ -23,6 +23,7 @@ class DiscordChannel(BaseChannel):
     """Discord channel using Gateway websocket."""
 
     name = "discord"
+    supports_streaming = True
 
     def __init__(self, config: DiscordConfig, bus: MessageBus):
         super().__init__(config, bus)
@@ -31,6 +32,7 @@ class DiscordChannel(BaseChannel):
         self._seq: int | None = None
         self._heartbeat_task: asyncio.Task | None = None
         self._typing_tasks: dict[str, asyncio.Task] = {}
+        self._stream_messages: dict[str, str] = {}  # Map stream_id to the message being edited
         self._http: httpx.AsyncClient | None = None
 
     async def start(self) -> None:
@@ -73,24 +75,33 @@ class DiscordChannel(BaseChannel):
             self._http = None
 
     async def send(self, msg: OutboundMessage) -> None:
-        """Send a message through Discord REST API."""
+        """Send a message through Discord REST API (stream updates edit it in place)."""
         if not self._http:
             logger.warning("Discord HTTP client not initialized")
             return
 
+        # Message previously sent for this stream (if any) gets edited
+        message_id = self._stream_messages.get(msg.stream_id) if msg.stream_id else None
+        if msg.stream_id and not msg.partial:
+            self._stream_messages.pop(msg.stream_id, None)
+
         url = f"{DISCORD_API_BASE}/channels/{msg.chat_id}/messages"
         payload: dict[str, Any] = {"content": msg.content}
 
-        if msg.reply_to:
-            payload["message_reference"] = {"message_id": msg.reply_to}
-            payload["allowed_mentions"] = {"replied_user": False}
+        if message_id:
+            method, url = "PATCH", f"{url}/{message_id}"
+        else:
+            method = "POST"
+            if msg.reply_to:
+                payload["message_reference"] = {"message_id": msg.reply_to}
+                payload["allowed_mentions"] = {"replied_user": False}
 
         headers = {"Authorization": f"Bot {self.config.token}"}
 
         try:
             for attempt in range(3):
                 try:
-                    response = await self._http.post(url, headers=headers, json=payload)
+                    response = await self._http.request(method, url, headers=headers, json=payload)
                     if response.status_code == 429:
                         data = response.json()
                         retry_after = float(data.get("retry_after", 1.0))
@@ -98,6 +109,8 @@ class DiscordChannel(BaseChannel):
                         await asyncio.sleep(retry_after)
                         continue
                     response.raise_for_status()
+                    if msg.stream_id and msg.partial and not message_id:
+                        self._stream_messages[msg.stream_id] = str(response.json().get("id", ""))
                     return
                 except Exception as e:
                     if attempt == 2:
@@ -23,6 +23,8 @@ try:
         CreateMessageReactionRequestBody,
         Emoji,
         P2ImMessageReceiveV1,
+        PatchMessageRequest,
+        PatchMessageRequestBody,
     )
     FEISHU_AVAILABLE = True
 except ImportError:
@@ -52,6 +54,7 @@ class FeishuChannel(BaseChannel):
     """
     
     name = "feishu"
+    supports_streaming = True
     
     def __init__(self, config: FeishuConfig, bus: MessageBus):
         super().__init__(config, bus)
@@ -60,6 +63,7 @@ class FeishuChannel(BaseChannel):
         self._ws_client: Any = None
         self._ws_thread: threading.Thread | None = None
         self._processed_message_ids: OrderedDict[str, None] = OrderedDict()  # Ordered dedup cache
+        self._stream_messages: dict[str, str] = {}  # Map stream_id to the card being updated
         self._loop: asyncio.AbstractEventLoop | None = None
     
     async def start(self) -> None:
@@ -196,11 +200,16 @@ class FeishuChannel(BaseChannel):
         return elements or [{"tag": "markdown", "content": content}]
 
     async def send(self, msg: OutboundMessage) -> None:
-        """Send a message through Feishu."""
+        """Send a message through Feishu (stream updates patch the card in place)."""
         if not self._client:
             logger.warning("Feishu client not initialized")
             return
         
+        # Card previously sent for this stream (if any) gets updated
+        message_id = self._stream_messages.get(msg.stream_id) if msg.stream_id else None
+        if msg.stream_id and not msg.partial:
+            self._stream_messages.pop(msg.stream_id, None)
+
         try:
             # Determine receive_id_type based on chat_id format
             # open_id starts with "ou_", chat_id starts with "oc_"
@@ -212,22 +221,31 @@ class FeishuChannel(BaseChannel):
             # Build card with markdown + table support
             elements = self._build_card_elements(msg.content)
             card = {
-                "config": {"wide_screen_mode": True},
+                "config": {"wide_screen_mode": True, "update_multi": bool(msg.stream_id)},
                 "elements": elements,
             }
             content = json.dumps(card, ensure_ascii=False)
             
-            request = CreateMessageRequest.builder() \
-                .receive_id_type(receive_id_type) \
-                .request_body(
-                    CreateMessageRequestBody.builder()
-                    .receive_id(msg.chat_id)
-                    .msg_type("interactive")
-                    .content(content)
-                    .build()
-                ).build()
-            
-            response = self._client.im.v1.message.create(request)
+            if message_id:
+                request = PatchMessageRequest.builder() \
+                    .message_id(message_id) \
+                    .request_body(
+                        PatchMessageRequestBody.builder()
+                        .content(content)
+                        .build()
+                    ).build()
+                response = self._client.im.v1.message.patch(request)
+            else:
+                request = CreateMessageRequest.builder() \
+                    .receive_id_type(receive_id_type) \
+                    .request_body(
+                        CreateMessageRequestBody.builder()
+                        .receive_id(msg.chat_id)
+                        .msg_type("interactive")
+                        .content(content)
+                        .build()
+                    ).build()
+                response = self._client.im.v1.message.create(request)
             
             if not response.success():
                 logger.error(
@@ -235,6 +253,8 @@ class FeishuChannel(BaseChannel):
                     f"msg={response.msg}, log_id={response.get_log_id()}"
                 )
             else:
+                if msg.stream_id and msg.partial and not message_id and response.data:
+                    self._stream_messages[msg.stream_id] = response.data.message_id
                 logger.debug(f"Feishu message sent to {msg.chat_id}")
                 
         except Exception as e:
@@ -120,26 +120,25 @@ class ChannelManager:
         """Dispatch outbound messages to the appropriate channel."""
         logger.info("Outbound dispatcher started")
         
-        while True:
-            try:
-                msg = await asyncio.wait_for(
-                    self.bus.consume_outbound(),
-                    timeout=1.0
-                )
-                
+        try:
+            async for msg in self.bus.outbound():
                 channel = self.channels.get(msg.channel)
                 if channel:
+                    # Channels that can't edit messages only get the final reply
+                    if msg.partial and not channel.supports_streaming:
+                        continue
                     try:
                         await channel.send(msg)
                     except Exception as e:
+                        # Left unacknowledged so a durable bus retries it after a restart
                         logger.error(f"Error sending to {msg.channel}: {e}")
+                        continue
                 else:
                     logger.warning(f"Unknown channel: {msg.channel}")
-                    
-            except asyncio.TimeoutError:
-                continue
-            except asyncio.CancelledError:
-                break
+                self.bus.ack(msg)
+        except asyncio.CancelledError:
+            pass
+        logger.info("Outbound dispatcher stopped")
     
     def get_channel(self, name: str) -> BaseChannel | None:
         """Get a channel by name."""
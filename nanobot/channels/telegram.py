@@ -5,6 +5,7 @@ import re
 
 from loguru import logger
 from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import Application, MessageHandler, filters, ContextTypes
 
 from nanobot.bus.events import OutboundMessage
@@ -84,6 +85,7 @@ class TelegramChannel(BaseChannel):
     """
     
     name = "telegram"
+    supports_streaming = True
     
     def __init__(self, config: TelegramConfig, bus: MessageBus, groq_api_key: str = ""):
         super().__init__(config, bus)
@@ -91,6 +93,7 @@ class TelegramChannel(BaseChannel):
         self.groq_api_key = groq_api_key
         self._app: Application | None = None
         self._chat_ids: dict[str, int] = {}  # Map sender_id to chat_id for replies
+        self._stream_messages: dict[str, int] = {}  # Map stream_id to the message being edited
     
     async def start(self) -> None:
         """Start the Telegram bot with long polling."""
@@ -152,7 +155,7 @@ class TelegramChannel(BaseChannel):
             self._app = None
     
     async def send(self, msg: OutboundMessage) -> None:
-        """Send a message through Telegram."""
+        """Send a message through Telegram (stream updates edit the message in place)."""
         if not self._app:
             logger.warning("Telegram bot not running")
             return
@@ -160,25 +163,61 @@ class TelegramChannel(BaseChannel):
         try:
             # chat_id should be the Telegram chat ID (integer)
             chat_id = int(msg.chat_id)
+        except ValueError:
+            logger.error(f"Invalid chat_id: {msg.chat_id}")
+            return
+
+        # Message previously sent for this stream (if any) gets edited
+        message_id = self._stream_messages.get(msg.stream_id) if msg.stream_id else None
+        if msg.stream_id and not msg.partial:
+            self._stream_messages.pop(msg.stream_id, None)
+
+        try:
             # Convert markdown to Telegram HTML
             html_content = _markdown_to_telegram_html(msg.content)
-            await self._app.bot.send_message(
+            await self._send_or_edit(msg, chat_id, message_id, html_content, "HTML")
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            await self._send_plain(msg, chat_id, message_id, e)
+        except Exception as e:
+            await self._send_plain(msg, chat_id, message_id, e)
+
+    async def _send_plain(
+        self, msg: OutboundMessage, chat_id: int, message_id: int | None, error: Exception
+    ) -> None:
+        """Fallback to plain text if HTML parsing fails."""
+        logger.warning(f"HTML parse failed, falling back to plain text: {error}")
+        try:
+            await self._send_or_edit(msg, chat_id, message_id, msg.content, None)
+        except Exception as e2:
+            logger.error(f"Error sending Telegram message: {e2}")
+
+    async def _send_or_edit(
+        self,
+        msg: OutboundMessage,
+        chat_id: int,
+        message_id: int | None,
+        text: str,
+        parse_mode: str | None,
+    ) -> None:
+        """Edit the stream's existing message, or send a new one and remember it."""
+        if message_id:
+            await self._app.bot.edit_message_text(
                 chat_id=chat_id,
-                text=html_content,
-                parse_mode="HTML"
+                message_id=message_id,
+                text=text,
+                parse_mode=parse_mode
             )
-        except ValueError:
-            logger.error(f"Invalid chat_id: {msg.chat_id}")
-        except Exception as e:
-            # Fallback to plain text if HTML parsing fails
-            logger.warning(f"HTML parse failed, falling back to plain text: {e}")
-            try:
-                await self._app.bot.send_message(
-                    chat_id=int(msg.chat_id),
-                    text=msg.content
-                )
-            except Exception as e2:
-                logger.error(f"Error sending Telegram message: {e2}")
+            return
+
+        sent = await self._app.bot.send_message(
+            chat_id=chat_id,
+            text=text,
+            parse_mode=parse_mode
+        )
+        if msg.stream_id and msg.partial:
+            self._stream_messages[msg.stream_id] = sent.message_id
     
     async def _on_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /start command."""
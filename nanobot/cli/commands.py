@@ -1,6 +1,7 @@
 """CLI commands for nanobot."""
 
 import asyncio
+import signal
 from pathlib import Path
 
 import typer
@@ -147,21 +148,184 @@ This file stores important information that should persist across sessions.
         console.print("  [dim]Created memory/MEMORY.md[/dim]")
 
 
-def _make_provider(config):
-    """Create LiteLLMProvider from config. Exits if no API key found."""
+def _make_model_provider(config, model: str, limiter=None):
+    """Create the LiteLLMProvider (rate limited, with retries) serving one model."""
     from nanobot.providers.litellm_provider import LiteLLMProvider
+    from nanobot.providers.ratelimit import RateLimitedProvider
+    from nanobot.providers.resilient import ResilientProvider
+    p = config.get_provider(model)
+    llm = config.llm
+    provider = LiteLLMProvider(
+        api_key=p.api_key if p else None,
+        api_base=config.get_api_base(model),
+        default_model=model,
+        extra_headers=p.extra_headers if p else None,
+        max_concurrency=llm.max_concurrency,
+        max_connections=llm.max_connections,
+        keepalive_s=llm.keepalive_s,
+    )
+    if limiter is not None and limiter.enabled:
+        provider = RateLimitedProvider(provider, limiter)
+    return ResilientProvider(
+        provider,
+        max_retries=llm.max_retries,
+        base_delay_s=llm.retry_base_delay_s,
+        max_delay_s=llm.retry_max_delay_s,
+        hedge=llm.hedge,
+        hedge_quantile=llm.hedge_quantile,
+        breaker_failures=llm.breaker_failures,
+        breaker_reset_s=llm.breaker_reset_s,
+    )
+
+
+def _model_cost(model: str) -> float | None:
+    """Input price per token from LiteLLM's model table, if known."""
+    import litellm
+    for name in (model, model.split("/", 1)[-1]):
+        info = litellm.model_cost.get(name) or {}
+        if info.get("input_cost_per_token") is not None:
+            return info["input_cost_per_token"]
+    return None
+
+
+def _make_rate_limiter(config):
+    """Create the client-side LLM rate limiter (disabled if no budgets are configured)."""
+    from nanobot.providers.ratelimit import RateLimiter
+    llm = config.llm
+    return RateLimiter(llm.requests_per_minute, llm.tokens_per_minute, aging_s=config.bus.priority_aging_s)
+
+
+def _make_provider(config, limiter=None):
+    """
+    Create the LLM provider from config, routing across fallback models if any. Exits if no API key found.
+
+    `limiter` replaces the process's own rate limiter (worker processes use the gateway's).
+    """
+    from nanobot.bus.events import Priority
     p = config.get_provider()
     model = config.agents.defaults.model
     if not (p and p.api_key) and not model.startswith("bedrock/"):
         console.print("[red]Error: No API key configured.[/red]")
         console.print("Set one in ~/.nanobot/config.json under providers section")
         raise typer.Exit(1)
-    return LiteLLMProvider(
-        api_key=p.api_key if p else None,
-        api_base=config.get_api_base(),
-        default_model=model,
-        extra_headers=p.extra_headers if p else None,
+    llm = config.llm
+    # One limiter for every model, so turns, subagents, cron and heartbeat share the budgets
+    limiter = limiter or _make_rate_limiter(config)
+    fallbacks = [m for m in config.agents.defaults.fallback_models if m != model]
+    if not fallbacks:
+        provider = _make_model_provider(config, model, limiter)
+    else:
+        from nanobot.providers.routing import ModelRoute, RoutingProvider
+        routes = [
+            ModelRoute(m, _make_model_provider(config, m, limiter), cost=_model_cost(m))
+            for m in [model, *fallbacks]
+        ]
+        provider = RoutingProvider(
+            routes,
+            window=llm.route_window,
+            max_error_rate=llm.route_max_error_rate,
+            slow_factor=llm.route_slow_factor,
+            cheap_priority=Priority.HEARTBEAT if llm.cheap_heartbeats else None,
+        )
+
+    if llm.cache:
+        from nanobot.providers.cache import CachingProvider
+        from nanobot.utils.helpers import get_data_path
+        provider = CachingProvider(
+            provider,
+            cache_dir=get_data_path() / "llm_cache" if llm.cache_disk else None,
+            max_entries=llm.cache_max_entries,
+            ttl_s=llm.cache_ttl_s,
+            cacheable_priorities={Priority.CRON, Priority.HEARTBEAT} if llm.cache_background else set(),
+        )
+    return provider
+
+
+def _history_kwargs(config) -> dict:
+    """AgentLoop history and session storage options from config."""
+    from nanobot.agent.tokens import TokenCounter, load_tokenizer
+    defaults = config.agents.defaults
+    return {
+        "max_history_messages": defaults.max_history_messages,
+        "history_tokens": config.get_history_tokens(),
+        "token_counter": TokenCounter(load_tokenizer(defaults.tokenizer)),
+        "compact_threshold_tokens": defaults.compact_threshold_tokens,
+        "compact_keep_tokens": defaults.compact_keep_tokens,
+        "session_config": config.sessions,
+    }
+
+
+def _make_bus(config, durable: bool = False):
+    """Create the message bus with the configured queue limits."""
+    from nanobot.bus.queue import MessageBus
+    b = config.bus
+    kwargs = dict(
+        inbound_maxsize=b.inbound_maxsize,
+        outbound_maxsize=b.outbound_maxsize,
+        per_channel_limit=b.per_channel_limit,
+        per_sender_limit=b.per_sender_limit,
+        overflow=b.overflow,
+        busy_message=b.busy_message,
+        aging_s=b.priority_aging_s,
+    )
+    if durable and b.durable:
+        from nanobot.bus.durable import DurableMessageBus
+        from nanobot.utils.helpers import get_data_path
+        return DurableMessageBus(
+            get_data_path() / "bus",
+            segment_bytes=b.wal_segment_bytes,
+            commit_interval_s=b.wal_commit_interval_ms / 1000,
+            fsync=b.wal_fsync,
+            **kwargs,
+        )
+    return MessageBus(**kwargs)
+
+
+def _make_http_pool(config):
+    """Create the shared HTTP client pool and install it for this process."""
+    from nanobot.utils.http import HttpClientPool, set_http_pool
+    h = config.http
+    pool = HttpClientPool(
+        max_connections=h.max_connections,
+        max_keepalive_connections=h.max_keepalive_connections,
+        keepalive_expiry_s=h.keepalive_expiry_s,
+        http2=h.http2,
+        max_hosts=h.max_hosts,
     )
+    set_http_pool(pool)
+    return pool
+
+
+def _make_agent(config, bus, cron=None, limiter=None):
+    """Create the gateway's agent loop."""
+    from nanobot.agent.loop import AgentLoop
+    return AgentLoop(
+        bus=bus,
+        provider=_make_provider(config, limiter),
+        workspace=config.workspace_path,
+        model=config.agents.defaults.model,
+        max_iterations=config.agents.defaults.max_tool_iterations,
+        brave_api_key=config.tools.web.search.api_key or None,
+        exec_config=config.tools.exec,
+        cron_service=cron,
+        restrict_to_workspace=config.tools.restrict_to_workspace,
+        max_concurrency=config.agents.defaults.max_concurrency,
+        max_pending_turns=config.agents.defaults.max_pending_turns,
+        stream_responses=config.agents.defaults.stream,
+        debounce_s=config.agents.defaults.debounce_s,
+        debounce_max_wait_s=config.agents.defaults.debounce_max_wait_s,
+        **_history_kwargs(config),
+    )
+
+
+def _make_worker_agent(bus):
+    """Agent factory for gateway worker processes (runs in the worker)."""
+    from nanobot.config.loader import load_config
+    config = load_config()
+    _make_http_pool(config)
+    # The cron store belongs to the front process, so workers have no cron tool;
+    # LLM budgets too, so every worker draws on the gateway's rate limiter
+    return _make_agent(config, bus, limiter=bus.rate_limiter)
 
 
 # ============================================================================
@@ -176,8 +340,7 @@ def gateway(
 ):
     """Start the nanobot gateway."""
     from nanobot.config.loader import load_config, get_data_dir
-    from nanobot.bus.queue import MessageBus
-    from nanobot.agent.loop import AgentLoop
+    from nanobot.bus.events import Priority
     from nanobot.channels.manager import ChannelManager
     from nanobot.cron.service import CronService
     from nanobot.cron.types import CronJob
@@ -190,25 +353,30 @@ def gateway(
     console.print(f"{__logo__} Starting nanobot gateway on port {port}...")
     
     config = load_config()
-    bus = MessageBus()
-    provider = _make_provider(config)
+    bus = _make_bus(config, durable=True)
+    http_pool = _make_http_pool(config)
     
     # Create cron service first (callback set after agent creation)
     cron_store_path = get_data_dir() / "cron" / "jobs.json"
     cron = CronService(cron_store_path)
     
-    # Create agent with cron service
-    agent = AgentLoop(
-        bus=bus,
-        provider=provider,
-        workspace=config.workspace_path,
-        model=config.agents.defaults.model,
-        max_iterations=config.agents.defaults.max_tool_iterations,
-        brave_api_key=config.tools.web.search.api_key or None,
-        exec_config=config.tools.exec,
-        cron_service=cron,
-        restrict_to_workspace=config.tools.restrict_to_workspace,
-    )
+    # Create agent with cron service, or a pool of worker processes
+    if config.gateway.workers > 0:
+        from nanobot.agent.workers import WorkerPool
+        agent = WorkerPool(
+            bus,
+            _make_worker_agent,
+            workers=config.gateway.workers,
+            drain_timeout_s=config.gateway.drain_timeout_s,
+            # What each worker's agent loop would take on by itself
+            max_pending_turns=config.gateway.workers * (
+                config.agents.defaults.max_pending_turns or 2 * config.agents.defaults.max_concurrency
+            ),
+            rate_limiter=_make_rate_limiter(config),
+        )
+        console.print(f"[green]✓[/green] Agent workers: {config.gateway.workers} processes")
+    else:
+        agent = _make_agent(config, bus, cron)
     
     # Set cron callback (needs agent)
     async def on_cron_job(job: CronJob) -> str | None:
@@ -218,6 +386,7 @@ def gateway(
             session_key=f"cron:{job.id}",
             channel=job.payload.channel or "cli",
             chat_id=job.payload.to or "direct",
+            priority=Priority.CRON,
         )
         if job.payload.deliver and job.payload.to:
             from nanobot.bus.events import OutboundMessage
@@ -232,7 +401,7 @@ def gateway(
     # Create heartbeat service
     async def on_heartbeat(prompt: str) -> str:
         """Execute heartbeat through the agent."""
-        return await agent.process_direct(prompt, session_key="heartbeat")
+        return await agent.process_direct(prompt, session_key="heartbeat", priority=Priority.HEARTBEAT)
     
     heartbeat = HeartbeatService(
         workspace=config.workspace_path,
@@ -265,6 +434,12 @@ def gateway(
     console.print(f"[green]✓[/green] Heartbeat: every 30m")
     
     async def run():
+        # Ctrl+C cancels this task (asyncio.run); SIGTERM does the same
+        main = asyncio.current_task()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, main.cancel)
+        except NotImplementedError:
+            pass  # Windows
         try:
             await cron.start()
             await heartbeat.start()
@@ -272,14 +447,25 @@ def gateway(
             if voice_service:
                 tasks.append(voice_service.start())
             await asyncio.gather(*tasks)
-        except KeyboardInterrupt:
+        except asyncio.CancelledError:
+            main.uncancel()  # Let the shutdown below await normally
+        finally:
             console.print("\nShutting down...")
             heartbeat.stop()
             cron.stop()
             agent.stop()
             if voice_service:
                 voice_service.stop()
+            # Finish in-flight turns while the channels can still deliver their replies
+            try:
+                await asyncio.wait_for(agent.drain(), timeout=config.gateway.drain_timeout_s)
+            except asyncio.TimeoutError:
+                console.print("[yellow]Some turns did not finish in time[/yellow]")
             await channels.stop_all()
+            await cron.flush()
+            await agent.close()
+            await http_pool.aclose()
+            bus.close()
     
     asyncio.run(run())
 
@@ -298,12 +484,11 @@ def agent(
 ):
     """Interact with the agent directly."""
     from nanobot.config.loader import load_config
-    from nanobot.bus.queue import MessageBus
     from nanobot.agent.loop import AgentLoop
     
     config = load_config()
     
-    bus = MessageBus()
+    bus = _make_bus(config)
     provider = _make_provider(config)
     
     agent_loop = AgentLoop(
@@ -313,6 +498,7 @@ def agent(
         brave_api_key=config.tools.web.search.api_key or None,
         exec_config=config.tools.exec,
         restrict_to_workspace=config.tools.restrict_to_workspace,
+        **_history_kwargs(config),
     )
     
     if message:
@@ -320,6 +506,7 @@ def agent(
         async def run_once():
             response = await agent_loop.process_direct(message, session_id)
             console.print(f"\n{__logo__} {response}")
+            await agent_loop.close()
         
         asyncio.run(run_once())
     else:
@@ -338,6 +525,7 @@ def agent(
                 except KeyboardInterrupt:
                     console.print("\nGoodbye!")
                     break
+            await agent_loop.close()
         
         asyncio.run(run_interactive())
 
@@ -346,7 +534,6 @@ def agent(
 def voice():
     """Run the local voice assistant (wake word mode)."""
     from nanobot.config.loader import load_config
-    from nanobot.bus.queue import MessageBus
     from nanobot.agent.loop import AgentLoop
     from nanobot.voice import VoiceAssistantService, VoiceDependencyError
 
@@ -355,7 +542,7 @@ def voice():
         console.print("[yellow]Voice is disabled in config. Set voice.enabled=true.[/yellow]")
         raise typer.Exit(1)
 
-    bus = MessageBus()
+    bus = _make_bus(config)
     provider = _make_provider(config)
     agent_loop = AgentLoop(
         bus=bus,
@@ -364,6 +551,7 @@ def voice():
         brave_api_key=config.tools.web.search.api_key or None,
         exec_config=config.tools.exec,
         restrict_to_workspace=config.tools.restrict_to_workspace,
+        **_history_kwargs(config),
     )
 
     try:
@@ -372,7 +560,13 @@ def voice():
         console.print(f"[red]Voice disabled:[/red] {e}")
         raise typer.Exit(1)
 
-    asyncio.run(voice_service.start())
+    async def run_voice():
+        try:
+            await voice_service.start()
+        finally:
+            await agent_loop.close()
+
+    asyncio.run(run_voice())
 
 
 # ============================================================================
@@ -648,7 +842,9 @@ def cron_run(
     service = CronService(store_path)
     
     async def run():
-        return await service.run_job(job_id, force=force)
+        ok = await service.run_job(job_id, force=force)
+        await service.flush()
+        return ok
     
     if asyncio.run(run()):
         console.print(f"[green]✓[/green] Job executed")
@@ -656,6 +852,46 @@ def cron_run(
         console.print(f"[red]Failed to run job {job_id}[/red]")
 
 
+# ============================================================================
+# Session Commands
+# ============================================================================
+
+
+sessions_app = typer.Typer(help="Manage conversation sessions")
+app.add_typer(sessions_app, name="sessions")
+
+
+@sessions_app.command("migrate")
+def sessions_migrate(
+    source: str = typer.Option("jsonl", "--from", help="Backend to copy from (jsonl or sqlite)"),
+    target: str = typer.Option("sqlite", "--to", help="Backend to copy to (jsonl or sqlite)"),
+):
+    """Copy all sessions from one storage backend to another."""
+    from nanobot.session.store import create_session_store, migrate_sessions
+    from nanobot.utils.helpers import get_sessions_path
+
+    if source == target:
+        console.print("[red]Source and target backends must differ[/red]")
+        raise typer.Exit(1)
+
+    sessions_dir = get_sessions_path()
+    try:
+        src = create_session_store(source, sessions_dir)
+        dst = create_session_store(target, sessions_dir)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    try:
+        count = migrate_sessions(src, dst)
+    finally:
+        src.close()
+        dst.close()
+
+    console.print(f"[green]✓[/green] Migrated {count} sessions from {source} to {target}")
+    console.print(f"Set sessions.backend to \"{target}\" in ~/.nanobot/config.json to use them")
+
+
 # ============================================================================
 # Status Commands
 # ============================================================================
@@ -51,9 +51,21 @@ class AgentDefaults(BaseModel):
     """Default agent configuration."""
     workspace: str = "~/.nanobot/workspace"
     model: str = "anthropic/claude-opus-4-5"
+    fallback_models: list[str] = Field(default_factory=list)  # Tried in order when the model is failing or slow
     max_tokens: int = 8192
     temperature: float = 0.7
     max_tool_iterations: int = 20
+    max_concurrency: int = 4  # Max agent turns running at once (across sessions)
+    max_pending_turns: int = 0  # Messages taken off the bus but not yet answered (0 = 2x max_concurrency); the rest wait on the bus
+    stream: bool = True  # Show replies progressively on channels that support message edits
+    max_history_messages: int = 50
+    history_tokens: int = 32000  # Token budget for conversation history sent to the model
+    history_tokens_by_model: dict[str, int] = Field(default_factory=dict)  # Per-model budgets, matched by substring
+    tokenizer: str = "estimate"  # "estimate" (~4 chars/token) or "tiktoken[:encoding]"
+    compact_threshold_tokens: int = 24000  # Summarize older turns once unsummarized history exceeds this, an extra background LLM call per compaction (0 = off)
+    compact_keep_tokens: int = 8000  # Newest history kept verbatim when compacting
+    debounce_s: float = 0.0  # Merge messages from one chat arriving within this window into one turn (0 = off)
+    debounce_max_wait_s: float = 5.0  # Longest a message is held while more keep arriving
 
 
 class AgentsConfig(BaseModel):
@@ -83,10 +95,37 @@ class ProvidersConfig(BaseModel):
     aihubmix: ProviderConfig = Field(default_factory=ProviderConfig)  # AiHubMix API gateway
 
 
+class LLMClientConfig(BaseModel):
+    """Connections, retries and circuit breaking for LLM calls."""
+    max_concurrency: int = 8  # LLM requests in flight at once; further calls wait
+    max_connections: int = 32  # Pooled connections to the endpoint (0 = unlimited)
+    keepalive_s: float = 60.0  # Close idle pooled connections after this long
+    max_retries: int = 3  # Retries for rate-limited/overloaded calls (0 = off)
+    retry_base_delay_s: float = 1.0  # First backoff; doubles per retry, with jitter
+    retry_max_delay_s: float = 30.0  # Longest backoff; a longer Retry-After fails the call instead
+    hedge: bool = False  # Send a second request when a non-streaming call outlives the hedge_quantile latency
+    hedge_quantile: float = 0.95
+    breaker_failures: int = 5  # Consecutive failures that open an endpoint's circuit (0 = off)
+    breaker_reset_s: float = 30.0  # How long an open circuit fails fast before a trial call
+    route_window: int = 50  # Recent calls per model used for routing health
+    route_max_error_rate: float = 0.5  # Models failing more often than this are tried last
+    route_slow_factor: float = 2.0  # Skip models this many times slower than the fastest healthy one
+    cheap_heartbeats: bool = False  # Send heartbeat turns to the cheapest healthy model
+    requests_per_minute: int = 0  # Client-side request budget per model, shared by all callers and gateway workers (0 = off)
+    tokens_per_minute: int = 0  # Client-side token budget per model (0 = off)
+    cache: bool = False  # Reuse responses to identical requests at temperature 0 (and cacheable turns below)
+    cache_background: bool = True  # With cache on, also cache cron and heartbeat turns at any temperature
+    cache_max_entries: int = 256  # Responses kept in memory
+    cache_ttl_s: float = 3600.0  # How long a cached response is reused
+    cache_disk: bool = True  # Also keep responses on disk (~/.nanobot/llm_cache), shared by worker processes
+
+
 class GatewayConfig(BaseModel):
     """Gateway/server configuration."""
     host: str = "0.0.0.0"
     port: int = 18790
+    workers: int = 0  # Run agent turns in this many processes, sharded by session (0 = in the gateway process)
+    drain_timeout_s: float = 30.0  # How long in-flight turns may take to finish on shutdown
 
 
 class WebSearchConfig(BaseModel):
@@ -112,6 +151,39 @@ class ToolsConfig(BaseModel):
     restrict_to_workspace: bool = False  # If true, restrict all tool access to workspace directory
 
 
+class SessionConfig(BaseModel):
+    """Conversation session storage configuration."""
+    backend: str = "jsonl"  # "jsonl" (one file per session) or "sqlite" (sessions.db, WAL mode)
+    max_cached: int = 256  # Sessions kept in memory (least recently used are evicted)
+    max_cache_bytes: int = 64 * 1024 * 1024  # Approximate memory budget for cached sessions
+    rewrite_every: int = 100  # JSONL: compact a session file after this many appended saves
+    load_window: int = 1000  # Newest messages read when a session is resumed (0 = all)
+
+
+class BusConfig(BaseModel):
+    """Message bus queue limits (0 = unbounded)."""
+    inbound_maxsize: int = 1000  # Queued messages waiting for the agent
+    outbound_maxsize: int = 1000  # Queued replies waiting for channels
+    per_channel_limit: int = 0  # Queued inbound messages per channel
+    per_sender_limit: int = 20  # Queued inbound messages per sender
+    overflow: str = "block"  # "block", "drop_oldest", "reject" (busy reply) or "coalesce"
+    busy_message: str = "I'm busy with other messages right now, please try again in a moment."
+    priority_aging_s: float = 5.0  # Waiting this long promotes background work one priority class
+    durable: bool = False  # Persist queued messages in a write-ahead log (~/.nanobot/bus) and replay them after a crash
+    wal_segment_bytes: int = 4 * 1024 * 1024  # Checkpoint the log once it grows past this
+    wal_commit_interval_ms: float = 5.0  # Group-commit window: records written within it share one fsync
+    wal_fsync: bool = True  # fsync each group commit (off: faster, but an OS crash can lose the last commits)
+
+
+class HttpConfig(BaseModel):
+    """Shared HTTP client pool used by web tools and audio/transcription."""
+    max_connections: int = 20  # Open connections per host (0 = unlimited)
+    max_keepalive_connections: int = 10  # Idle connections kept per host
+    keepalive_expiry_s: float = 30.0  # Close idle connections after this long
+    http2: bool = False  # Multiplex requests over one connection per host (needs the h2 package)
+    max_hosts: int = 32  # Hosts with a pooled client; the least recently used is closed beyond this
+
+
 class VoiceConfig(BaseModel):
     """Voice assistant configuration (wake word + TTS)."""
     enabled: bool = False
@@ -143,8 +215,12 @@ class Config(BaseSettings):
     agents: AgentsConfig = Field(default_factory=AgentsConfig)
     channels: ChannelsConfig = Field(default_factory=ChannelsConfig)
     providers: ProvidersConfig = Field(default_factory=ProvidersConfig)
+    llm: LLMClientConfig = Field(default_factory=LLMClientConfig)
     gateway: GatewayConfig = Field(default_factory=GatewayConfig)
     tools: ToolsConfig = Field(default_factory=ToolsConfig)
+    sessions: SessionConfig = Field(default_factory=SessionConfig)
+    bus: BusConfig = Field(default_factory=BusConfig)
+    http: HttpConfig = Field(default_factory=HttpConfig)
     voice: VoiceConfig = Field(default_factory=VoiceConfig)
     
     @property
@@ -176,6 +252,15 @@ class Config(BaseSettings):
                          p.gemini, p.zhipu, p.dashscope, p.moonshot, p.vllm, p.groq]
         return next((pr for pr in all_providers if pr.api_key), None)
 
+    def get_history_tokens(self, model: str | None = None) -> int:
+        """Get the history token budget for the given model (longest matching override wins)."""
+        defaults = self.agents.defaults
+        model = (model or defaults.model).lower()
+        matches = [kw for kw in defaults.history_tokens_by_model if kw.lower() in model]
+        if matches:
+            return defaults.history_tokens_by_model[max(matches, key=len)]
+        return defaults.history_tokens
+
     def get_api_key(self, model: str | None = None) -> str | None:
         """Get API key for the given model. Falls back to first available key."""
         p = self.get_provider(model)
@@ -10,6 +10,7 @@ from typing import Any, Callable, Coroutine
 from loguru import logger
 
 from nanobot.cron.types import CronJob, CronJobState, CronPayload, CronSchedule, CronStore
+from nanobot.utils.writer import CoalescingWriter
 
 
 def _now_ms() -> int:
@@ -52,6 +53,7 @@ class CronService:
         self._store: CronStore | None = None
         self._timer_task: asyncio.Task | None = None
         self._running = False
+        self._writer = CoalescingWriter()  # Writes off the event loop when one is running
     
     def _load_store(self) -> CronStore:
         """Load jobs from disk."""
@@ -101,12 +103,11 @@ class CronService:
         return self._store
     
     def _save_store(self) -> None:
-        """Save jobs to disk."""
+        """Save jobs to disk (in the background when called from the event loop)."""
         if not self._store:
             return
         
-        self.store_path.parent.mkdir(parents=True, exist_ok=True)
-        
+        # Serialize now so the background write sees a consistent snapshot
         data = {
             "version": self._store.version,
             "jobs": [
@@ -142,7 +143,19 @@ class CronService:
             ]
         }
         
-        self.store_path.write_text(json.dumps(data, indent=2))
+        text = json.dumps(data, indent=2)
+        self._writer.submit("cron", lambda: self._write_store(text))
+
+    def _write_store(self, text: str) -> None:
+        """Atomically replace the jobs file."""
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.store_path.with_suffix(".json.tmp")
+        tmp_path.write_text(text)
+        tmp_path.replace(self.store_path)
+
+    async def flush(self) -> None:
+        """Wait for pending job store writes to reach disk."""
+        await self._writer.flush()
     
     async def start(self) -> None:
         """Start the cron service."""
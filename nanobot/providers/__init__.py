@@ -1,6 +1,14 @@
 """LLM provider abstraction module."""
 
-from nanobot.providers.base import LLMProvider, LLMResponse
+from nanobot.providers.base import LLMProvider, LLMResponse, StreamChunk
+from nanobot.providers.cache import CachingProvider
 from nanobot.providers.litellm_provider import LiteLLMProvider
+from nanobot.providers.ratelimit import RateLimitedProvider, RateLimiter
+from nanobot.providers.resilient import ResilientProvider
+from nanobot.providers.routing import ModelRoute, RoutingProvider
 
-__all__ = ["LLMProvider", "LLMResponse", "LiteLLMProvider"]
+__all__ = [
+    "LLMProvider", "LLMResponse", "StreamChunk", "LiteLLMProvider",
+    "ResilientProvider", "ModelRoute", "RoutingProvider",
+    "RateLimitedProvider", "RateLimiter", "CachingProvider",
+]
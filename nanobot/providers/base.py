@@ -1,8 +1,13 @@
 """Base LLM provider interface."""
 
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, AsyncIterator
+
+# Scheduling class (nanobot.bus.events.Priority) of the turn making an LLM call.
+# Set by the agent loop for the duration of a turn; providers may use it for routing.
+llm_priority: ContextVar[int] = ContextVar("llm_priority", default=0)
 
 
 @dataclass
@@ -20,6 +25,7 @@ class LLMResponse:
     tool_calls: list[ToolCallRequest] = field(default_factory=list)
     finish_reason: str = "stop"
     usage: dict[str, int] = field(default_factory=dict)
+    error: Exception | None = field(default=None, repr=False)  # Cause when finish_reason is "error"
     
     @property
     def has_tool_calls(self) -> bool:
@@ -27,6 +33,13 @@ class LLMResponse:
         return len(self.tool_calls) > 0
 
 
+@dataclass
+class StreamChunk:
+    """A piece of a streamed LLM response."""
+    delta: str = ""  # Text generated since the previous chunk
+    response: LLMResponse | None = None  # Complete response, set on the last chunk only
+
+
 class LLMProvider(ABC):
     """
     Abstract base class for LLM providers.
@@ -63,6 +76,37 @@ class LLMProvider(ABC):
         """
         pass
     
+    async def stream_chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Send a chat completion request and stream the response.
+
+        Yields text deltas as they arrive. The last chunk carries the
+        complete LLMResponse, including any tool calls.
+
+        Providers without native streaming fall back to chat() and yield
+        the whole text in a single chunk.
+        """
+        response = await self.chat(
+            messages=messages,
+            tools=tools,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        if response.content:
+            yield StreamChunk(delta=response.content)
+        yield StreamChunk(response=response)
+
+    async def aclose(self) -> None:
+        """Release connections held by the provider (no-op by default)."""
+
     @abstractmethod
     def get_default_model(self) -> str:
         """Get the default model for this provider."""
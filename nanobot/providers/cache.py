@@ -0,0 +1,306 @@
+"""Response cache for repeatable LLM calls."""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from loguru import logger
+
+from nanobot.providers.base import (
+    LLMProvider,
+    LLMResponse,
+    StreamChunk,
+    ToolCallRequest,
+    llm_priority,
+)
+
+# Set to True around calls whose responses may be cached at any temperature
+llm_cacheable: ContextVar[bool] = ContextVar("llm_cacheable", default=False)
+
+# The clock section of the per-turn system prompt (ContextBuilder.build_volatile_context)
+_CURRENT_TIME = re.compile(r"## Current Time\n[^\n]*(\n\n)?")
+
+
+def cache_key(
+    model: str,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]] | None,
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    """Canonical hash of everything that determines a chat request."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "tools": tools or [],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def background_messages(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    The part of a background (heartbeat, cron) request that decides its answer.
+
+    Background turns repeat the same prompt in a session whose history only
+    grows, under a system prompt stamped with the current time. Keying on
+    the whole request would never repeat, so the key keeps the system
+    prompt without its clock and only the current turn (from the last user
+    message on, including its tool calls and results).
+    """
+    start = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=0)
+    system = []
+    for m in messages[:start]:
+        if m.get("role") != "system":
+            continue
+        content = m.get("content")
+        if isinstance(content, str):
+            content = _CURRENT_TIME.sub("", content)
+        elif isinstance(content, list):
+            content = [
+                {**block, "text": _CURRENT_TIME.sub("", block["text"])} if isinstance(block.get("text"), str) else block
+                for block in content
+            ]
+        system.append({**m, "content": content})
+    return system + messages[start:]
+
+
+def _encode(response: LLMResponse) -> dict[str, Any]:
+    return {
+        "content": response.content,
+        "tool_calls": [asdict(tc) for tc in response.tool_calls],
+        "finish_reason": response.finish_reason,
+    }
+
+
+def _decode(data: dict[str, Any]) -> LLMResponse:
+    """Rebuild a cached response with fresh tool call ids (ids must stay unique within a conversation)."""
+    return LLMResponse(
+        content=data["content"],
+        tool_calls=[
+            ToolCallRequest(
+                id=f"call_{uuid.uuid4().hex[:24]}", name=tc["name"], arguments=copy.deepcopy(tc["arguments"]),
+            )
+            for tc in data["tool_calls"]
+        ],
+        finish_reason=data["finish_reason"],
+        usage={},  # Nothing was spent on a hit
+    )
+
+
+class CachingProvider(LLMProvider):
+    """
+    Serves byte-identical, repeatable chat requests from a cache.
+
+    A call is cacheable if it runs at temperature 0, if llm_cacheable is
+    set, or if its turn priority (llm_priority) is in `cacheable_priorities`
+    (e.g. heartbeats and cron). The key is a hash of model, messages, tools,
+    max_tokens and temperature, so any change in the conversation misses.
+    For calls cached because of their priority the key only covers the
+    current turn and ignores the clock (see background_messages).
+
+    Entries live in an in-memory LRU of `max_entries` and, with `cache_dir`,
+    in one JSON file per key shared by all processes; both expire after
+    `ttl_s`. Error responses are never stored. Tool calls in a cached
+    response get new ids on every hit, so replayed tool-calling turns stay
+    valid conversations.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        cache_dir: Path | None = None,
+        max_entries: int = 256,
+        ttl_s: float = 3600.0,
+        cacheable_priorities: set[int] | frozenset[int] = frozenset(),
+    ):
+        super().__init__(provider.api_key, provider.api_base)
+        self.provider = provider
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.cacheable_priorities = frozenset(cacheable_priorities)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        # key -> (expires_at wall clock, encoded response)
+        self._memory: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_default_model(self) -> str:
+        return self.provider.get_default_model()
+
+    async def aclose(self) -> None:
+        stats = self.stats()
+        if stats["hits"] + stats["misses"]:
+            logger.info(
+                f"LLM cache: {stats['hits']} hits ({stats['disk_hits']} from disk), {stats['misses']} misses, "
+                f"hit rate {stats['hit_rate']:.0%}"
+            )
+        await self.provider.aclose()
+
+    def cacheable(self, temperature: float) -> bool:
+        """Check if the current call may be served from or stored in the cache."""
+        return temperature == 0 or llm_cacheable.get() or llm_priority.get() in self.cacheable_priorities
+
+    def _key(
+        self,
+        model: str,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> str:
+        if llm_priority.get() in self.cacheable_priorities:
+            messages = background_messages(messages)
+        return cache_key(model, messages, tools, max_tokens, temperature)
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        """Send a chat completion request, answering repeatable ones from the cache (see LLMProvider.chat)."""
+        model = model or self.get_default_model()
+        if not self.cacheable(temperature):
+            self.skipped += 1
+            return await self.provider.chat(
+                messages=messages, tools=tools, model=model,
+                max_tokens=max_tokens, temperature=temperature,
+            )
+
+        key = self._key(model, messages, tools, max_tokens, temperature)
+        cached = await self._get(key)
+        if cached is not None:
+            return cached
+        response = await self.provider.chat(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        )
+        await self._put(key, response)
+        return response
+
+    async def stream_chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[StreamChunk]:
+        """Stream a chat completion; a cache hit is yielded as a single chunk (see LLMProvider.stream_chat)."""
+        model = model or self.get_default_model()
+        key = None
+        if self.cacheable(temperature):
+            key = self._key(model, messages, tools, max_tokens, temperature)
+            cached = await self._get(key)
+            if cached is not None:
+                if cached.content:
+                    yield StreamChunk(delta=cached.content)
+                yield StreamChunk(response=cached)
+                return
+        else:
+            self.skipped += 1
+
+        async for chunk in self.provider.stream_chat(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        ):
+            if key is not None and chunk.response is not None:
+                await self._put(key, chunk.response)
+            yield chunk
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    async def _get(self, key: str) -> LLMResponse | None:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return _decode(entry[1])
+            del self._memory[key]
+
+        if self.cache_dir is not None:
+            record = await asyncio.to_thread(self._read, key)
+            if record is not None and record["expires_at"] > now:
+                self._remember(key, record["expires_at"], record["response"])
+                self.hits += 1
+                self.disk_hits += 1
+                return _decode(record["response"])
+
+        self.misses += 1
+        return None
+
+    async def _put(self, key: str, response: LLMResponse) -> None:
+        if response.finish_reason == "error":
+            return
+        expires_at = time.time() + self.ttl_s
+        data = _encode(response)
+        self._remember(key, expires_at, data)
+        if self.cache_dir is not None:
+            try:
+                await asyncio.to_thread(self._write, key, {"expires_at": expires_at, "response": data})
+            except OSError as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def _remember(self, key: str, expires_at: float, data: dict[str, Any]) -> None:
+        self._memory[key] = (expires_at, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read(self, key: str) -> dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if record.get("expires_at", 0) <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return record
+
+    def _write(self, key: str, record: dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def stats(self) -> dict[str, Any]:
+        """Hits (memory and disk), misses, uncacheable calls and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._memory),
+        }
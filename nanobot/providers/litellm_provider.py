@@ -1,12 +1,23 @@
 """LiteLLM provider implementation for multi-provider support."""
 
+import asyncio
+import inspect
+import json
 import os
-from typing import Any
+from typing import Any, AsyncIterator
 
 import litellm
 from litellm import acompletion
 
-from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - litellm depends on aiohttp
+    aiohttp = None
+
+from nanobot.providers.base import LLMProvider, LLMResponse, StreamChunk, ToolCallRequest
+
+# Older litellm releases have no shared_session argument
+_SHARED_SESSIONS = aiohttp is not None and "shared_session" in inspect.signature(acompletion).parameters
 
 
 class LiteLLMProvider(LLMProvider):
@@ -15,6 +26,12 @@ class LiteLLMProvider(LLMProvider):
     
     Supports OpenRouter, Anthropic, OpenAI, Gemini, and many other providers through
     a unified interface.
+
+    Credentials and endpoint are passed on every call rather than through
+    environment variables or litellm globals, so several providers can run
+    side by side in one process. Each provider keeps one HTTP session with
+    keep-alive connections to its endpoint and caps concurrent requests at
+    `max_concurrency`.
     """
     
     def __init__(
@@ -23,10 +40,18 @@ class LiteLLMProvider(LLMProvider):
         api_base: str | None = None,
         default_model: str = "anthropic/claude-opus-4-5",
         extra_headers: dict[str, str] | None = None,
+        max_concurrency: int = 8,
+        max_connections: int = 32,
+        keepalive_s: float = 60.0,
     ):
         super().__init__(api_key, api_base)
         self.default_model = default_model
         self.extra_headers = extra_headers or {}
+        self.max_connections = max_connections
+        self.keepalive_s = keepalive_s
+        self._limit = asyncio.Semaphore(max(1, max_concurrency))
+        self._session: Any = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
         
         # Detect OpenRouter by api_key prefix or explicit api_base
         self.is_openrouter = (
@@ -40,42 +65,30 @@ class LiteLLMProvider(LLMProvider):
         # Track if using custom endpoint (vLLM, etc.)
         self.is_vllm = bool(api_base) and not self.is_openrouter and not self.is_aihubmix
         
-        # Configure LiteLLM based on provider
-        if api_key:
-            if self.is_openrouter:
-                # OpenRouter mode - set key
-                os.environ["OPENROUTER_API_KEY"] = api_key
-            elif self.is_aihubmix:
-                # AiHubMix gateway - OpenAI-compatible
-                os.environ["OPENAI_API_KEY"] = api_key
-            elif self.is_vllm:
-                # vLLM/custom endpoint - uses OpenAI-compatible API
-                os.environ["HOSTED_VLLM_API_KEY"] = api_key
-            elif "deepseek" in default_model:
-                os.environ.setdefault("DEEPSEEK_API_KEY", api_key)
-            elif "anthropic" in default_model:
-                os.environ.setdefault("ANTHROPIC_API_KEY", api_key)
-            elif "openai" in default_model or "gpt" in default_model:
-                os.environ.setdefault("OPENAI_API_KEY", api_key)
-            elif "gemini" in default_model.lower():
-                os.environ.setdefault("GEMINI_API_KEY", api_key)
-            elif "zhipu" in default_model or "glm" in default_model or "zai" in default_model:
-                os.environ.setdefault("ZAI_API_KEY", api_key)
-                os.environ.setdefault("ZHIPUAI_API_KEY", api_key)
-            elif "dashscope" in default_model or "qwen" in default_model.lower():
-                os.environ.setdefault("DASHSCOPE_API_KEY", api_key)
-            elif "groq" in default_model:
-                os.environ.setdefault("GROQ_API_KEY", api_key)
-            elif "moonshot" in default_model or "kimi" in default_model:
-                os.environ.setdefault("MOONSHOT_API_KEY", api_key)
-                os.environ.setdefault("MOONSHOT_API_BASE", api_base or "https://api.moonshot.cn/v1")
-        
-        if api_base:
-            litellm.api_base = api_base
-        
         # Disable LiteLLM logging noise
         litellm.suppress_debug_info = True
     
+    def _http_session(self) -> Any:
+        """The provider's keep-alive session for the running loop (None without aiohttp support)."""
+        if not _SHARED_SESSIONS:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Sessions are bound to the loop that created them
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections or 0,
+                keepalive_timeout=self.keepalive_s,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+        return self._session
+
+    async def aclose(self) -> None:
+        """Close the provider's HTTP session."""
+        session, self._session = self._session, None
+        if session is not None and not session.closed and self._session_loop is asyncio.get_running_loop():
+            await session.close()
+
     async def chat(
         self,
         messages: list[dict[str, Any]],
@@ -97,6 +110,102 @@ class LiteLLMProvider(LLMProvider):
         Returns:
             LLMResponse with content and/or tool calls.
         """
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature)
+
+        try:
+            async with self._limit:
+                response = await acompletion(**kwargs, **self._transport_kwargs())
+            return self._parse_response(response)
+        except Exception as e:
+            # Return error as content for graceful handling
+            return LLMResponse(
+                content=f"Error calling LLM: {str(e)}",
+                finish_reason="error",
+                error=e,
+            )
+
+    async def stream_chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Stream a chat completion via LiteLLM.
+
+        Text deltas are yielded as they arrive; tool call fragments are
+        assembled by index and returned in the final chunk's LLMResponse.
+        """
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature)
+        kwargs["stream"] = True
+        kwargs["stream_options"] = {"include_usage": True}
+
+        content_parts: list[str] = []
+        tool_parts: dict[int, dict[str, str]] = {}
+        finish_reason = "stop"
+        usage: dict[str, int] = {}
+
+        try:
+            async with self._limit:
+                stream = await acompletion(**kwargs, **self._transport_kwargs())
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = self._parse_usage(chunk.usage)
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    delta = choice.delta
+
+                    if delta and delta.content:
+                        content_parts.append(delta.content)
+                        yield StreamChunk(delta=delta.content)
+
+                    for tc in (getattr(delta, "tool_calls", None) or []) if delta else []:
+                        part = tool_parts.setdefault(tc.index or 0, {"id": "", "name": "", "arguments": ""})
+                        if tc.id:
+                            part["id"] = tc.id
+                        if tc.function and tc.function.name:
+                            part["name"] = tc.function.name
+                        if tc.function and tc.function.arguments:
+                            part["arguments"] += tc.function.arguments
+
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+        except Exception as e:
+            yield StreamChunk(response=LLMResponse(
+                content=f"Error calling LLM: {str(e)}",
+                finish_reason="error",
+                error=e,
+            ))
+            return
+
+        tool_calls = [
+            ToolCallRequest(
+                id=part["id"],
+                name=part["name"],
+                arguments=self._parse_arguments(part["arguments"]),
+            )
+            for _, part in sorted(tool_parts.items())
+            if part["name"]
+        ]
+        yield StreamChunk(response=LLMResponse(
+            content="".join(content_parts) or None,
+            tool_calls=tool_calls,
+            finish_reason=finish_reason,
+            usage=usage,
+        ))
+
+    def _build_kwargs(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        model: str | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> dict[str, Any]:
+        """Build LiteLLM completion kwargs (model prefixing, endpoint, headers)."""
         model = model or self.default_model
         
         # Auto-prefix model names for known providers
@@ -127,14 +236,18 @@ class LiteLLMProvider(LLMProvider):
 
         kwargs: dict[str, Any] = {
             "model": model,
-            "messages": messages,
+            "messages": self._prepare_messages(messages, model),
             "max_tokens": max_tokens,
             "temperature": temperature,
         }
         
-        # Pass api_base directly for custom endpoints (vLLM, etc.)
+        # Credentials and endpoint go with each call, never through process globals
+        if self.api_key:
+            kwargs["api_key"] = self.api_key
         if self.api_base:
             kwargs["api_base"] = self.api_base
+        elif model.startswith("moonshot/"):
+            kwargs["api_base"] = os.environ.get("MOONSHOT_API_BASE", "https://api.moonshot.cn/v1")
         
         # Pass extra headers (e.g. APP-Code for AiHubMix)
         if self.extra_headers:
@@ -144,16 +257,69 @@ class LiteLLMProvider(LLMProvider):
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
         
-        try:
-            response = await acompletion(**kwargs)
-            return self._parse_response(response)
-        except Exception as e:
-            # Return error as content for graceful handling
-            return LLMResponse(
-                content=f"Error calling LLM: {str(e)}",
-                finish_reason="error",
-            )
+        return kwargs
     
+    def _transport_kwargs(self) -> dict[str, Any]:
+        """Per-call transport options: reuse this provider's keep-alive session."""
+        session = self._http_session()
+        return {"shared_session": session} if session is not None else {}
+
+    @staticmethod
+    def _supports_cache_control(model: str) -> bool:
+        """Check if the model accepts Anthropic-style cache_control breakpoints."""
+        model_lower = model.lower()
+        return "anthropic" in model_lower or "claude" in model_lower
+
+    def _prepare_messages(self, messages: list[dict[str, Any]], model: str) -> list[dict[str, Any]]:
+        """
+        Adapt multi-block system prompts to the target provider.
+
+        For models with explicit prompt caching, a cache_control breakpoint is
+        placed after the stable system block and on the latest user message,
+        so the tool definitions, system prefix and history are reused across
+        turns. Other providers get the system blocks flattened to a string
+        (OpenAI-style providers cache identical prefixes automatically).
+
+        The input list is not modified.
+        """
+        if self._supports_cache_control(model):
+            prepared = [self._with_system_breakpoint(m) for m in messages]
+            for i in range(len(prepared) - 1, -1, -1):
+                if prepared[i].get("role") == "user":
+                    prepared[i] = self._with_breakpoint(prepared[i])
+                    break
+            return prepared
+
+        return [
+            {**m, "content": "\n\n".join(b["text"] for b in m["content"] if b.get("text"))}
+            if m.get("role") == "system" and isinstance(m.get("content"), list) else m
+            for m in messages
+        ]
+
+    @staticmethod
+    def _with_system_breakpoint(msg: dict[str, Any]) -> dict[str, Any]:
+        """Mark the first (stable) block of a multi-block system message as cacheable."""
+        content = msg.get("content")
+        if msg.get("role") != "system" or not isinstance(content, list) or not content:
+            return msg
+        first = {**content[0], "cache_control": {"type": "ephemeral"}}
+        return {**msg, "content": [first, *content[1:]]}
+
+    @staticmethod
+    def _with_breakpoint(msg: dict[str, Any]) -> dict[str, Any]:
+        """Mark the end of a message as a cache breakpoint."""
+        content = msg.get("content")
+        if isinstance(content, str):
+            if not content:
+                return msg
+            blocks = [{"type": "text", "text": content}]
+        elif isinstance(content, list) and content:
+            blocks = list(content)
+        else:
+            return msg
+        blocks[-1] = {**blocks[-1], "cache_control": {"type": "ephemeral"}}
+        return {**msg, "content": blocks}
+
     def _parse_response(self, response: Any) -> LLMResponse:
         """Parse LiteLLM response into our standard format."""
         choice = response.choices[0]
@@ -162,28 +328,15 @@ class LiteLLMProvider(LLMProvider):
         tool_calls = []
         if hasattr(message, "tool_calls") and message.tool_calls:
             for tc in message.tool_calls:
-                # Parse arguments from JSON string if needed
-                args = tc.function.arguments
-                if isinstance(args, str):
-                    import json
-                    try:
-                        args = json.loads(args)
-                    except json.JSONDecodeError:
-                        args = {"raw": args}
-                
                 tool_calls.append(ToolCallRequest(
                     id=tc.id,
                     name=tc.function.name,
-                    arguments=args,
+                    arguments=self._parse_arguments(tc.function.arguments),
                 ))
         
         usage = {}
         if hasattr(response, "usage") and response.usage:
-            usage = {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens,
-            }
+            usage = self._parse_usage(response.usage)
         
         return LLMResponse(
             content=message.content,
@@ -192,6 +345,37 @@ class LiteLLMProvider(LLMProvider):
             usage=usage,
         )
     
+    @staticmethod
+    def _parse_arguments(args: Any) -> dict[str, Any]:
+        """Parse tool call arguments from a JSON string if needed."""
+        if isinstance(args, str):
+            if not args:
+                return {}
+            try:
+                args = json.loads(args)
+            except json.JSONDecodeError:
+                args = {"raw": args}
+        return args
+
+    @staticmethod
+    def _parse_usage(usage: Any) -> dict[str, int]:
+        """Extract token counts (including prompt cache reads/writes) from a LiteLLM usage object."""
+        result = {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+        }
+
+        # OpenAI reports cache reads in prompt_tokens_details; Anthropic in cache_*_input_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or getattr(usage, "cache_read_input_tokens", None)
+        if cached:
+            result["cached_tokens"] = cached
+        written = getattr(usage, "cache_creation_input_tokens", None)
+        if written:
+            result["cache_creation_tokens"] = written
+        return result
+
     def get_default_model(self) -> str:
         """Get the default model."""
         return self.default_model
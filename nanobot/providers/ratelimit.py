@@ -0,0 +1,250 @@
+"""Client-side rate limiting of LLM calls."""
+
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from nanobot.bus.priority import effective_priority
+from nanobot.providers.base import LLMProvider, LLMResponse, StreamChunk, llm_priority
+from nanobot.utils.metrics import LatencyHistogram
+
+
+class TokenBucket:
+    """
+    Bucket refilled continuously at `per_minute` units per minute.
+
+    The level may go negative when a reservation is reconciled upwards;
+    later takers then wait for the debt to be refilled.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) units after the fact."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass
+class _Lane:
+    requests: TokenBucket | None
+    tokens: TokenBucket | None
+    waiters: list[tuple[int, int, float, asyncio.Event]] = field(default_factory=list)
+
+    def wait_time(self, tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1) if self.requests else 0.0,
+            self.tokens.wait_time(tokens) if self.tokens else 0.0,
+        )
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets, one pair per key.
+
+    Callers reserve one request and an estimated token count before a call
+    and reconcile the estimate with the reported usage afterwards. Waiters
+    for the same key are served most urgent first (lower priority value),
+    with aging so background work is not starved (see effective_priority).
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, aging_s: float = 5.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.aging_s = aging_s
+        self.wait_latency: dict[int, LatencyHistogram] = {}
+        self.throttled = 0
+        self._lanes: dict[str, _Lane] = {}
+        self._seq = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+    def _lane(self, key: str) -> _Lane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(
+                TokenBucket(self.requests_per_minute) if self.requests_per_minute > 0 else None,
+                TokenBucket(self.tokens_per_minute) if self.tokens_per_minute > 0 else None,
+            )
+        return lane
+
+    def _head(self, lane: _Lane) -> tuple[int, int, float, asyncio.Event]:
+        now = time.monotonic()
+        return min(lane.waiters, key=lambda w: (effective_priority(w[0], now - w[2], self.aging_s), w[1]))
+
+    @staticmethod
+    def _notify(lane: _Lane) -> None:
+        for *_, event in lane.waiters:
+            event.set()
+
+    async def acquire(self, key: str, tokens: int, priority: int = 0) -> None:
+        """
+        Wait until a request of about `tokens` tokens fits the budgets for `key`.
+
+        Args:
+            key: Budget key (e.g. endpoint and model).
+            tokens: Estimated tokens of the request.
+            priority: Scheduling class; lower values go first.
+        """
+        if not self.enabled:
+            return
+        lane = self._lane(key)
+        started = time.monotonic()
+        entry = (priority, next(self._seq), started, asyncio.Event())
+        lane.waiters.append(entry)
+        self._notify(lane)
+        waited = False
+        try:
+            while True:
+                entry[3].clear()
+                if self._head(lane) is entry:
+                    wait = lane.wait_time(tokens)
+                    if wait <= 0:
+                        break
+                else:
+                    # Re-check periodically: aging can make us the most urgent waiter
+                    wait = self.aging_s if self.aging_s > 0 else None
+                waited = True
+                try:
+                    await asyncio.wait_for(entry[3].wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            lane.waiters.remove(entry)
+            self._notify(lane)
+
+        if lane.requests:
+            lane.requests.take(1)
+        if lane.tokens:
+            lane.tokens.take(tokens)
+        if waited:
+            self.throttled += 1
+        hist = self.wait_latency.get(priority)
+        if hist is None:
+            hist = self.wait_latency[priority] = LatencyHistogram()
+        hist.observe(time.monotonic() - started)
+
+    def reconcile(self, key: str, estimated: int, actual: int | None) -> None:
+        """Correct the token budget once the real usage of a call is known (None refunds the estimate)."""
+        lane = self._lanes.get(key)
+        if lane is None or lane.tokens is None:
+            return
+        lane.tokens.adjust((actual or 0) - estimated)
+
+    def stats(self) -> dict[str, Any]:
+        """Throttling counters, wait times per priority and remaining budgets per key."""
+        return {
+            "throttled": self.throttled,
+            "wait": {p: h.snapshot() for p, h in sorted(self.wait_latency.items())},
+            "keys": {
+                key: {
+                    "requests_left": round(lane.requests.level, 1) if lane.requests else None,
+                    "tokens_left": round(lane.tokens.level) if lane.tokens else None,
+                    "waiting": len(lane.waiters),
+                }
+                for key, lane in self._lanes.items()
+            },
+        }
+
+
+def estimate_request_tokens(messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None) -> int:
+    """Rough prompt size (~4 characters per token) of a chat request."""
+    chars = len(json.dumps(messages, ensure_ascii=False, default=str))
+    if tools:
+        chars += len(json.dumps(tools, ensure_ascii=False))
+    return (chars + 3) // 4
+
+
+class RateLimitedProvider(LLMProvider):
+    """
+    Wraps a provider so its calls go through a shared RateLimiter.
+
+    Share one limiter between the providers of all models so every caller
+    (agent turns, subagents, cron, heartbeat) draws on the same budgets.
+    The budget key is the provider's endpoint plus the model, and the
+    caller's priority comes from llm_priority.
+    """
+
+    def __init__(self, provider: LLMProvider, limiter: RateLimiter):
+        super().__init__(provider.api_key, provider.api_base)
+        self.provider = provider
+        self.limiter = limiter
+
+    def get_default_model(self) -> str:
+        return self.provider.get_default_model()
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
+
+    def _key(self, model: str) -> str:
+        return f"{self.provider.api_base or model.split('/', 1)[0]}|{model}"
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        """Send a chat completion request once the budgets allow it (see LLMProvider.chat)."""
+        model = model or self.get_default_model()
+        key = self._key(model)
+        estimate = estimate_request_tokens(messages, tools)
+        await self.limiter.acquire(key, estimate, llm_priority.get())
+        response = await self.provider.chat(
+            messages=messages, tools=tools, model=model,
+            max_tokens=max_tokens, temperature=temperature,
+        )
+        self.limiter.reconcile(key, estimate, response.usage.get("total_tokens"))
+        return response
+
+    async def stream_chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[StreamChunk]:
+        """Stream a chat completion once the budgets allow it (see LLMProvider.stream_chat)."""
+        model = model or self.get_default_model()
+        key = self._key(model)
+        estimate = estimate_request_tokens(messages, tools)
+        await self.limiter.acquire(key, estimate, llm_priority.get())
+        usage: int | None = None
+        try:
+            async for chunk in self.provider.stream_chat(
+                messages=messages, tools=tools, model=model,
+                max_tokens=max_tokens, temperature=temperature,
+            ):
+                if chunk.response is not None:
+                    usage = chunk.response.usage.get("total_tokens")
+                yield chunk
+        finally:
+            self.limiter.reconcile(key, estimate, usage)
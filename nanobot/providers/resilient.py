@@ -0,0 +1,370 @@
+"""Retries, hedging and circuit breaking around an LLM provider."""
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from loguru import logger
+
+from nanobot.providers.base import LLMProvider, LLMResponse, StreamChunk
+from nanobot.utils.metrics import LatencyHistogram
+
+# LLM calls take seconds, so the default bus buckets are too coarse for hedging
+LLM_LATENCY_BUCKETS = (0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0)
+
+# Error classes (see classify_error)
+RATE_LIMIT = "rate_limit"
+OVERLOAD = "overload"
+FATAL = "fatal"
+
+_OVERLOAD_STATUS = {408, 409, 500, 502, 503, 504, 529}
+_RATE_LIMIT_NAMES = ("RateLimitError",)
+_OVERLOAD_NAMES = (
+    "Timeout", "TimeoutError", "APIConnectionError", "ServiceUnavailableError",
+    "InternalServerError", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+    "ServerDisconnectedError", "ClientConnectionError",
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised (as LLMResponse.error) when an endpoint's circuit breaker is open."""
+
+
+def _status_code(error: BaseException) -> int | None:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: BaseException | None) -> str:
+    """
+    Decide whether a failed LLM call is worth retrying.
+
+    Args:
+        error: The exception behind the failed call.
+
+    Returns:
+        RATE_LIMIT for 429s, OVERLOAD for overloaded or unreachable endpoints
+        (5xx, 529, timeouts, connection errors), FATAL for everything else
+        (bad requests, auth, context too long), which must not be retried.
+    """
+    if error is None or isinstance(error, CircuitOpenError):
+        return FATAL
+    status = _status_code(error)
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if status == 429 or names.intersection(_RATE_LIMIT_NAMES):
+        return RATE_LIMIT
+    if status in _OVERLOAD_STATUS or names.intersection(_OVERLOAD_NAMES):
+        return OVERLOAD
+    if status is None and isinstance(error, (TimeoutError, ConnectionError)):
+        return OVERLOAD
+    if status is None and "overloaded" in str(error).lower():
+        return OVERLOAD
+    return FATAL
+
+
+def retry_after_s(error: BaseException | None) -> float | None:
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms), if any."""
+    if error is None:
+        return None
+    headers = getattr(error, "litellm_response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one endpoint.
+
+    After `failure_threshold` retryable failures in a row the circuit opens
+    and calls fail fast for `reset_s`. Then a single trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened = 0
+        self._opened_at: float | None = None
+        self._trial_at: float | None = None  # Start of the half-open trial call
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open'."""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_s:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Check if a call may go through now (claims the half-open trial)."""
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        # A trial that never reported back (e.g. cancelled) expires after reset_s
+        if state == "half_open" and (self._trial_at is None or now - self._trial_at > self.reset_s):
+            self._trial_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        trial = self._trial_at is not None
+        if trial or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            if self._opened_at is None or trial:
+                self.opened += 1
+            self._opened_at = time.monotonic()
+        self._trial_at = None
+
+
+class ResilientProvider(LLMProvider):
+    """
+    Wraps a provider with classified retries, hedging and circuit breaking.
+
+    Rate-limited and overloaded calls are retried up to `max_retries` times
+    with exponential backoff and jitter, waiting at least as long as the
+    server's Retry-After (a call is not retried if that exceeds
+    `max_delay_s`). Fatal errors are returned at once. Streams are only
+    retried if they fail before any text was produced.
+
+    With `hedge`, a non-streaming call still running after the
+    `hedge_quantile` latency of earlier non-streaming calls gets a second,
+    identical request; the first good answer wins and the other is
+    cancelled. Streams are never hedged; their time to first chunk is
+    tracked separately in `stream_latency` and does not move the deadline.
+
+    Each endpoint (api_base, or the model's provider prefix) has its own
+    CircuitBreaker; while it is open calls fail fast with an error response.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        max_retries: int = 3,
+        base_delay_s: float = 1.0,
+        max_delay_s: float = 30.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        breaker_failures: int = 5,
+        breaker_reset_s: float = 30.0,
+    ):
+        super().__init__(provider.api_key, provider.api_base)
+        self.provider = provider
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_s = breaker_reset_s
+        self.latency = LatencyHistogram(LLM_LATENCY_BUCKETS)  # Complete non-streaming calls
+        self.stream_latency = LatencyHistogram(LLM_LATENCY_BUCKETS)  # Time to the first stream chunk
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def get_default_model(self) -> str:
+        return self.provider.get_default_model()
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        """Send a chat completion request, retrying transient failures (see LLMProvider.chat)."""
+        model = model or self.get_default_model()
+        breaker = self._breaker(model)
+
+        async def call() -> LLMResponse:
+            return await self.provider.chat(
+                messages=messages, tools=tools, model=model,
+                max_tokens=max_tokens, temperature=temperature,
+            )
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                return self._circuit_open(model)
+            started = time.monotonic()
+            response = await self._hedged(call)
+            delay = self._after_call(breaker, model, response, attempt, self.latency, time.monotonic() - started)
+            if delay is None:
+                return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def stream_chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[StreamChunk]:
+        """Stream a chat completion, retrying failures that happen before any text (see LLMProvider.stream_chat)."""
+        model = model or self.get_default_model()
+        breaker = self._breaker(model)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                yield StreamChunk(response=self._circuit_open(model))
+                return
+            started = time.monotonic()
+            first_chunk: float | None = None
+            streamed = False
+            final: LLMResponse | None = None
+            async for chunk in self.provider.stream_chat(
+                messages=messages, tools=tools, model=model,
+                max_tokens=max_tokens, temperature=temperature,
+            ):
+                if first_chunk is None:
+                    first_chunk = time.monotonic() - started
+                if chunk.response is not None:
+                    final = chunk.response  # Always the last chunk
+                    continue
+                streamed = True
+                yield chunk
+            if final is None:
+                final = LLMResponse(content="Error calling LLM: stream ended without a response", finish_reason="error")
+
+            delay = self._after_call(breaker, model, final, attempt, self.stream_latency, first_chunk or 0.0)
+            if delay is None or streamed:
+                yield StreamChunk(response=final)
+                return
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _after_call(
+        self,
+        breaker: CircuitBreaker,
+        model: str,
+        response: LLMResponse,
+        attempt: int,
+        latency: LatencyHistogram,
+        elapsed: float,
+    ) -> float | None:
+        """Record the outcome of a call; return the delay before retrying, or None to return it."""
+        if response.finish_reason != "error":
+            breaker.record_success()
+            latency.observe(elapsed)
+            return None
+
+        kind = classify_error(response.error)
+        if kind == FATAL:
+            return None
+        breaker.record_failure()
+        if attempt >= self.max_retries:
+            logger.error(f"LLM call to {model} failed after {attempt + 1} attempts ({kind}): {response.error}")
+            return None
+
+        delay = min(self.max_delay_s, self.base_delay_s * 2 ** attempt)
+        delay = random.uniform(delay / 2, delay)
+        wait = retry_after_s(response.error)
+        if wait is not None:
+            if wait > self.max_delay_s:
+                logger.warning(f"LLM endpoint for {model} asked to retry after {wait:g}s; giving up")
+                return None
+            delay = max(delay, wait)
+        self.retries += 1
+        logger.warning(f"LLM call to {model} failed ({kind}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    async def _hedged(self, call: Callable[[], Awaitable[LLMResponse]]) -> LLMResponse:
+        """Run a call, racing a second copy if it outlives the hedge deadline."""
+        deadline = self._hedge_deadline()
+        if deadline is None:
+            return await call()
+
+        first = asyncio.ensure_future(call())
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=deadline)
+            if done:
+                return first.result()
+
+            self.hedges += 1
+            second = asyncio.ensure_future(call())
+            pending.add(second)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if t.result().finish_reason != "error"), None)
+                if winner is not None or not pending:
+                    winner = winner or done.pop()
+                    if winner is second:
+                        self.hedge_wins += 1
+                    return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_deadline(self) -> float | None:
+        if not self.hedge or self.latency.count < self.hedge_min_samples:
+            return None
+        return self.latency.quantile(self.hedge_quantile)
+
+    def _endpoint(self, model: str) -> str:
+        return self.provider.api_base or model.split("/", 1)[0]
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        key = self._endpoint(model)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(self.breaker_failures, self.breaker_reset_s)
+        return breaker
+
+    def _circuit_open(self, model: str) -> LLMResponse:
+        endpoint = self._endpoint(model)
+        return LLMResponse(
+            content=f"Error calling LLM: {endpoint} is failing, not retrying for now",
+            finish_reason="error",
+            error=CircuitOpenError(endpoint),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Retry, hedge and circuit breaker counters."""
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency": self.latency.snapshot(),
+            "stream_first_chunk": self.stream_latency.snapshot(),
+            "breakers": {
+                key: {"state": b.state, "failures": b.failures, "opened": b.opened}
+                for key, b in self.breakers.items()
+            },
+        }
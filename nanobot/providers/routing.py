@@ -0,0 +1,198 @@
+"""Routing of LLM calls across several models with fallback."""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from loguru import logger
+
+from nanobot.providers.base import LLMProvider, LLMResponse, StreamChunk, llm_priority
+
+
+@dataclass(eq=False)
+class ModelRoute:
+    """One candidate model and the provider that serves it."""
+    model: str
+    provider: LLMProvider
+    cost: float | None = None  # Relative price (e.g. USD per input token), for cheap turns
+    outcomes: deque = field(default_factory=deque)  # (ok, latency_s) of recent calls
+    last_attempt: float = 0.0
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    def latency(self) -> float | None:
+        """Mean latency of recent successful calls."""
+        samples = [s for ok, s in self.outcomes if ok]
+        return sum(samples) / len(samples) if samples else None
+
+
+class RoutingProvider(LLMProvider):
+    """
+    Sends each call to the healthiest of several models, falling back in order.
+
+    Routes are listed in preference order (the configured model first, then
+    the fallback chain). For every call they are ranked:
+
+    1. healthy routes in preference order, skipping ones whose rolling mean
+       latency is more than `slow_factor` times the fastest healthy route;
+    2. the slow healthy routes, fastest first;
+    3. unhealthy routes (error rate over `max_error_rate` in the last
+       `window` calls), least failing first.
+
+    A failed call moves on to the next route. An unhealthy route gets a
+    probe call again once it has been idle for `probe_s`.
+
+    With `cheap_priority` set, turns of that priority or lower (see
+    llm_priority, e.g. heartbeats) go to the cheapest healthy route that has
+    a known cost.
+
+    A call naming a model that is not one of the routes is passed straight
+    to the first route's provider.
+    """
+
+    def __init__(
+        self,
+        routes: list[ModelRoute],
+        window: int = 50,
+        max_error_rate: float = 0.5,
+        min_samples: int = 5,
+        slow_factor: float = 2.0,
+        probe_s: float = 30.0,
+        cheap_priority: int | None = None,
+    ):
+        if not routes:
+            raise ValueError("RoutingProvider needs at least one route")
+        primary = routes[0].provider
+        super().__init__(primary.api_key, primary.api_base)
+        self.routes = routes
+        for route in routes:
+            route.outcomes = deque(route.outcomes, maxlen=window)
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.slow_factor = slow_factor
+        self.probe_s = probe_s
+        self.cheap_priority = cheap_priority
+        self.fallbacks = 0
+
+    def get_default_model(self) -> str:
+        return self.routes[0].model
+
+    async def aclose(self) -> None:
+        closed: set[int] = set()
+        for route in self.routes:
+            if id(route.provider) not in closed:
+                closed.add(id(route.provider))
+                await route.provider.aclose()
+
+    def healthy(self, route: ModelRoute, now: float | None = None) -> bool:
+        """Check if a route is healthy (or due for a probe)."""
+        if len(route.outcomes) < self.min_samples or route.error_rate() <= self.max_error_rate:
+            return True
+        now = time.monotonic() if now is None else now
+        return now - route.last_attempt >= self.probe_s
+
+    def rank(self) -> list[ModelRoute]:
+        """Routes in the order they should be tried for the current call."""
+        now = time.monotonic()
+        healthy = [r for r in self.routes if self.healthy(r, now)]
+        unhealthy = sorted((r for r in self.routes if r not in healthy), key=ModelRoute.error_rate)
+
+        if self.cheap_priority is not None and llm_priority.get() >= self.cheap_priority:
+            priced = sorted((r for r in healthy if r.cost is not None), key=lambda r: r.cost)
+            healthy = priced + [r for r in healthy if r.cost is None]
+
+        latencies = [lat for r in healthy if (lat := r.latency()) is not None]
+        if not latencies:
+            return healthy + unhealthy
+        limit = min(latencies) * self.slow_factor
+        fast = [r for r in healthy if (r.latency() or 0.0) <= limit]
+        slow = sorted((r for r in healthy if r not in fast), key=lambda r: r.latency())
+        return fast + slow + unhealthy
+
+    def _candidates(self, model: str | None) -> list[ModelRoute]:
+        if model and model not in {r.model for r in self.routes}:
+            first = self.routes[0]
+            return [ModelRoute(model, first.provider)]
+        return self.rank()
+
+    def _record(self, route: ModelRoute, ok: bool, started: float) -> None:
+        route.outcomes.append((ok, time.monotonic() - started))
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> LLMResponse:
+        """Send a chat completion to the best route, falling back on errors (see LLMProvider.chat)."""
+        response: LLMResponse | None = None
+        for i, route in enumerate(self._candidates(model)):
+            if i:
+                self.fallbacks += 1
+                logger.warning(f"LLM call falling back to {route.model}")
+            started = route.last_attempt = time.monotonic()
+            response = await route.provider.chat(
+                messages=messages, tools=tools, model=route.model,
+                max_tokens=max_tokens, temperature=temperature,
+            )
+            ok = response.finish_reason != "error"
+            self._record(route, ok, started)
+            if ok:
+                return response
+        return response
+
+    async def stream_chat(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[StreamChunk]:
+        """Stream from the best route; falls back only if a route fails before producing text."""
+        final: LLMResponse | None = None
+        for i, route in enumerate(self._candidates(model)):
+            if i:
+                self.fallbacks += 1
+                logger.warning(f"LLM stream falling back to {route.model}")
+            started = route.last_attempt = time.monotonic()
+            streamed = False
+            final = None
+            async for chunk in route.provider.stream_chat(
+                messages=messages, tools=tools, model=route.model,
+                max_tokens=max_tokens, temperature=temperature,
+            ):
+                if chunk.response is not None:
+                    final = chunk.response
+                    continue
+                streamed = True
+                yield chunk
+            ok = final is not None and final.finish_reason != "error"
+            self._record(route, ok, started)
+            if ok or streamed:
+                break
+        yield StreamChunk(response=final or LLMResponse(
+            content="Error calling LLM: stream ended without a response", finish_reason="error",
+        ))
+
+    def stats(self) -> dict[str, Any]:
+        """Rolling error rate and latency per route."""
+        now = time.monotonic()
+        return {
+            "fallbacks": self.fallbacks,
+            "routes": {
+                r.model: {
+                    "healthy": self.healthy(r, now),
+                    "calls": len(r.outcomes),
+                    "error_rate": round(r.error_rate(), 3),
+                    "latency_s": r.latency(),
+                }
+                for r in self.routes
+            },
+        }
@@ -1,5 +1,7 @@
 """Session management module."""
 
-from nanobot.session.manager import SessionManager, Session
+from nanobot.session.manager import SessionManager
+from nanobot.session.store import JsonlSessionStore, SessionStore, SqliteSessionStore
+from nanobot.session.types import Session
 
-__all__ = ["SessionManager", "Session"]
+__all__ = ["SessionManager", "Session", "SessionStore", "JsonlSessionStore", "SqliteSessionStore"]
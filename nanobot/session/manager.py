@@ -1,79 +1,58 @@
 """Session management for conversation history."""
 
-import json
+import asyncio
+import weakref
+from collections import OrderedDict
 from pathlib import Path
-from dataclasses import dataclass, field
-from datetime import datetime
 from typing import Any
 
-from loguru import logger
-
-from nanobot.utils.helpers import ensure_dir, safe_filename
-
-
-@dataclass
-class Session:
-    """
-    A conversation session.
-    
-    Stores messages in JSONL format for easy reading and persistence.
-    """
-    
-    key: str  # channel:chat_id
-    messages: list[dict[str, Any]] = field(default_factory=list)
-    created_at: datetime = field(default_factory=datetime.now)
-    updated_at: datetime = field(default_factory=datetime.now)
-    metadata: dict[str, Any] = field(default_factory=dict)
-    
-    def add_message(self, role: str, content: str, **kwargs: Any) -> None:
-        """Add a message to the session."""
-        msg = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat(),
-            **kwargs
-        }
-        self.messages.append(msg)
-        self.updated_at = datetime.now()
-    
-    def get_history(self, max_messages: int = 50) -> list[dict[str, Any]]:
-        """
-        Get message history for LLM context.
-        
-        Args:
-            max_messages: Maximum messages to return.
-        
-        Returns:
-            List of messages in LLM format.
-        """
-        # Get recent messages
-        recent = self.messages[-max_messages:] if len(self.messages) > max_messages else self.messages
-        
-        # Convert to LLM format (just role and content)
-        return [{"role": m["role"], "content": m["content"]} for m in recent]
-    
-    def clear(self) -> None:
-        """Clear all messages in the session."""
-        self.messages = []
-        self.updated_at = datetime.now()
+from nanobot.session.store import SessionStore, create_session_store
+from nanobot.session.types import Session
+from nanobot.utils.helpers import ensure_dir
+from nanobot.utils.writer import CoalescingWriter
 
 
 class SessionManager:
     """
     Manages conversation sessions.
     
-    Sessions are stored as JSONL files in the sessions directory.
+    Sessions are persisted through a SessionStore (JSONL files by default,
+    or SQLite). Only the newest `load_window` messages are read when a
+    session is resumed; older ones load on demand via load_older. Loaded
+    sessions are kept in an LRU cache bounded by entry count and an
+    approximate byte budget; evicted sessions are flushed and reloaded from
+    the store on next use.
     """
     
-    def __init__(self, workspace: Path):
+    def __init__(
+        self,
+        workspace: Path,
+        rewrite_every: int = 100,
+        max_cached: int = 256,
+        max_cache_bytes: int = 64 * 1024 * 1024,
+        backend: str = "jsonl",
+        store: SessionStore | None = None,
+        load_window: int = 1000,
+        writer: CoalescingWriter | None = None,
+    ):
         self.workspace = workspace
         self.sessions_dir = ensure_dir(Path.home() / ".nanobot" / "sessions")
-        self._cache: dict[str, Session] = {}
-    
-    def _get_session_path(self, key: str) -> Path:
-        """Get the file path for a session."""
-        safe_key = safe_filename(key.replace(":", "_"))
-        return self.sessions_dir / f"{safe_key}.jsonl"
+        self.store = store or create_session_store(backend, self.sessions_dir, rewrite_every)
+        self.max_cached = max(1, max_cached)
+        self.max_cache_bytes = max_cache_bytes
+        self.load_window = load_window
+        # Saves go through the writer (off the event loop, coalesced per session) when one is set
+        self.writer = writer
+        self._cache: OrderedDict[str, Session] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._cache_bytes = 0
+        # Evicted sessions still referenced elsewhere (e.g. by a running turn),
+        # so a reload never produces a second copy of a live session
+        self._evicted: weakref.WeakValueDictionary[str, Session] = weakref.WeakValueDictionary()
+        self._loading: dict[str, asyncio.Future[Session | None]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
     
     def get_or_create(self, key: str) -> Session:
         """
@@ -87,72 +66,125 @@ class SessionManager:
         """
         # Check cache
         if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
             return self._cache[key]
         
-        # Try to load from disk
-        session = self._load(key)
+        self.misses += 1
+
+        # Try to load from the store
+        session = self._evicted.pop(key, None) or self.store.load(key, tail=self.load_window or None)
         if session is None:
             session = Session(key=key)
         
-        self._cache[key] = session
+        self._remember(session)
         return session
     
-    def _load(self, key: str) -> Session | None:
-        """Load a session from disk."""
-        path = self._get_session_path(key)
-        
-        if not path.exists():
-            return None
-        
+    async def get_or_create_async(self, key: str) -> Session:
+        """
+        Like get_or_create, but reads from the store in a worker thread.
+
+        Concurrent calls for the same key share one read.
+
+        Args:
+            key: Session key (usually channel:chat_id).
+
+        Returns:
+            The session.
+        """
+        if key in self._cache or key in self._evicted:
+            return self.get_or_create(key)
+
+        future = self._loading.get(key)
+        if future is None:
+            future = asyncio.ensure_future(asyncio.to_thread(self.store.load, key, self.load_window or None))
+            self._loading[key] = future
         try:
-            messages = []
-            metadata = {}
-            created_at = None
-            
-            with open(path) as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    data = json.loads(line)
-                    
-                    if data.get("_type") == "metadata":
-                        metadata = data.get("metadata", {})
-                        created_at = datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None
-                    else:
-                        messages.append(data)
-            
-            return Session(
-                key=key,
-                messages=messages,
-                created_at=created_at or datetime.now(),
-                metadata=metadata
-            )
-        except Exception as e:
-            logger.warning(f"Failed to load session {key}: {e}")
-            return None
-    
+            session = await asyncio.shield(future)
+        finally:
+            self._loading.pop(key, None)
+
+        # Another caller may have inserted it while we were waiting
+        if key in self._cache:
+            return self.get_or_create(key)
+
+        self.misses += 1
+        session = session or Session(key=key)
+        self._remember(session)
+        return session
+
+    def _remember(self, session: Session) -> None:
+        """Insert or refresh a session in the LRU cache, evicting as needed."""
+        key = session.key
+        self._cache_bytes -= self._sizes.get(key, 0)
+        self._sizes[key] = self._estimate_bytes(session)
+        self._cache_bytes += self._sizes[key]
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > 1 and (
+            len(self._cache) > self.max_cached or self._cache_bytes > self.max_cache_bytes
+        ):
+            old_key, old = self._cache.popitem(last=False)
+            self._cache_bytes -= self._sizes.pop(old_key, 0)
+            self.evictions += 1
+            self._flush(old)
+            self._evicted[old_key] = old
+
+    def _flush(self, session: Session) -> None:
+        """Persist a session if it has messages that were never saved."""
+        if self.store.has_unsaved(session):
+            self._write(session)
+
+    def _write(self, session: Session) -> None:
+        """Write a session now, or hand it to the background writer."""
+        if self.writer:
+            # The queued write keeps the session alive, so an evicted session
+            # is revived from _evicted rather than re-read before it lands
+            self.writer.submit(f"session:{session.key}", lambda: self.store.save(session))
+        else:
+            self.store.save(session)
+
+    @staticmethod
+    def _estimate_bytes(session: Session) -> int:
+        """Approximate memory held by a session (message text plus per-message overhead)."""
+        size = 512 + len(str(session.metadata.get("summary", "")))
+        for m in session.messages:
+            content = m.get("content")
+            size += 200 + (len(content) if isinstance(content, str) else 0)
+        return size
+
+    def cache_stats(self) -> dict[str, int]:
+        """Get session cache metrics."""
+        return {
+            "entries": len(self._cache),
+            "bytes": self._cache_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def load_older(self, session: Session, count: int) -> int:
+        """
+        Load older messages of a session that were left on disk.
+
+        Args:
+            session: Session loaded with a tail window.
+            count: Maximum number of older messages to load.
+
+        Returns:
+            Number of messages loaded.
+        """
+        loaded = self.store.load_older(session, count)
+        if loaded and session.key in self._cache:
+            self._remember(session)
+        return loaded
+
     def save(self, session: Session) -> None:
-        """Save a session to disk."""
-        path = self._get_session_path(session.key)
-        
-        with open(path, "w") as f:
-            # Write metadata first
-            metadata_line = {
-                "_type": "metadata",
-                "created_at": session.created_at.isoformat(),
-                "updated_at": session.updated_at.isoformat(),
-                "metadata": session.metadata
-            }
-            f.write(json.dumps(metadata_line) + "\n")
-            
-            # Write messages
-            for msg in session.messages:
-                f.write(json.dumps(msg) + "\n")
-        
-        self._cache[session.key] = session
-    
+        """Save a session to the store (in the background if a writer is set)."""
+        self._write(session)
+        self._remember(session)
+
     def delete(self, key: str) -> bool:
         """
         Delete a session.
@@ -164,14 +196,11 @@ class SessionManager:
             True if deleted, False if not found.
         """
         # Remove from cache
-        self._cache.pop(key, None)
+        if self._cache.pop(key, None) is not None:
+            self._cache_bytes -= self._sizes.pop(key, 0)
+        self._evicted.pop(key, None)
         
-        # Remove file
-        path = self._get_session_path(key)
-        if path.exists():
-            path.unlink()
-            return True
-        return False
+        return self.store.delete(key)
     
     def list_sessions(self) -> list[dict[str, Any]]:
         """
@@ -180,23 +209,16 @@ class SessionManager:
         Returns:
             List of session info dicts.
         """
-        sessions = []
-        
-        for path in self.sessions_dir.glob("*.jsonl"):
-            try:
-                # Read just the metadata line
-                with open(path) as f:
-                    first_line = f.readline().strip()
-                    if first_line:
-                        data = json.loads(first_line)
-                        if data.get("_type") == "metadata":
-                            sessions.append({
-                                "key": path.stem.replace("_", ":"),
-                                "created_at": data.get("created_at"),
-                                "updated_at": data.get("updated_at"),
-                                "path": str(path)
-                            })
-            except Exception:
-                continue
-        
-        return sorted(sessions, key=lambda x: x.get("updated_at", ""), reverse=True)
+        return self.store.list_sessions()
+
+    async def flush(self) -> None:
+        """Wait for queued background saves to reach the store."""
+        if self.writer:
+            await self.writer.flush()
+
+    def close(self) -> None:
+        """Write cached sessions with unsaved messages and close the store."""
+        for session in self._cache.values():
+            if self.store.has_unsaved(session):
+                self.store.save(session)
+        self.store.close()
@@ -0,0 +1,603 @@
+"""Session persistence backends."""
+
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+from loguru import logger
+
+from nanobot.session.types import Session
+from nanobot.utils.helpers import safe_filename
+
+
+def _snapshot(session: Session) -> tuple[Session, int]:
+    """
+    Capture a consistent copy of a session for writing.
+
+    Saves may run in a worker thread while the event loop keeps appending
+    messages, so stores write from a copy. The id of the live message list
+    is returned too: stores use it to notice when the history was replaced.
+    """
+    messages = session.messages
+    copy = Session(
+        key=session.key,
+        messages=messages[:],
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+        metadata=dict(session.metadata),
+        offset=session.offset,
+    )
+    return copy, id(messages)
+
+
+class SessionStore(ABC):
+    """
+    Abstract base class for session persistence.
+
+    Stores write incrementally: they remember how much of each session they
+    have persisted and only write what was added since.
+    """
+
+    @abstractmethod
+    def load(self, key: str, tail: int | None = None) -> Session | None:
+        """
+        Load a session.
+
+        Args:
+            key: Session key.
+            tail: If set, load only the newest `tail` messages (see Session.offset).
+
+        Returns:
+            The session, or None if it does not exist.
+        """
+        pass
+
+    @abstractmethod
+    def load_older(self, session: Session, count: int) -> int:
+        """
+        Prepend up to `count` not-yet-loaded older messages to a session.
+
+        Returns:
+            Number of messages loaded.
+        """
+        pass
+
+    @abstractmethod
+    def save(self, session: Session) -> None:
+        """Persist a session's unsaved messages and its metadata."""
+        pass
+
+    @abstractmethod
+    def has_unsaved(self, session: Session) -> bool:
+        """Check if a session has messages that were never persisted."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """
+        Delete a session.
+
+        Args:
+            key: Session key.
+
+        Returns:
+            True if deleted, False if not found.
+        """
+        pass
+
+    @abstractmethod
+    def list_sessions(self) -> list[dict[str, Any]]:
+        """
+        List all sessions, most recently updated first.
+
+        Returns:
+            List of session info dicts with 'key', 'created_at', 'updated_at'.
+        """
+        pass
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+        pass
+
+
+class JsonlSessionStore(SessionStore):
+    """
+    One JSONL file per session.
+
+    Saves append only the new messages plus a metadata trailer record (the
+    last metadata record in a file wins); the file is rewritten atomically
+    on first save and every `rewrite_every` appends to drop stale trailers.
+    """
+
+    def __init__(self, sessions_dir: Path, rewrite_every: int = 100):
+        self.sessions_dir = sessions_dir
+        self.rewrite_every = rewrite_every
+        # key -> (id of the persisted message list, messages on disk, appends since the last rewrite)
+        self._persisted: dict[str, tuple[int, int, int]] = {}
+
+    def _get_session_path(self, key: str) -> Path:
+        """Get the file path for a session."""
+        safe_key = safe_filename(key.replace(":", "_"))
+        return self.sessions_dir / f"{safe_key}.jsonl"
+
+    def load(self, key: str, tail: int | None = None) -> Session | None:
+        """Load a session from its JSONL file (only the last `tail` messages if set)."""
+        path = self._get_session_path(key)
+
+        if not path.exists():
+            return None
+
+        if tail is not None:
+            try:
+                session = self._load_tail(key, path, tail)
+                if session is not None:
+                    return session
+            except Exception as e:
+                logger.warning(f"Tail load of session {key} failed, reading whole file: {e}")
+
+        try:
+            messages = []
+            metadata = {}
+            created_at = None
+            updated_at = None
+            trailers = 0
+            torn = False
+
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write from a crash mid-append; the rest of the file is intact
+                        logger.warning(f"Skipping malformed line in session {key}")
+                        torn = True
+                        continue
+
+                    if data.get("_type") == "metadata":
+                        # Later trailer records supersede earlier ones
+                        trailers += 1
+                        metadata = data.get("metadata", {})
+                        created_at = datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None
+                        updated_at = datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else None
+                    else:
+                        messages.append(data)
+
+            session = Session(
+                key=key,
+                messages=messages,
+                created_at=created_at or datetime.now(),
+                updated_at=updated_at or datetime.now(),
+                metadata=metadata
+            )
+            # A torn line must be rewritten away before anything is appended after it
+            appends = self.rewrite_every if torn else max(0, trailers - 1)
+            self._persisted[key] = (id(session.messages), len(messages), appends)
+            return session
+        except Exception as e:
+            logger.warning(f"Failed to load session {key}: {e}")
+            return None
+
+    def _load_tail(self, key: str, path: Path, tail: int) -> Session | None:
+        """
+        Load the newest messages by reading the file backwards from EOF.
+
+        Every save ends the file with a metadata record carrying the total
+        message count, which gives the session offset. Returns None (the
+        caller falls back to a full read) for files that don't end that way:
+        written before counts were recorded, or cut short by a crash.
+        """
+        lines = self._iter_lines_reversed(path)
+        try:
+            meta = json.loads(next(lines))
+        except (StopIteration, json.JSONDecodeError):
+            return None
+        if meta.get("_type") != "metadata" or "message_count" not in meta:
+            return None
+
+        messages: list[dict[str, Any]] = []
+        for line in lines:
+            if len(messages) >= tail:
+                break
+            if not self._is_metadata_line(line):
+                messages.append(json.loads(line))
+        messages.reverse()
+
+        session = Session(
+            key=key,
+            messages=messages,
+            created_at=datetime.fromisoformat(meta["created_at"]) if meta.get("created_at") else datetime.now(),
+            updated_at=datetime.fromisoformat(meta["updated_at"]) if meta.get("updated_at") else datetime.now(),
+            metadata=meta.get("metadata", {}),
+            offset=max(0, meta["message_count"] - len(messages)),
+        )
+        # Trailer count is unknown without a full scan; rewrite after the usual number of appends
+        self._persisted[key] = (id(session.messages), len(messages), 0)
+        return session
+
+    @staticmethod
+    def _is_metadata_line(line: str) -> bool:
+        """Check if a raw JSONL line is a metadata record (without parsing it)."""
+        return line.lstrip().startswith('{"_type": "metadata"')
+
+    @classmethod
+    def _iter_messages(cls, f: IO[str]) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Yield (line, message) for the message records of a session file, skipping torn lines like load()."""
+        for line in f:
+            line = line.strip()
+            if not line or cls._is_metadata_line(line):
+                continue
+            try:
+                yield line, json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+    @staticmethod
+    def _iter_lines_reversed(path: Path, block_size: int = 65536):
+        """Yield the non-empty lines of a file from last to first."""
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            remainder = b""
+            while pos > 0:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                lines = (f.read(step) + remainder).split(b"\n")
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield line.decode("utf-8")
+            if remainder.strip():
+                yield remainder.decode("utf-8")
+
+    def load_older(self, session: Session, count: int) -> int:
+        """Prepend older messages by scanning the file up to the session offset."""
+        if session.offset <= 0 or count <= 0:
+            return 0
+        start = max(0, session.offset - count)
+        older: list[dict[str, Any]] = []
+        index = 0
+        with open(self._get_session_path(session.key)) as f:
+            for _, message in self._iter_messages(f):
+                if index >= start:
+                    older.append(message)
+                index += 1
+                if index >= session.offset:
+                    break
+
+        session.messages[:0] = older
+        session.offset -= len(older)
+        list_id, on_disk, appends = self._persisted.get(session.key, (id(session.messages), 0, 0))
+        self._persisted[session.key] = (list_id, on_disk + len(older), appends)
+        return len(older)
+
+    def has_unsaved(self, session: Session) -> bool:
+        """Check if a session has messages that were never written."""
+        list_id, on_disk, _ = self._persisted.get(session.key, (None, 0, 0))
+        return bool(session.messages) and (list_id != id(session.messages) or on_disk != len(session.messages))
+
+    def save(self, session: Session) -> None:
+        """Write a session's unsaved messages and metadata to its file."""
+        session, current_id = _snapshot(session)
+        path = self._get_session_path(session.key)
+        list_id, on_disk, appends = self._persisted.get(session.key, (None, 0, 0))
+
+        # Rewrite if the file is new, the history was replaced (e.g. cleared), or trailers piled up
+        if (
+            list_id != current_id
+            or on_disk > len(session.messages)
+            or appends >= self.rewrite_every
+            or not path.exists()
+        ):
+            self._rewrite(path, session)
+            self._persisted[session.key] = (current_id, len(session.messages), 0)
+        else:
+            lines = [json.dumps(msg) for msg in session.messages[on_disk:]]
+            lines.append(json.dumps(self._metadata_record(session)))
+            with open(path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._persisted[session.key] = (list_id, len(session.messages), appends + 1)
+
+    def _rewrite(self, path: Path, session: Session) -> None:
+        """Atomically replace a session file with its compacted form."""
+        tmp_path = path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w") as f:
+            # Write metadata first
+            f.write(json.dumps(self._metadata_record(session)) + "\n")
+
+            # Carry over older messages that were never loaded
+            if session.offset and path.exists():
+                copied = 0
+                with open(path) as old:
+                    for line, _ in self._iter_messages(old):
+                        if copied >= session.offset:
+                            break
+                        f.write(line + "\n")
+                        copied += 1
+
+            # Write messages, then repeat the metadata as a trailer so the file
+            # always ends with a metadata record (see _load_tail)
+            for msg in session.messages:
+                f.write(json.dumps(msg) + "\n")
+            f.write(json.dumps(self._metadata_record(session)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _metadata_record(session: Session) -> dict[str, Any]:
+        """Build the metadata line for a session file."""
+        return {
+            "_type": "metadata",
+            "key": session.key,
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat(),
+            "message_count": session.total_messages,
+            "metadata": session.metadata
+        }
+
+    def delete(self, key: str) -> bool:
+        """Delete a session file."""
+        self._persisted.pop(key, None)
+        path = self._get_session_path(key)
+        if path.exists():
+            path.unlink()
+            return True
+        return False
+
+    def list_sessions(self) -> list[dict[str, Any]]:
+        """List sessions by reading the first and last line of every file."""
+        sessions = []
+
+        for path in self.sessions_dir.glob("*.jsonl"):
+            try:
+                # Read just the metadata line
+                with open(path) as f:
+                    first_line = f.readline().strip()
+                    if first_line:
+                        data = json.loads(first_line)
+                        if data.get("_type") == "metadata":
+                            # Appended saves end with a fresher metadata trailer
+                            last = self._read_last_line(path)
+                            try:
+                                trailer = json.loads(last) if last else {}
+                            except json.JSONDecodeError:
+                                trailer = {}
+                            if trailer.get("_type") == "metadata":
+                                data = trailer
+                            sessions.append({
+                                "key": data.get("key") or path.stem.replace("_", ":"),
+                                "created_at": data.get("created_at"),
+                                "updated_at": data.get("updated_at"),
+                                "path": str(path)
+                            })
+            except Exception:
+                continue
+
+        return sorted(sessions, key=lambda x: x.get("updated_at", ""), reverse=True)
+
+    @staticmethod
+    def _read_last_line(path: Path, block_size: int = 4096) -> str:
+        """Read the last non-empty line of a file without scanning all of it."""
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+                if data.rstrip(b"\n").count(b"\n") >= 1:
+                    break
+        lines = data.rstrip(b"\n").split(b"\n")
+        return lines[-1].decode("utf-8", errors="replace").strip() if lines else ""
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    All sessions in one SQLite database (WAL mode).
+
+    Messages live in a table keyed by (session_key, seq), so reading the
+    last N messages of a session is an index range scan, and listing uses
+    an index on sessions.updated_at.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        key TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        metadata TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+    CREATE TABLE IF NOT EXISTS messages (
+        session_key TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (session_key, seq)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        # Saves may run in a writer thread (see CoalescingWriter); one lock serializes connection use
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        # key -> (id of the persisted message list, messages stored)
+        self._persisted: dict[str, tuple[int, int]] = {}
+
+    def load(self, key: str, tail: int | None = None) -> Session | None:
+        """Load a session and all of its messages (or only the last `tail`)."""
+        with self._lock:
+            return self._load(key, tail)
+
+    def _load(self, key: str, tail: int | None) -> Session | None:
+        """Load a session (caller holds the lock)."""
+        row = self._conn.execute(
+            "SELECT created_at, updated_at, metadata FROM sessions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        if tail is None:
+            messages = [
+                json.loads(data) for (data,) in self._conn.execute(
+                    "SELECT data FROM messages WHERE session_key = ? ORDER BY seq", (key,)
+                )
+            ]
+            offset = 0
+        else:
+            rows = self._conn.execute(
+                "SELECT seq, data FROM messages WHERE session_key = ? ORDER BY seq DESC LIMIT ?", (key, tail)
+            ).fetchall()
+            messages = [json.loads(data) for _, data in reversed(rows)]
+            offset = rows[-1][0] if rows else 0
+        session = Session(
+            key=key,
+            messages=messages,
+            created_at=datetime.fromisoformat(row[0]),
+            updated_at=datetime.fromisoformat(row[1]),
+            metadata=json.loads(row[2]),
+            offset=offset,
+        )
+        self._persisted[key] = (id(session.messages), len(messages))
+        return session
+
+    def load_older(self, session: Session, count: int) -> int:
+        """Prepend older messages with an index range read."""
+        if session.offset <= 0 or count <= 0:
+            return 0
+        start = max(0, session.offset - count)
+        with self._lock:
+            older = [
+                json.loads(data) for (data,) in self._conn.execute(
+                    "SELECT data FROM messages WHERE session_key = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                    (session.key, start, session.offset),
+                )
+            ]
+        session.messages[:0] = older
+        session.offset -= len(older)
+        list_id, stored = self._persisted.get(session.key, (id(session.messages), 0))
+        self._persisted[session.key] = (list_id, stored + len(older))
+        return len(older)
+
+    def recent_messages(self, key: str, limit: int) -> list[dict[str, Any]]:
+        """Read only the last `limit` messages of a session, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM messages WHERE session_key = ? ORDER BY seq DESC LIMIT ?", (key, limit)
+            ).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def has_unsaved(self, session: Session) -> bool:
+        """Check if a session has messages that were never written."""
+        list_id, stored = self._persisted.get(session.key, (None, 0))
+        return bool(session.messages) and (list_id != id(session.messages) or stored != len(session.messages))
+
+    def save(self, session: Session) -> None:
+        """Insert new messages and upsert the session row in one transaction."""
+        session, current_id = _snapshot(session)
+        list_id, stored = self._persisted.get(session.key, (None, 0))
+        replaced = list_id != current_id or stored > len(session.messages)
+        start = 0 if replaced else stored
+
+        # seq is the position in the full history, so loaded windows map back via session.offset
+        with self._lock, self._conn:
+            if replaced:
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_key = ? AND seq >= ?", (session.key, session.offset)
+                )
+            self._conn.executemany(
+                "INSERT INTO messages (session_key, seq, data) VALUES (?, ?, ?)",
+                [
+                    (session.key, session.offset + i, json.dumps(msg))
+                    for i, msg in enumerate(session.messages[start:], start)
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO sessions (key, created_at, updated_at, metadata) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET updated_at = excluded.updated_at, metadata = excluded.metadata",
+                (
+                    session.key,
+                    session.created_at.isoformat(),
+                    session.updated_at.isoformat(),
+                    json.dumps(session.metadata),
+                ),
+            )
+        self._persisted[session.key] = (current_id, len(session.messages))
+
+    def delete(self, key: str) -> bool:
+        """Delete a session and its messages."""
+        self._persisted.pop(key, None)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_key = ?", (key,))
+            deleted = self._conn.execute("DELETE FROM sessions WHERE key = ?", (key,)).rowcount
+        return deleted > 0
+
+    def list_sessions(self) -> list[dict[str, Any]]:
+        """List sessions via the updated_at index."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, created_at, updated_at FROM sessions ORDER BY updated_at DESC"
+            ).fetchall()
+        return [
+            {"key": key, "created_at": created_at, "updated_at": updated_at, "path": str(self.db_path)}
+            for key, created_at, updated_at in rows
+        ]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(backend: str, sessions_dir: Path, rewrite_every: int = 100) -> SessionStore:
+    """
+    Create a session store by backend name.
+
+    Args:
+        backend: "jsonl" or "sqlite".
+        sessions_dir: Directory holding session files / the database.
+        rewrite_every: JSONL only; appends between full file rewrites.
+
+    Returns:
+        The session store.
+    """
+    if backend == "sqlite":
+        return SqliteSessionStore(sessions_dir / "sessions.db")
+    if backend == "jsonl":
+        return JsonlSessionStore(sessions_dir, rewrite_every=rewrite_every)
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+def migrate_sessions(source: SessionStore, target: SessionStore) -> int:
+    """
+    Copy every session from one store to another.
+
+    Returns:
+        Number of sessions migrated.
+    """
+    count = 0
+    for info in source.list_sessions():
+        session = source.load(info["key"])
+        if session is None:
+            logger.warning(f"Skipping unreadable session {info['key']}")
+            continue
+        target.save(session)
+        count += 1
+    return count
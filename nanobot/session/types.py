@@ -0,0 +1,91 @@
+"""Session types."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from nanobot.agent.tokens import TokenCounter
+
+
+@dataclass
+class Session:
+    """
+    A conversation session.
+
+    Messages are append-only; persistence is handled by a SessionStore.
+    Stores may load only the newest messages: `messages` then holds the
+    tail of the history and `offset` counts the older ones left on disk.
+    """
+
+    key: str  # channel:chat_id
+    messages: list[dict[str, Any]] = field(default_factory=list)
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+    metadata: dict[str, Any] = field(default_factory=dict)
+    offset: int = 0  # Messages before messages[0] that were not loaded
+
+    @property
+    def total_messages(self) -> int:
+        """Number of messages in the full history (loaded or not)."""
+        return self.offset + len(self.messages)
+
+    def add_message(self, role: str, content: str, **kwargs: Any) -> None:
+        """Add a message to the session."""
+        msg = {
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now().isoformat(),
+            **kwargs
+        }
+        self.messages.append(msg)
+        self.updated_at = datetime.now()
+
+    def get_history(
+        self,
+        max_messages: int = 50,
+        max_tokens: int | None = None,
+        counter: "TokenCounter | None" = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Get message history for LLM context.
+
+        Args:
+            max_messages: Maximum messages to return.
+            max_tokens: Optional token budget; the newest messages that fit are kept.
+            counter: Token counter to use with max_tokens (defaults to an estimate).
+
+        Returns:
+            List of messages in LLM format.
+        """
+        # Get recent messages (those folded into the summary are left out)
+        unsummarized = self.messages[max(0, self.metadata.get("summarized_upto", 0) - self.offset):]
+        recent = unsummarized[-max_messages:] if len(unsummarized) > max_messages else unsummarized
+
+        # Convert to LLM format (just role and content)
+        history = [{"role": m["role"], "content": m["content"]} for m in recent]
+        if max_tokens is None:
+            return history
+
+        if counter is None:
+            from nanobot.agent.tokens import TokenCounter
+            counter = TokenCounter()
+
+        # Pack newest-first until the budget is used up
+        used = 0
+        start = len(history)
+        while start > 0:
+            cost = counter.count_message(history[start - 1])
+            if used + cost > max_tokens:
+                break
+            used += cost
+            start -= 1
+        return history[start:]
+
+    def clear(self) -> None:
+        """Clear all messages in the session."""
+        self.messages = []
+        self.offset = 0
+        self.metadata.pop("summary", None)
+        self.metadata.pop("summarized_upto", None)
+        self.updated_at = datetime.now()
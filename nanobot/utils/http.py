@@ -0,0 +1,194 @@
+"""Shared HTTP client pool."""
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+
+@dataclass
+class _HostStats:
+    requests: int = 0
+    connections: int = 0  # New connections opened (TCP + TLS handshakes paid)
+
+
+class HttpClientPool:
+    """
+    Long-lived httpx clients, one per host, reused across calls.
+
+    Tools and audio clients used to open a fresh AsyncClient per request,
+    paying a TCP and TLS handshake every time. The pool keeps one client per
+    origin (scheme://host:port) so connections stay alive between calls and,
+    with `http2`, concurrent requests to a host share one connection.
+
+    At most `max_hosts` clients are kept; the least recently used one is
+    evicted and closed once requests already running on it have had
+    `timeout_s` to finish. Clients never store cookies, so nothing set by
+    one site visit leaks into another session's requests.
+
+    Timeouts and redirect handling are passed per request; the pool only
+    owns connections. Whoever creates the pool closes it (the gateway does
+    on shutdown).
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry_s: float = 30.0,
+        http2: bool = False,
+        timeout_s: float = 30.0,
+        max_redirects: int = 5,
+        max_hosts: int = 32,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or None,
+            max_keepalive_connections=max_keepalive_connections or None,
+            keepalive_expiry=keepalive_expiry_s,
+        )
+        self.http2 = http2 and self._h2_available()
+        self.timeout_s = timeout_s
+        self.max_redirects = max_redirects
+        self.max_hosts = max(1, max_hosts)
+        # Least recently used first
+        self._clients: OrderedDict[str, tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = OrderedDict()
+        self._stats: dict[str, _HostStats] = {}
+        self._evicted = _HostStats()  # Totals of hosts whose clients were evicted
+        self._retiring: set[asyncio.Task[None]] = set()
+
+    @staticmethod
+    def _h2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            return False
+        return True
+
+    @staticmethod
+    def origin(url: str) -> str:
+        """The pool key for a URL: scheme://host[:port]."""
+        p = urlparse(url)
+        return f"{p.scheme}://{p.netloc}".lower()
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        """
+        Get the shared client for a URL's host, creating it on first use.
+
+        Args:
+            url: Any URL on the host (only scheme, host and port are used).
+
+        Returns:
+            A client that must not be closed by the caller.
+        """
+        key = self.origin(url)
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(key)
+        if entry is not None and entry[1] is loop and not entry[0].is_closed:
+            self._clients.move_to_end(key)
+            return entry[0]
+        # Connections are bound to the event loop that opened them
+        stats = self._stats.setdefault(key, _HostStats())
+        client = httpx.AsyncClient(
+            limits=self.limits,
+            http2=self.http2,
+            timeout=self.timeout_s,
+            max_redirects=self.max_redirects,
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            event_hooks={"request": [self._tracer(stats)]},
+        )
+        self._clients[key] = (client, loop)
+        self._clients.move_to_end(key)
+        while len(self._clients) > self.max_hosts:
+            self._evict(next(iter(self._clients)), loop)
+        return client
+
+    def _evict(self, key: str, loop: asyncio.AbstractEventLoop) -> None:
+        client, owner = self._clients.pop(key)
+        stats = self._stats.pop(key, None)
+        if stats is not None:
+            self._evicted.requests += stats.requests
+            self._evicted.connections += stats.connections
+        if owner is loop:
+            task = loop.create_task(self._retire(client))
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+
+    async def _retire(self, client: httpx.AsyncClient) -> None:
+        """Close an evicted client once requests that already hold it are done."""
+        try:
+            await asyncio.sleep(self.timeout_s)
+        finally:
+            await client.aclose()
+
+    @staticmethod
+    def _tracer(stats: _HostStats) -> Any:
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            if event == "connection.connect_tcp.complete":
+                stats.connections += 1
+
+        async def on_request(request: httpx.Request) -> None:
+            stats.requests += 1
+            request.extensions["trace"] = trace
+
+        return on_request
+
+    def stats(self) -> dict[str, Any]:
+        """Requests, new connections and reuse ratio, overall and per pooled host."""
+        hosts = {
+            key: {
+                "requests": s.requests,
+                "connections": s.connections,
+                "reused": max(0, s.requests - s.connections),
+            }
+            for key, s in self._stats.items()
+        }
+        requests = self._evicted.requests + sum(h["requests"] for h in hosts.values())
+        connections = self._evicted.connections + sum(h["connections"] for h in hosts.values())
+        return {
+            "requests": requests,
+            "connections": connections,
+            "reuse_ratio": round(1 - connections / requests, 3) if requests else 0.0,
+            "http2": self.http2,
+            "hosts": hosts,
+        }
+
+    async def aclose(self) -> None:
+        """Close every client and its connections."""
+        stats = self.stats()
+        if stats["requests"]:
+            logger.info(
+                f"HTTP pool: {stats['requests']} requests over {stats['connections']} connections "
+                f"(reuse {stats['reuse_ratio']:.0%})"
+            )
+        clients, self._clients = self._clients, OrderedDict()
+        loop = asyncio.get_running_loop()
+        for client, owner in clients.values():
+            if owner is loop:
+                await client.aclose()
+        retiring = [t for t in self._retiring if t.get_loop() is loop]
+        for task in retiring:
+            task.cancel()  # Closes the evicted client right away
+        await asyncio.gather(*retiring, return_exceptions=True)
+
+
+_pool: HttpClientPool | None = None
+
+
+def get_http_pool() -> HttpClientPool:
+    """The process-wide pool (a default one is created on first use)."""
+    global _pool
+    if _pool is None:
+        _pool = HttpClientPool()
+    return _pool
+
+
+def set_http_pool(pool: HttpClientPool | None) -> None:
+    """Install the process-wide pool (e.g. one configured by the gateway)."""
+    global _pool
+    _pool = pool
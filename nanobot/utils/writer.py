@@ -0,0 +1,76 @@
+"""Coalescing background writer for blocking disk I/O."""
+
+import asyncio
+from typing import Callable
+
+from loguru import logger
+
+
+class CoalescingWriter:
+    """
+    Runs blocking writes off the event loop, one at a time, in submit order.
+
+    Writes are keyed: submitting a write for a key that is still pending
+    replaces it, so several saves of the same object within `delay_s` collapse
+    into one. Write callables should read the object's current state when
+    they run rather than capturing a snapshot.
+
+    Outside a running event loop (e.g. one-shot CLI commands) writes run
+    synchronously.
+    """
+
+    def __init__(self, delay_s: float = 0.05):
+        self.delay_s = delay_s
+        self._pending: dict[str, Callable[[], None]] = {}
+        self._task: asyncio.Task[None] | None = None
+        self.submitted = 0
+        self.written = 0
+
+    def submit(self, key: str, write: Callable[[], None]) -> None:
+        """
+        Queue a write, replacing any pending write for the same key.
+
+        Args:
+            key: Identity of the thing being written (e.g. "session:telegram:42").
+            write: Blocking callable performing the write.
+        """
+        self.submitted += 1
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._run(key, write)
+            return
+
+        self._pending.pop(key, None)
+        self._pending[key] = write
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    def pending(self, key: str) -> bool:
+        """Check if a write for the key is waiting to run."""
+        return key in self._pending
+
+    async def _drain(self) -> None:
+        """Run pending writes in a worker thread until the queue is empty."""
+        await asyncio.sleep(self.delay_s)
+        while self._pending:
+            key = next(iter(self._pending))
+            write = self._pending.pop(key)
+            await asyncio.to_thread(self._run, key, write)
+
+    def _run(self, key: str, write: Callable[[], None]) -> None:
+        """Run one write, logging failures instead of raising."""
+        try:
+            write()
+            self.written += 1
+        except Exception as e:
+            logger.error(f"Background write of {key} failed: {e}")
+
+    async def flush(self) -> None:
+        """Wait until every queued write has completed."""
+        while self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+        if self._pending:
+            # Writes queued after the drain task finished (or loop shutting down)
+            for key in list(self._pending):
+                await asyncio.to_thread(self._run, key, self._pending.pop(key))
@@ -5,9 +5,10 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any
 
-import httpx
 from loguru import logger
 
+from nanobot.utils.http import get_http_pool
+
 
 class OpenAIAudioClient:
     """Minimal OpenAI audio client (transcribe + TTS)."""
@@ -53,19 +54,18 @@ class OpenAIAudioClient:
             data["language"] = language
 
         try:
-            async with httpx.AsyncClient() as client:
-                with open(path, "rb") as f:
-                    files = {"file": (path.name, f)}
-                    response = await client.post(
-                        f"{self.api_base}/audio/transcriptions",
-                        headers=self._headers(),
-                        data=data,
-                        files=files,
-                        timeout=60.0,
-                    )
-                    response.raise_for_status()
-                    payload = response.json()
-                    return str(payload.get("text", "")).strip()
+            with open(path, "rb") as f:
+                files = {"file": (path.name, f)}
+                response = await get_http_pool().client(self.api_base).post(
+                    f"{self.api_base}/audio/transcriptions",
+                    headers=self._headers(),
+                    data=data,
+                    files=files,
+                    timeout=60.0,
+                )
+                response.raise_for_status()
+                payload = response.json()
+                return str(payload.get("text", "")).strip()
         except Exception as e:
             logger.error(f"OpenAI transcription error: {e}")
             return ""
@@ -81,17 +81,16 @@ class OpenAIAudioClient:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_base}/audio/speech",
-                    headers=self._headers(),
-                    json=payload,
-                    timeout=60.0,
-                )
-                response.raise_for_status()
-                path.parent.mkdir(parents=True, exist_ok=True)
-                path.write_bytes(response.content)
-                return path
+            response = await get_http_pool().client(self.api_base).post(
+                f"{self.api_base}/audio/speech",
+                headers=self._headers(),
+                json=payload,
+                timeout=60.0,
+            )
+            response.raise_for_status()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(response.content)
+            return path
         except Exception as e:
             logger.error(f"OpenAI TTS error: {e}")
             return None
@@ -0,0 +1,168 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.providers.base import LLMProvider, LLMResponse, StreamChunk
+
+
+class SlowProvider(LLMProvider):
+    """Replies with the last user message after a delay, tracking overlap."""
+
+    def __init__(self, delay: float = 0.05):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.seen: list[str] = []
+
+    async def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> LLMResponse:
+        content = messages[-1]["content"]
+        self.seen.append(content)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return LLMResponse(content=f"echo {content}")
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+@pytest.fixture
+def make_loop(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    def factory(provider: LLMProvider, bus: MessageBus | None = None, **kwargs: Any) -> AgentLoop:
+        return AgentLoop(bus=bus or MessageBus(), provider=provider, workspace=tmp_path / "ws", **kwargs)
+
+    return factory
+
+
+async def _run_until(loop: AgentLoop, n: int) -> list[str]:
+    runner = asyncio.create_task(loop.run())
+    replies = []
+    for _ in range(n):
+        msg = await asyncio.wait_for(loop.bus.consume_outbound(), timeout=5)
+        replies.append(f"{msg.chat_id}:{msg.content}")
+    loop.stop()
+    await runner
+    return replies
+
+
+async def test_sessions_run_concurrently(make_loop) -> None:
+    provider = SlowProvider()
+    loop = make_loop(provider, max_concurrency=4)
+    for chat in ("a", "b", "c"):
+        await loop.bus.publish_inbound(InboundMessage("telegram", "u", chat, f"hi {chat}"))
+
+    replies = await _run_until(loop, 3)
+    assert sorted(replies) == ["a:echo hi a", "b:echo hi b", "c:echo hi c"]
+    assert provider.max_active == 3
+
+
+async def test_same_session_stays_ordered(make_loop) -> None:
+    provider = SlowProvider()
+    loop = make_loop(provider, max_concurrency=4)
+    for i in range(3):
+        await loop.bus.publish_inbound(InboundMessage("telegram", "u", "a", f"m{i}"))
+
+    replies = await _run_until(loop, 3)
+    assert replies == ["a:echo m0", "a:echo m1", "a:echo m2"]
+    assert provider.max_active == 1
+
+
+async def test_concurrency_cap(make_loop) -> None:
+    provider = SlowProvider()
+    loop = make_loop(provider, max_concurrency=2)
+    for chat in "abcd":
+        await loop.bus.publish_inbound(InboundMessage("discord", "u", chat, "hi"))
+
+    await _run_until(loop, 4)
+    assert provider.max_active == 2
+
+
+async def test_backlog_stays_on_the_bus(make_loop) -> None:
+    # The loop only takes what it can work on, so the bus limits still apply
+    bus = MessageBus(inbound_maxsize=5, per_sender_limit=2, overflow="reject")
+    loop = make_loop(SlowProvider(delay=0.05), bus=bus, max_concurrency=1)
+    runner = asyncio.create_task(loop.run())
+
+    held = 0
+    for i in range(50):
+        await bus.publish_inbound(InboundMessage("telegram", "u", "a", f"m{i}"))
+        held = max(held, len(loop._tasks))
+        await asyncio.sleep(0.005)
+
+    assert held <= loop.max_pending_turns == 2
+    assert bus.inbound_size <= 2
+    assert bus.queue_stats()["rejected"] > 0
+    loop.stop()
+    await runner
+    await loop.drain()
+
+
+async def test_debounced_burst_does_not_block_other_chats(make_loop) -> None:
+    # Messages merged into a held one give their slot back, so chat b is picked up
+    loop = make_loop(SlowProvider(), max_pending_turns=2, debounce_s=0.5)
+    for i in range(4):
+        await loop.bus.publish_inbound(InboundMessage("telegram", "u", "a", f"a{i}"))
+    await loop.bus.publish_inbound(InboundMessage("telegram", "u", "b", "b0"))
+    runner = asyncio.create_task(loop.run())
+
+    await asyncio.sleep(0.1)
+    assert loop.debouncer.pending == 2
+    replies = []
+    for _ in range(2):
+        msg = await asyncio.wait_for(loop.bus.consume_outbound(), timeout=5)
+        replies.append(f"{msg.chat_id}:{msg.content}")
+    loop.stop()
+    await runner
+
+    assert sorted(replies) == ["a:echo a0\na1\na2\na3", "b:echo b0"]
+
+
+class StreamingProvider(SlowProvider):
+    async def stream_chat(self, messages: list[dict[str, Any]], **kwargs: Any):
+        for word in ("Hello", " there"):
+            yield StreamChunk(delta=word)
+        yield StreamChunk(response=LLMResponse(content="Hello there"))
+
+
+async def test_streaming_publishes_partial_updates(make_loop) -> None:
+    loop = make_loop(StreamingProvider(), stream_responses=True)
+    await loop.bus.publish_inbound(InboundMessage("telegram", "u", "a", "hi"))
+    runner = asyncio.create_task(loop.run())
+
+    first = await asyncio.wait_for(loop.bus.consume_outbound(), timeout=5)
+    final = await asyncio.wait_for(loop.bus.consume_outbound(), timeout=5)
+    loop.stop()
+    await runner
+
+    assert first.partial and first.content == "Hello"
+    assert not final.partial and final.content == "Hello there"
+    assert final.stream_id == first.stream_id
+
+
+class FailingStreamProvider(SlowProvider):
+    async def stream_chat(self, messages: list[dict[str, Any]], **kwargs: Any):
+        yield StreamChunk(delta="Hello")
+        raise RuntimeError("boom")
+
+
+async def test_error_after_streaming_replaces_the_partial(make_loop) -> None:
+    loop = make_loop(FailingStreamProvider(), stream_responses=True)
+    await loop.bus.publish_inbound(InboundMessage("telegram", "u", "a", "hi"))
+    runner = asyncio.create_task(loop.run())
+
+    first = await asyncio.wait_for(loop.bus.consume_outbound(), timeout=5)
+    error = await asyncio.wait_for(loop.bus.consume_outbound(), timeout=5)
+    loop.stop()
+    await runner
+
+    assert first.partial
+    assert not error.partial and "boom" in error.content
+    assert error.stream_id == first.stream_id
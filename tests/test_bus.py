@@ -0,0 +1,182 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from nanobot.bus.debounce import MessageDebouncer
+from nanobot.bus.durable import DurableMessageBus
+from nanobot.bus.events import InboundMessage, OutboundMessage, Priority
+from nanobot.bus.priority import PrioritySemaphore
+from nanobot.bus.queue import BusClosedError, MessageBus
+
+
+def _msg(text: str) -> InboundMessage:
+    return InboundMessage(channel="cli", sender_id="u", chat_id="c", content=text)
+
+
+async def test_close_ends_iteration_after_draining() -> None:
+    bus = MessageBus()
+    await bus.publish_inbound(_msg("a"))
+    await bus.publish_inbound(_msg("b"))
+    bus.close()
+    await bus.publish_inbound(_msg("dropped"))
+
+    received = [m.content async for m in bus.inbound()]
+
+    assert received == ["a", "b"]
+    with pytest.raises(BusClosedError):
+        await bus.consume_inbound()
+
+
+async def test_close_wakes_all_waiting_consumers() -> None:
+    bus = MessageBus()
+
+    async def drain() -> list[str]:
+        return [m.content async for m in bus.inbound()]
+
+    consumers = [asyncio.create_task(drain()) for _ in range(3)]
+    await asyncio.sleep(0)
+    await bus.publish_inbound(_msg("x"))
+    bus.close()
+
+    results = await asyncio.wait_for(asyncio.gather(*consumers), timeout=1)
+    assert sorted(sum(results, [])) == ["x"]
+
+
+def _from(sender: str, text: str, channel: str = "telegram") -> InboundMessage:
+    return InboundMessage(channel=channel, sender_id=sender, chat_id=sender, content=text)
+
+
+async def test_block_policy_waits_for_room() -> None:
+    bus = MessageBus(inbound_maxsize=1, overflow="block")
+    await bus.publish_inbound(_from("a", "1"))
+    producer = asyncio.create_task(bus.publish_inbound(_from("b", "2")))
+    await asyncio.sleep(0)
+    assert not producer.done()
+
+    assert (await bus.consume_inbound()).content == "1"
+    await asyncio.wait_for(producer, timeout=1)
+    assert (await bus.consume_inbound()).content == "2"
+    assert bus.queue_stats()["blocked"] == 1
+
+
+async def test_drop_oldest_is_scoped_to_the_sender() -> None:
+    bus = MessageBus(per_sender_limit=2, overflow="drop_oldest")
+    for text in ("a1", "b1", "a2", "a3"):
+        await bus.publish_inbound(_from(text[0], text))
+
+    received = [(await bus.consume_inbound()).content for _ in range(3)]
+    assert received == ["b1", "a2", "a3"]
+    assert bus.queue_stats()["dropped"] == 1
+
+
+async def test_reject_sends_busy_reply() -> None:
+    bus = MessageBus(per_channel_limit=1, overflow="reject", busy_message="busy")
+    await bus.publish_inbound(_from("a", "1"))
+    await bus.publish_inbound(_from("b", "2"))
+    await bus.publish_inbound(_from("c", "3", channel="discord"))
+
+    assert bus.inbound_size == 2
+    reply = await bus.consume_outbound()
+    assert (reply.channel, reply.chat_id, reply.content) == ("telegram", "b", "busy")
+    assert bus.queue_stats()["inbound_by_channel"] == {"telegram": 1, "discord": 1}
+
+
+async def test_coalesce_merges_consecutive_messages_from_sender() -> None:
+    bus = MessageBus(per_sender_limit=1, overflow="coalesce")
+    await bus.publish_inbound(_from("a", "hello"))
+    await bus.publish_inbound(_from("a", "are you there?"))
+
+    assert bus.inbound_size == 1
+    assert (await bus.consume_inbound()).content == "hello\nare you there?"
+    assert bus.queue_stats()["coalesced"] == 1
+
+
+async def test_interactive_messages_jump_ahead_of_background() -> None:
+    bus = MessageBus(aging_s=0)
+    await bus.publish_inbound(InboundMessage("cli", "u", "c", "beat", priority=Priority.HEARTBEAT))
+    await bus.publish_inbound(InboundMessage("system", "subagent", "cli:c", "done", priority=Priority.SYSTEM))
+    await bus.publish_inbound(_msg("hi"))
+
+    assert [m.content for m in [await bus.consume_inbound() for _ in range(3)]] == ["hi", "done", "beat"]
+    assert set(bus.queue_stats()["latency"]) == {"interactive", "system", "heartbeat"}
+
+
+async def test_aging_promotes_waiting_background_messages(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr("nanobot.bus.queue.time", SimpleNamespace(monotonic=lambda: now[0]))
+    bus = MessageBus(aging_s=1.0)
+    await bus.publish_inbound(InboundMessage("cli", "u", "c", "cron", priority=Priority.CRON))
+    now[0] += 3
+    await bus.publish_inbound(_msg("hi"))
+
+    assert (await bus.consume_inbound()).content == "cron"
+
+
+async def test_priority_semaphore_grants_most_urgent_waiter() -> None:
+    sem = PrioritySemaphore(1)
+    order: list[int] = []
+
+    async def turn(priority: int) -> None:
+        async with sem.slot(priority):
+            order.append(priority)
+
+    await sem.acquire()
+    waiters = [asyncio.create_task(turn(p)) for p in (3, 2, 0)]
+    await asyncio.sleep(0)
+    sem.release()
+    await asyncio.gather(*waiters)
+
+    assert order == [0, 2, 3]
+    assert sem.wait_latency[3].count == 1
+
+
+async def test_debouncer_merges_rapid_messages_per_chat() -> None:
+    ready: list[InboundMessage] = []
+    debouncer = MessageDebouncer(lambda msg, merged: ready.append(msg), window_s=0.05, max_wait_s=1.0)
+
+    debouncer.submit("telegram:a", InboundMessage("telegram", "a", "a", "hi", media=["1.jpg"]))
+    debouncer.submit("telegram:b", InboundMessage("telegram", "b", "b", "other chat"))
+    await asyncio.sleep(0.02)
+    debouncer.submit("telegram:a", InboundMessage("telegram", "a", "a", "look at this", media=["2.jpg"]))
+    await asyncio.sleep(0.04)
+    assert [m.content for m in ready] == ["other chat"]
+
+    await asyncio.sleep(0.05)
+    assert ready[1].content == "hi\nlook at this"
+    assert ready[1].media == ["1.jpg", "2.jpg"]
+    assert debouncer.merged == 1 and debouncer.pending == 0
+
+
+async def test_durable_bus_replays_unacknowledged_messages(tmp_path) -> None:
+    bus = DurableMessageBus(tmp_path)
+    await bus.publish_inbound(_from("a", "handled"))
+    await bus.publish_inbound(_from("b", "pending", channel="discord"))
+    await bus.publish_outbound(OutboundMessage("telegram", "a", "reply"))
+    bus.ack(await bus.consume_inbound())
+    bus.close()
+
+    recovered = DurableMessageBus(tmp_path)
+    msg = await recovered.consume_inbound()
+    assert (msg.channel, msg.content, msg.priority) == ("discord", "pending", Priority.INTERACTIVE)
+    assert (await recovered.consume_outbound()).content == "reply"
+    assert recovered.inbound_size == recovered.outbound_size == 0
+    recovered.close()
+
+
+async def test_durable_bus_group_commits_and_checkpoints(tmp_path) -> None:
+    bus = DurableMessageBus(tmp_path, segment_bytes=2048, fsync=False)
+    await asyncio.gather(*(bus.publish_inbound(_from(str(i), "x" * 100)) for i in range(20)))
+    assert bus.commits < 20
+
+    for _ in range(19):
+        bus.ack(await bus.consume_inbound())
+    await bus.publish_inbound(_from("late", "y"))
+    await bus.flush()
+    bus.close()
+
+    segments = list(tmp_path.glob("wal-*.log"))
+    assert len(segments) == 1
+    recovered = DurableMessageBus(tmp_path)
+    assert [(await recovered.consume_inbound()).sender_id for _ in range(2)] == ["19", "late"]
+    recovered.close()
@@ -0,0 +1,70 @@
+from typing import Any
+
+from nanobot.agent.compaction import SessionCompactor
+from nanobot.agent.loop import AgentLoop
+from nanobot.agent.tokens import TokenCounter
+from nanobot.bus.events import Priority
+from nanobot.bus.queue import MessageBus
+from nanobot.providers.base import LLMProvider, LLMResponse, llm_priority
+from nanobot.session.manager import Session
+
+
+class SummaryProvider(LLMProvider):
+    def __init__(self):
+        super().__init__()
+        self.requests: list[str] = []
+        self.priorities: list[int] = []
+
+    async def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> LLMResponse:
+        self.requests.append(messages[-1]["content"])
+        self.priorities.append(llm_priority.get())
+        return LLMResponse(content=f"summary #{len(self.requests)}")
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+async def test_compaction_folds_old_turns_into_summary() -> None:
+    session = Session(key="t:1")
+    for i in range(10):
+        session.add_message("user", f"question {i} " + "x" * 36)
+        session.add_message("assistant", f"answer {i} " + "y" * 36)
+
+    provider = SummaryProvider()
+    # Each message costs 11 + 4 tokens with the estimate
+    compactor = SessionCompactor(provider, counter=TokenCounter(), threshold_tokens=200, keep_tokens=60)
+    assert compactor.needs_compaction(session)
+    assert await compactor.compact(session)
+
+    assert session.metadata["summary"] == "summary #1"
+    assert session.metadata["summarized_upto"] == 16
+    assert "question 0" in provider.requests[0] and "question 8" not in provider.requests[0]
+    history = session.get_history()
+    assert [m["content"][:10] for m in history] == ["question 8", "answer 8 y", "question 9", "answer 9 y"]
+    assert not compactor.needs_compaction(session)
+
+    # The next compaction builds on the previous summary
+    for i in range(10, 20):
+        session.add_message("user", f"question {i} " + "x" * 36)
+        session.add_message("assistant", f"answer {i} " + "y" * 36)
+    assert await compactor.compact(session)
+    assert provider.requests[1].startswith("Existing summary:\nsummary #1")
+
+
+async def test_agent_loop_compacts_in_the_background(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    provider = SummaryProvider()
+    loop = AgentLoop(
+        bus=MessageBus(), provider=provider, workspace=tmp_path / "ws",
+        compact_threshold_tokens=60, compact_keep_tokens=20,
+    )
+    for i in range(4):
+        await loop.process_direct(f"question {i} " + "x" * 36, session_key="cli:1")
+    await loop.drain()
+
+    session = await loop.sessions.get_or_create_async("cli:1")
+    assert session.metadata.get("summary")
+    # Summaries are background calls, turns are interactive
+    assert Priority.SYSTEM in provider.priorities
+    assert set(provider.priorities) == {Priority.INTERACTIVE, Priority.SYSTEM}
+    await loop.close()
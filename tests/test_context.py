@@ -0,0 +1,36 @@
+import os
+
+from nanobot.agent.context import ContextBuilder
+
+
+def test_system_prompt_cache_invalidates_on_file_change(tmp_path) -> None:
+    ctx = ContextBuilder(tmp_path)
+    (tmp_path / "SOUL.md").write_text("calm")
+
+    first = ctx.build_system_prompt()
+    second = ctx.build_system_prompt()
+    assert "calm" in first and "calm" in second
+    assert ctx.cache_stats() == {"hits": 1, "misses": 1}
+
+    soul = tmp_path / "SOUL.md"
+    soul.write_text("bold")
+    st = soul.stat()
+    os.utime(soul, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert "bold" in ctx.build_system_prompt()
+    assert ctx.cache_stats() == {"hits": 1, "misses": 2}
+
+    (tmp_path / "skills" / "demo").mkdir(parents=True)
+    (tmp_path / "skills" / "demo" / "SKILL.md").write_text("---\ndescription: Demo skill\n---\nbody")
+    assert "Demo skill" in ctx.build_system_prompt()
+    assert ctx.cache_stats()["misses"] == 3
+
+
+def test_volatile_details_stay_out_of_stable_prefix(tmp_path) -> None:
+    ctx = ContextBuilder(tmp_path)
+    ctx.memory.append_today("walked the cat")
+
+    system = ctx.build_messages([], "hi", channel="telegram", chat_id="42")[0]
+    stable, volatile = (block["text"] for block in system["content"])
+    assert "Current Time" not in stable and "walked the cat" not in stable
+    assert "Current Time" in volatile and "walked the cat" in volatile and "Chat ID: 42" in volatile
+    assert ctx.build_system_prompt() == stable
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from nanobot.utils.http import HttpClientPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self) -> None:
+        body = self.headers.get("Cookie", "ok").encode()
+        self.send_response(200)
+        self.send_header("Set-Cookie", "sid=secret; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+async def test_pool_reuses_connections_per_host() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    pool = HttpClientPool()
+    try:
+        client = pool.client(f"{base}/a")
+        assert pool.client(f"{base}/b?q=1") is client
+        for path in ("/a", "/b", "/c"):
+            r = await pool.client(base + path).get(base + path, timeout=5)
+            assert r.text == "ok"
+
+        stats = pool.stats()
+        assert stats["requests"] == 3
+        assert stats["connections"] == 1
+        assert stats["hosts"][base]["reused"] == 2
+    finally:
+        await pool.aclose()
+        server.shutdown()
+        server.server_close()
+    assert client.is_closed
+
+
+async def test_pool_keeps_no_cookies_and_evicts_idle_hosts() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    pool = HttpClientPool(max_hosts=1, timeout_s=0)
+    try:
+        first = f"http://127.0.0.1:{port}"
+        for _ in range(2):
+            r = await pool.client(first).get(first, timeout=5)
+            assert r.text == "ok"  # The cookie set by the first response is not sent back
+
+        old = pool.client(first)
+        second = f"http://localhost:{port}"
+        assert (await pool.client(second).get(second, timeout=5)).text == "ok"
+        await asyncio.sleep(0.05)
+        assert old.is_closed
+        assert list(pool.stats()["hosts"]) == [second]
+        assert pool.stats()["requests"] == 3
+    finally:
+        await pool.aclose()
+        server.shutdown()
+        server.server_close()
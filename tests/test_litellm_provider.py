@@ -0,0 +1,113 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from nanobot.providers import litellm_provider
+from nanobot.providers.litellm_provider import LiteLLMProvider
+
+
+def _chunk(content=None, tool_calls=None, finish_reason=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)], usage=None)
+
+
+def _tool_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+async def test_stream_chat_assembles_text_and_tool_calls(monkeypatch) -> None:
+    chunks = [
+        _chunk(content="Let me "),
+        _chunk(content="check."),
+        _chunk(tool_calls=[_tool_delta(0, id="call_1", name="read_file", arguments='{"pa')]),
+        _chunk(tool_calls=[_tool_delta(0, arguments='th": "a.txt"}')]),
+        _chunk(tool_calls=[_tool_delta(1, id="call_2", name="list_dir", arguments="")]),
+        _chunk(finish_reason="tool_calls"),
+    ]
+
+    async def fake_acompletion(**kwargs):
+        assert kwargs["stream"] is True
+
+        async def gen():
+            for c in chunks:
+                yield c
+        return gen()
+
+    monkeypatch.setattr(litellm_provider, "acompletion", fake_acompletion)
+    provider = LiteLLMProvider(default_model="anthropic/claude-opus-4-5")
+
+    deltas, final = [], None
+    async for chunk in provider.stream_chat(messages=[{"role": "user", "content": "hi"}]):
+        if chunk.delta:
+            deltas.append(chunk.delta)
+        if chunk.response:
+            final = chunk.response
+
+    assert deltas == ["Let me ", "check."]
+    assert final.content == "Let me check."
+    assert final.finish_reason == "tool_calls"
+    assert [(tc.id, tc.name, tc.arguments) for tc in final.tool_calls] == [
+        ("call_1", "read_file", {"path": "a.txt"}),
+        ("call_2", "list_dir", {}),
+    ]
+
+
+def test_cache_breakpoints_for_anthropic_and_flattening_elsewhere() -> None:
+    messages = [
+        {"role": "system", "content": [{"type": "text", "text": "stable"}, {"type": "text", "text": "now"}]},
+        {"role": "user", "content": "hi"},
+    ]
+    provider = LiteLLMProvider(default_model="anthropic/claude-opus-4-5")
+
+    kwargs = provider._build_kwargs(messages, None, None, 100, 0.5)
+    system, user = kwargs["messages"]
+    assert system["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in system["content"][1]
+    assert user["content"] == [{"type": "text", "text": "hi", "cache_control": {"type": "ephemeral"}}]
+    assert messages[1]["content"] == "hi"  # caller's list is untouched
+
+    kwargs = provider._build_kwargs(messages, None, "openai/gpt-4o", 100, 0.5)
+    assert kwargs["messages"][0]["content"] == "stable\n\nnow"
+
+
+def test_parse_usage_reports_cached_tokens() -> None:
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=5, total_tokens=105,
+               prompt_tokens_details=SimpleNamespace(cached_tokens=80), cache_creation_input_tokens=20)
+    assert LiteLLMProvider._parse_usage(usage) == {
+        "prompt_tokens": 100, "completion_tokens": 5, "total_tokens": 105,
+        "cached_tokens": 80, "cache_creation_tokens": 20,
+    }
+
+
+async def test_providers_keep_credentials_per_instance_and_limit_concurrency(monkeypatch) -> None:
+    calls, running, peak = [], 0, 0
+
+    async def fake_acompletion(**kwargs):
+        nonlocal running, peak
+        calls.append(kwargs)
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        message = SimpleNamespace(content="ok", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+    monkeypatch.setattr(litellm_provider, "acompletion", fake_acompletion)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    a = LiteLLMProvider(api_key="key-a", default_model="openai/gpt-4o", max_concurrency=2)
+    b = LiteLLMProvider(api_key="key-b", api_base="http://localhost:8000/v1", default_model="llama")
+    messages = [{"role": "user", "content": "hi"}]
+    try:
+        await asyncio.gather(*(a.chat(messages) for _ in range(5)), b.chat(messages))
+    finally:
+        await a.aclose()
+        await b.aclose()
+
+    assert "OPENAI_API_KEY" not in os.environ
+    assert peak <= 3  # two from a, one from b
+    by_key = {c["api_key"]: c for c in calls}
+    assert by_key["key-a"].get("api_base") is None
+    assert by_key["key-b"]["api_base"] == "http://localhost:8000/v1"
+    assert by_key["key-b"]["model"] == "hosted_vllm/llama"
+    if litellm_provider._SHARED_SESSIONS:
+        assert len({id(c["shared_session"]) for c in calls if c["api_key"] == "key-a"}) == 1
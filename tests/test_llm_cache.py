@@ -0,0 +1,86 @@
+from typing import Any
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.events import Priority
+from nanobot.bus.queue import MessageBus
+from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest, llm_priority
+from nanobot.providers.cache import CachingProvider
+
+
+class CountingProvider(LLMProvider):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> LLMResponse:
+        self.calls += 1
+        return LLMResponse(
+            content=f"reply {self.calls}",
+            tool_calls=[ToolCallRequest(id="call_1", name="read_file", arguments={"path": "a.txt"})],
+            finish_reason="tool_calls",
+            usage={"total_tokens": 10},
+        )
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+async def test_cache_hits_deterministic_calls_and_refreshes_tool_call_ids(tmp_path) -> None:
+    inner = CountingProvider()
+    cache = CachingProvider(inner, cache_dir=tmp_path)
+
+    first = await cache.chat(MESSAGES, temperature=0)
+    second = await cache.chat(MESSAGES, temperature=0)
+    assert inner.calls == 1
+    assert second.content == first.content and second.usage == {}
+    assert second.tool_calls[0].arguments == {"path": "a.txt"}
+    assert second.tool_calls[0].id != first.tool_calls[0].id
+
+    # Sampling calls bypass the cache unless their turn priority is marked cacheable
+    await cache.chat(MESSAGES, temperature=0.7)
+    assert inner.calls == 2
+
+    # A new process (empty memory) is served from disk
+    restarted = CachingProvider(inner, cache_dir=tmp_path)
+    assert (await restarted.chat(MESSAGES, temperature=0)).content == "reply 1"
+    assert restarted.stats()["disk_hits"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+async def test_marked_priorities_are_cached_and_entries_expire() -> None:
+    inner = CountingProvider()
+    cache = CachingProvider(inner, ttl_s=-1, cacheable_priorities={Priority.HEARTBEAT})
+    token = llm_priority.set(Priority.HEARTBEAT)
+    try:
+        await cache.chat(MESSAGES)
+        await cache.chat(MESSAGES)
+    finally:
+        llm_priority.reset(token)
+    assert inner.calls == 2  # Already expired
+    assert cache.stats()["misses"] == 2 and cache.skipped == 0
+
+
+class TextProvider(CountingProvider):
+    async def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> LLMResponse:
+        self.calls += 1
+        return LLMResponse(content=f"HEARTBEAT_OK {self.calls}")
+
+
+async def test_heartbeat_turns_hit_despite_clock_and_growing_history(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    inner = TextProvider()
+    cache = CachingProvider(inner, cacheable_priorities={Priority.HEARTBEAT})
+    loop = AgentLoop(bus=MessageBus(), provider=cache, workspace=tmp_path / "ws")
+
+    replies = [
+        await loop.process_direct("Check HEARTBEAT.md", session_key="heartbeat", priority=Priority.HEARTBEAT)
+        for _ in range(2)
+    ]
+    session = await loop.sessions.get_or_create_async("heartbeat")
+    assert len(session.messages) == 4  # The second turn saw the first in its history
+    assert replies == ["HEARTBEAT_OK 1", "HEARTBEAT_OK 1"]
+    assert inner.calls == 1 and cache.hits == 1
+    await loop.close()
@@ -0,0 +1,52 @@
+import asyncio
+from typing import Any
+
+from nanobot.bus.events import Priority
+from nanobot.providers.base import LLMProvider, LLMResponse, llm_priority
+from nanobot.providers.ratelimit import RateLimitedProvider, RateLimiter, TokenBucket
+
+
+class UsageProvider(LLMProvider):
+    async def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> LLMResponse:
+        return LLMResponse(content="ok", usage={"total_tokens": 1000})
+
+    def get_default_model(self) -> str:
+        return "test/model"
+
+
+async def test_interactive_waiters_go_before_background() -> None:
+    limiter = RateLimiter(tokens_per_minute=6000, aging_s=0)  # 100 tokens/s
+    await limiter.acquire("k", 6000)  # Drain the burst allowance
+    order: list[str] = []
+
+    async def call(name: str, priority: Priority) -> None:
+        await limiter.acquire("k", 10, priority)
+        order.append(name)
+
+    background = [asyncio.create_task(call(f"bg{i}", Priority.SYSTEM)) for i in range(2)]
+    await asyncio.sleep(0.01)
+    interactive = asyncio.create_task(call("user", Priority.INTERACTIVE))
+    await asyncio.wait_for(asyncio.gather(*background, interactive), timeout=2)
+    assert order == ["user", "bg0", "bg1"]
+    assert limiter.throttled == 3
+
+
+async def test_token_budget_is_reconciled_with_usage() -> None:
+    limiter = RateLimiter(tokens_per_minute=6000)
+    provider = RateLimitedProvider(UsageProvider(), limiter)
+    token = llm_priority.set(Priority.CRON)
+    try:
+        await provider.chat([{"role": "user", "content": "hi"}])
+    finally:
+        llm_priority.reset(token)
+
+    # The small estimate was corrected to the 1000 tokens actually used
+    assert 4990 < limiter.stats()["keys"]["test|test/model"]["tokens_left"] <= 5001
+    assert Priority.CRON in limiter.wait_latency
+
+
+def test_bucket_waits_for_debt() -> None:
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(60)
+    bucket.adjust(30)
+    assert 89 < bucket.wait_time(60) <= 90
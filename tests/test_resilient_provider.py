@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any
+
+from nanobot.providers.base import LLMProvider, LLMResponse
+from nanobot.providers.resilient import (
+    FATAL,
+    OVERLOAD,
+    RATE_LIMIT,
+    ResilientProvider,
+    classify_error,
+)
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int, headers: dict[str, str] | None = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.litellm_response_headers = headers or {}
+
+
+class ScriptedProvider(LLMProvider):
+    """Returns queued outcomes: an exception becomes an error response, a float a delayed reply."""
+
+    def __init__(self, script: list[Any]):
+        super().__init__()
+        self.script = script
+        self.calls = 0
+
+    async def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> LLMResponse:
+        self.calls += 1
+        outcome = self.script.pop(0) if self.script else "ok"
+        if isinstance(outcome, Exception):
+            return LLMResponse(content=f"Error calling LLM: {outcome}", finish_reason="error", error=outcome)
+        if isinstance(outcome, float):
+            await asyncio.sleep(outcome)
+            outcome = f"slept {outcome}"
+        return LLMResponse(content=outcome)
+
+    def get_default_model(self) -> str:
+        return "test/model"
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_classify_error() -> None:
+    assert classify_error(APIError(429)) == RATE_LIMIT
+    assert classify_error(APIError(529)) == OVERLOAD
+    assert classify_error(TimeoutError()) == OVERLOAD
+    assert classify_error(APIError(400)) == FATAL
+    assert classify_error(None) == FATAL
+
+
+async def test_retries_transient_errors_but_not_fatal_ones() -> None:
+    inner = ScriptedProvider([APIError(429, {"retry-after": "0"}), APIError(529), "done"])
+    provider = ResilientProvider(inner, base_delay_s=0.001)
+    assert (await provider.chat(MESSAGES)).content == "done"
+    assert inner.calls == 3 and provider.retries == 2
+
+    inner = ScriptedProvider([APIError(401), "unreachable"])
+    response = await ResilientProvider(inner, base_delay_s=0.001).chat(MESSAGES)
+    assert response.finish_reason == "error" and inner.calls == 1
+
+    # Retry-After beyond max_delay_s fails the call instead of stalling the turn
+    inner = ScriptedProvider([APIError(429, {"retry-after": "120"}), "late"])
+    response = await ResilientProvider(inner, max_delay_s=5).chat(MESSAGES)
+    assert response.finish_reason == "error" and inner.calls == 1
+
+
+async def test_circuit_breaker_fails_fast_then_recovers() -> None:
+    inner = ScriptedProvider([APIError(503)] * 4)
+    provider = ResilientProvider(inner, max_retries=0, breaker_failures=2, breaker_reset_s=0.05)
+    for _ in range(2):
+        await provider.chat(MESSAGES)
+    response = await provider.chat(MESSAGES)
+    assert response.finish_reason == "error" and inner.calls == 2
+    assert provider.stats()["breakers"]["test"]["state"] == "open"
+
+    await asyncio.sleep(0.06)
+    inner.script = ["back"]
+    assert (await provider.chat(MESSAGES)).content == "back"
+    assert provider.breakers["test"].state == "closed"
+
+
+async def test_hedged_request_wins_when_first_is_slow() -> None:
+    inner = ScriptedProvider([0.0] * 5 + [1.0, 0.01])
+    provider = ResilientProvider(inner, hedge=True, hedge_min_samples=5)
+    for _ in range(5):
+        await provider.chat(MESSAGES)
+
+    response = await asyncio.wait_for(provider.chat(MESSAGES), timeout=0.9)
+    assert response.content == "slept 0.01"
+    assert provider.hedges == 1 and provider.hedge_wins == 1
+
+
+async def test_streams_do_not_move_the_hedge_deadline() -> None:
+    inner = ScriptedProvider([0.05] * 5)
+    provider = ResilientProvider(inner, hedge=True, hedge_min_samples=5)
+    for _ in range(5):
+        chunks = [chunk async for chunk in provider.stream_chat(MESSAGES)]
+        assert chunks[-1].response.content == "slept 0.05"
+
+    assert provider.stream_latency.count == 5
+    assert provider.latency.count == 0 and provider._hedge_deadline() is None
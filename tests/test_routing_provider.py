@@ -0,0 +1,57 @@
+from typing import Any
+
+from nanobot.bus.events import Priority
+from nanobot.providers.base import LLMProvider, LLMResponse, llm_priority
+from nanobot.providers.routing import ModelRoute, RoutingProvider
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, fail: bool = False):
+        super().__init__()
+        self.fail = fail
+        self.models: list[str] = []
+
+    async def chat(self, messages: list[dict[str, Any]], model: str | None = None, **kwargs: Any) -> LLMResponse:
+        self.models.append(model)
+        if self.fail:
+            return LLMResponse(content="Error calling LLM: down", finish_reason="error")
+        return LLMResponse(content=model)
+
+    def get_default_model(self) -> str:
+        return "primary"
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+async def test_falls_back_and_demotes_failing_model() -> None:
+    primary, backup = FakeProvider(fail=True), FakeProvider()
+    router = RoutingProvider([ModelRoute("primary", primary), ModelRoute("backup", backup)], min_samples=3)
+
+    for _ in range(3):
+        assert (await router.chat(MESSAGES, model="primary")).content == "backup"
+    assert router.fallbacks == 3 and len(primary.models) == 3
+
+    # Primary is now unhealthy: it is tried last, so calls go straight to the backup
+    assert [r.model for r in router.rank()] == ["backup", "primary"]
+    assert (await router.chat(MESSAGES)).content == "backup"
+    assert len(primary.models) == 3
+    assert router.stats()["routes"]["primary"]["healthy"] is False
+
+
+def test_slow_routes_are_skipped_and_cheap_turns_prefer_cheap_models() -> None:
+    slow, fast = ModelRoute("slow", FakeProvider(), cost=3e-6), ModelRoute("fast", FakeProvider(), cost=1e-6)
+    router = RoutingProvider([slow, fast], cheap_priority=Priority.HEARTBEAT)
+    slow.outcomes.extend([(True, 9.0)] * 5)
+    fast.outcomes.extend([(True, 1.0)] * 5)
+    assert [r.model for r in router.rank()] == ["fast", "slow"]
+
+    # Without latency data, preference order wins except for cheap turns
+    slow.outcomes.clear()
+    fast.outcomes.clear()
+    assert router.rank()[0] is slow
+    token = llm_priority.set(Priority.HEARTBEAT)
+    try:
+        assert router.rank()[0] is fast
+    finally:
+        llm_priority.reset(token)
@@ -0,0 +1,137 @@
+import json
+
+from nanobot.session.manager import SessionManager
+from nanobot.session.store import JsonlSessionStore, SqliteSessionStore, migrate_sessions
+from nanobot.session.types import Session
+from nanobot.utils.writer import CoalescingWriter
+
+
+def test_save_appends_and_reloads(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    manager = SessionManager(tmp_path, rewrite_every=3)
+    session = manager.get_or_create("telegram:1")
+    path = manager.store._get_session_path(session.key)
+
+    session.add_message("user", "hi")
+    manager.save(session)
+    assert len(path.read_text().splitlines()) == 3  # metadata, message, metadata trailer
+
+    session.add_message("assistant", "hello")
+    session.metadata["summary"] = "greeted"
+    manager.save(session)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r.get("_type", r.get("role")) for r in lines] == ["metadata", "user", "metadata", "assistant", "metadata"]
+
+    # A torn trailing write is skipped on load and cleaned up by the next save
+    with open(path, "a") as f:
+        f.write('{"role": "user", "cont')
+    reloaded = SessionManager(tmp_path).get_or_create("telegram:1")
+    assert [m["content"] for m in reloaded.messages] == ["hi", "hello"]
+    assert reloaded.metadata == {"summary": "greeted"}
+    assert manager.list_sessions()[0]["key"] == "telegram:1"
+
+    session.clear()
+    session.add_message("user", "fresh")
+    session.add_message("assistant", "start")
+    session.add_message("user", "again")
+    manager.save(session)
+    assert [m["content"] for m in SessionManager(tmp_path).get_or_create("telegram:1").messages] == [
+        "fresh", "start", "again"
+    ]
+
+
+def test_lru_cache_evicts_and_flushes(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    manager = SessionManager(tmp_path, max_cached=2)
+
+    for key in ("a:1", "b:1", "c:1"):
+        manager.get_or_create(key).add_message("user", f"hi {key}")
+    assert manager.cache_stats()["evictions"] == 1
+    assert manager.store._get_session_path("a:1").exists()  # flushed on eviction
+
+    # Still-referenced sessions come back as the same object; others reload from disk
+    b = manager._cache["b:1"]
+    manager.get_or_create("a:1")
+    assert manager.get_or_create("b:1") is b
+    assert [m["content"] for m in manager.get_or_create("a:1").messages] == ["hi a:1"]
+    stats = manager.cache_stats()
+    assert stats["entries"] == 2 and stats["hits"] == 1 and stats["misses"] == 5
+
+
+def test_sqlite_store_and_migration(tmp_path) -> None:
+    jsonl = JsonlSessionStore(tmp_path)
+    for key in ("telegram:1", "discord:2"):
+        session = Session(key=key)
+        session.add_message("user", f"hi from {key}")
+        session.add_message("assistant", "hello")
+        jsonl.save(session)
+
+    sqlite = SqliteSessionStore(tmp_path / "sessions.db")
+    assert migrate_sessions(jsonl, sqlite) == 2
+    assert [s["key"] for s in sqlite.list_sessions()] == [s["key"] for s in jsonl.list_sessions()]
+
+    session = sqlite.load("telegram:1")
+    session.add_message("user", "more")
+    session.metadata["summary"] = "greetings"
+    sqlite.save(session)
+    assert [m["content"] for m in sqlite.recent_messages("telegram:1", 2)] == ["hello", "more"]
+
+    reloaded = SqliteSessionStore(tmp_path / "sessions.db").load("telegram:1")
+    assert len(reloaded.messages) == 3 and reloaded.metadata == {"summary": "greetings"}
+    assert sqlite.delete("telegram:1") and sqlite.load("telegram:1") is None
+
+
+def test_tail_loading_and_load_older(tmp_path) -> None:
+    for store in (JsonlSessionStore(tmp_path, rewrite_every=2), SqliteSessionStore(tmp_path / "sessions.db")):
+        session = Session(key="telegram:1")
+        for i in range(10):
+            session.add_message("user", f"m{i}")
+            store.save(session)
+
+        tail = store.load("telegram:1", tail=3)
+        assert [m["content"] for m in tail.messages] == ["m7", "m8", "m9"] and tail.offset == 7
+
+        # Saving a windowed session (including a full JSONL rewrite) keeps unloaded messages
+        for i in (10, 11, 12):
+            tail.add_message("user", f"m{i}")
+            store.save(tail)
+        assert store.load_older(tail, 2) == 2
+        assert [m["content"] for m in tail.messages][:3] == ["m5", "m6", "m7"] and tail.offset == 5
+        full = store.load("telegram:1")
+        assert [m["content"] for m in full.messages] == [f"m{i}" for i in range(13)]
+        store.close()
+
+
+def test_rewrite_skips_torn_lines_it_carries_over(tmp_path) -> None:
+    store = JsonlSessionStore(tmp_path, rewrite_every=100)
+    session = Session(key="telegram:1")
+    for i in range(6):
+        session.add_message("user", f"m{i}")
+    store.save(session)
+    path = store._get_session_path("telegram:1")
+    lines = path.read_text().splitlines()
+    path.write_text("\n".join(lines[:3] + ['{"role": "user", "cont'] + lines[3:]) + "\n")
+
+    tail = store.load("telegram:1", tail=2)
+    assert tail.offset == 4
+    store.rewrite_every = 1
+    for i in (6, 7):  # The second save rewrites the file
+        tail.add_message("user", f"m{i}")
+        store.save(tail)
+    assert [m["content"] for m in store.load("telegram:1").messages] == [f"m{i}" for i in range(8)]
+
+
+async def test_background_saves_are_coalesced(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    writer = CoalescingWriter(delay_s=0.01)
+    manager = SessionManager(tmp_path, writer=writer)
+    session = await manager.get_or_create_async("telegram:1")
+
+    for i in range(5):
+        session.add_message("user", f"m{i}")
+        manager.save(session)
+    await manager.flush()
+
+    assert writer.submitted == 5 and writer.written == 1
+    reloaded = SessionManager(tmp_path).get_or_create("telegram:1")
+    assert [m["content"] for m in reloaded.messages] == [f"m{i}" for i in range(5)]
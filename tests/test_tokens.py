@@ -0,0 +1,28 @@
+from nanobot.agent.tokens import MESSAGE_OVERHEAD, TokenCounter
+from nanobot.config.schema import Config
+from nanobot.session.manager import Session
+
+
+def test_history_keeps_newest_messages_within_budget() -> None:
+    session = Session(key="t:1")
+    session.add_message("user", "x" * 4000)  # ~1000 tokens of pasted logs
+    for i in range(5):
+        session.add_message("user", f"short {i}")
+
+    calls = []
+    counter = TokenCounter(lambda text: calls.append(text) or len(text) // 4)
+    history = session.get_history(max_tokens=10 * (2 + MESSAGE_OVERHEAD), counter=counter)
+    assert [m["content"] for m in history] == [f"short {i}" for i in range(5)]
+
+    # Counts are cached, so a second turn doesn't re-tokenize anything
+    n = len(calls)
+    assert len(session.get_history(max_tokens=10_000, counter=counter)) == 6
+    assert len(calls) == n
+
+
+def test_history_budget_per_model() -> None:
+    config = Config()
+    config.agents.defaults.history_tokens_by_model = {"gpt": 8000, "gpt-4.1": 100000}
+    assert config.get_history_tokens("openai/gpt-4.1-mini") == 100000
+    assert config.get_history_tokens("openai/gpt-4o") == 8000
+    assert config.get_history_tokens("anthropic/claude") == config.agents.defaults.history_tokens
@@ -1,6 +1,7 @@
+import asyncio
 from typing import Any
 
-from nanobot.agent.tools.base import Tool
+from nanobot.agent.tools.base import Tool, ToolContext
 from nanobot.agent.tools.registry import ToolRegistry
 
 
@@ -86,3 +87,92 @@ async def test_registry_returns_validation_error() -> None:
     reg.register(SampleTool())
     result = await reg.execute("sample", {"query": "hi"})
     assert "Invalid parameters" in result
+
+
+class ContextTool(Tool):
+    needs_context = True
+
+    @property
+    def name(self) -> str:
+        return "whoami"
+
+    @property
+    def description(self) -> str:
+        return "report the current context"
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, context: ToolContext | None = None, **kwargs: Any) -> str:
+        return f"{context.channel}:{context.chat_id}"
+
+
+async def test_registry_passes_per_call_context() -> None:
+    reg = ToolRegistry()
+    reg.register(ContextTool())
+    a, b = await asyncio.gather(
+        reg.execute("whoami", {}, context=ToolContext(channel="telegram", chat_id="1")),
+        reg.execute("whoami", {}, context=ToolContext(channel="discord", chat_id="2")),
+    )
+    assert (a, b) == ("telegram:1", "discord:2")
+
+
+async def test_registry_ignores_a_context_param_from_the_model() -> None:
+    reg = ToolRegistry()
+    reg.register(ContextTool())
+    result = await reg.execute(
+        "whoami", {"context": "spoofed"}, context=ToolContext(channel="telegram", chat_id="1")
+    )
+    assert result == "telegram:1"
+
+
+class SleepTool(Tool):
+    def __init__(self, name: str, log: list[str], parallel_safe: bool = True, delay: float = 0.05):
+        self._name = name
+        self._log = log
+        self.parallel_safe = parallel_safe
+        self._delay = delay
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return "sleep and log"
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {"type": "object", "properties": {"tag": {"type": "string"}}}
+
+    async def execute(self, tag: str = "", **kwargs: Any) -> str:
+        self._log.append(f"start {tag}")
+        await asyncio.sleep(self._delay)
+        self._log.append(f"end {tag}")
+        return tag
+
+
+async def test_execute_batch_runs_parallel_calls_concurrently() -> None:
+    log: list[str] = []
+    reg = ToolRegistry()
+    reg.register(SleepTool("fetch", log))
+    results = await reg.execute_batch([("fetch", {"tag": "a"}), ("fetch", {"tag": "b"})])
+    assert results == ["a", "b"]
+    assert log[:2] == ["start a", "start b"]
+
+
+async def test_execute_batch_serializes_side_effecting_tools() -> None:
+    log: list[str] = []
+    reg = ToolRegistry()
+    reg.register(SleepTool("fetch", log))
+    reg.register(SleepTool("write", log, parallel_safe=False))
+    results = await reg.execute_batch([
+        ("fetch", {"tag": "r1"}),
+        ("write", {"tag": "w"}),
+        ("fetch", {"tag": "r2"}),
+        ("missing", {}),
+    ])
+    assert results[:3] == ["r1", "w", "r2"]
+    assert "not found" in results[3]
+    assert log == ["start r1", "end r1", "start w", "end w", "start r2", "end r2"]
@@ -0,0 +1,137 @@
+import asyncio
+import os
+from pathlib import Path
+
+from nanobot.agent.workers import WorkerPool, shard_for
+from nanobot.bus.durable import DurableMessageBus
+from nanobot.bus.events import InboundMessage, OutboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.providers.ratelimit import RateLimiter
+
+
+class EchoAgent:
+    """Stand-in for AgentLoop that replies with its pid; 'crash' kills the worker once."""
+
+    def __init__(self, bus: MessageBus):
+        self.bus = bus
+
+    async def run(self) -> None:
+        async for msg in self.bus.inbound():
+            marker = Path(os.environ["NANOBOT_TEST_CRASH_MARKER"])
+            if msg.content == "crash" and not marker.exists():
+                marker.touch()
+                os._exit(1)
+            if msg.content == "hang":
+                await asyncio.sleep(3600)
+            if msg.content == "llm":
+                # What RateLimitedProvider does around a call
+                await self.bus.rate_limiter.acquire("test|model", 10)
+                self.bus.rate_limiter.reconcile("test|model", 10, 100)
+            await self.bus.publish_outbound(OutboundMessage(msg.channel, msg.chat_id, f"{os.getpid()}:{msg.content}"))
+            self.bus.ack(msg)
+
+    def stop(self) -> None:
+        pass
+
+    async def drain(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def process_direct(self, content: str, **kwargs) -> str:
+        return f"{os.getpid()}:{content}"
+
+
+def make_echo_agent(bus: MessageBus) -> EchoAgent:
+    return EchoAgent(bus)
+
+
+async def _replies(bus: MessageBus, n: int) -> dict[str, str]:
+    replies = {}
+    for _ in range(n):
+        msg = await asyncio.wait_for(bus.consume_outbound(), timeout=30)
+        pid, content = msg.content.split(":", 1)
+        replies[f"{msg.chat_id}/{content}"] = pid
+    return replies
+
+
+async def test_pool_shards_sessions_and_redelivers_after_crash(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("NANOBOT_TEST_CRASH_MARKER", str(tmp_path / "crashed"))
+    bus = MessageBus()
+    pool = WorkerPool(bus, make_echo_agent, workers=2)
+    runner = asyncio.create_task(pool.run())
+    try:
+        chats = ["a", "b", "c", "d"]
+        for chat in chats:
+            for text in ("1", "2"):
+                await bus.publish_inbound(InboundMessage("telegram", "u", chat, text))
+        replies = await _replies(bus, 8)
+
+        pids = {chat: replies[f"{chat}/1"] for chat in chats}
+        assert all(replies[f"{chat}/2"] == pids[chat] for chat in chats)
+        shards = {chat: shard_for(f"telegram:{chat}", 2) for chat in chats}
+        assert all((pids[x] == pids[y]) == (shards[x] == shards[y]) for x in chats for y in chats)
+
+        # The worker dies on the message; it is restarted and the message redelivered
+        await bus.publish_inbound(InboundMessage("telegram", "u", "a", "crash"))
+        worker = pool._workers[shards["a"]]
+        while worker.process.is_alive():
+            await asyncio.sleep(0.01)
+        # Messages arriving during the restart backoff wait for the new process
+        await bus.publish_inbound(InboundMessage("telegram", "u", "a", "later"))
+        await asyncio.sleep(0.1)
+        assert [r.deliveries for r in pool._pending[shards["a"]].values()] == [1, 0]
+        replies = await _replies(bus, 2)
+        assert replies["a/crash"] != pids["a"]
+        assert replies["a/later"] == replies["a/crash"]
+        assert pool.restarts == 1
+
+        assert (await pool.process_direct("ping", session_key="cron:1")).endswith(":ping")
+    finally:
+        pool.stop()
+        await runner
+        await pool.close()
+
+
+async def test_turns_killed_at_close_are_replayed(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("NANOBOT_TEST_CRASH_MARKER", str(tmp_path / "crashed"))
+    bus = DurableMessageBus(tmp_path / "wal")
+    pool = WorkerPool(bus, make_echo_agent, workers=1, drain_timeout_s=0.5)
+    runner = asyncio.create_task(pool.run())
+    await bus.publish_inbound(InboundMessage("telegram", "u", "a", "done"))
+    await bus.publish_inbound(InboundMessage("telegram", "u", "a", "hang"))
+    assert "a/done" in await _replies(bus, 1)
+
+    pool.stop()
+    await runner
+    await pool.close()  # The worker is stuck on "hang" and gets terminated
+    bus.close()
+
+    recovered = DurableMessageBus(tmp_path / "wal")
+    assert (await asyncio.wait_for(recovered.consume_inbound(), timeout=5)).content == "hang"
+    assert recovered.inbound_size == 0
+    recovered.close()
+
+
+async def test_workers_share_the_gateway_rate_limits(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("NANOBOT_TEST_CRASH_MARKER", str(tmp_path / "crashed"))
+    bus = MessageBus()
+    limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=600)
+    pool = WorkerPool(bus, make_echo_agent, workers=2, drain_timeout_s=0.5, rate_limiter=limiter)
+    runner = asyncio.create_task(pool.run())
+    try:
+        # One LLM call on each worker, but one request per minute for the whole gateway
+        assert shard_for("telegram:a", 2) != shard_for("telegram:d", 2)
+        for chat in ("a", "d"):
+            await bus.publish_inbound(InboundMessage("telegram", "u", chat, "llm"))
+        await _replies(bus, 1)
+        await asyncio.sleep(0.5)
+        assert bus.outbound_size == 0
+        stats = limiter.stats()["keys"]["test|model"]
+        assert stats["waiting"] == 1
+        assert 490 <= stats["tokens_left"] <= 520  # The granted call was reconciled at 100 tokens
+    finally:
+        pool.stop()
+        await runner
+        await pool.close()